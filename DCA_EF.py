@@ -1,803 +1,1180 @@
-
-
-import streamlit as st
-import pandas as pd
-import numpy as np
-from scipy.optimize import differential_evolution
-from io import BytesIO
-import matplotlib.pyplot as plt
-
-
-import os, textwrap, pathlib
-cfg_dir = pathlib.Path(".streamlit")
-cfg_dir.mkdir(exist_ok=True)
-(cfg_dir / "config.toml").write_text(textwrap.dedent("""\
-[theme]
-base = "light"
-primaryColor = "#2748d9"
-backgroundColor = "#FFFFFF"
-secondaryBackgroundColor = "#F6F8FF"
-textColor = "#1f2a44"
-"""), encoding="utf-8")
-
-
-
-# --- Put near the top of app.py ---
-from PIL import Image
-import base64, io, streamlit as st
-
-
-
-def add_logo_below_deploy(path:str, width:int=120, top_px:int=64, right_px:int=16):
-    """Renders a logo fixed just below the header, near the Deploy menu."""
-    img = Image.open(path)
-    # keep aspect ratio based on width
-    w = width
-    h = int(img.height * (w / img.width))
-    buf = io.BytesIO(); img.save(buf, format="PNG")
-    b64 = base64.b64encode(buf.getvalue()).decode()
-
-    st.markdown(f"""
-    <style>
-      /* place the logo below the header, aligned to the right (under "Deploy") */
-      .app-logo-fixed {{
-        position: fixed;
-        top: {top_px}px;              /* distance from top of page; increase to go lower */
-        right: {right_px}px;          /* distance from right edge; increase to move left */
-        width: {w}px;
-        height: {h}px;
-        z-index: 1000;                /* above page content */
-        pointer-events: none;         /* clicks pass through */
-      }}
-      @media (max-width: 900px) {{
-        .app-logo-fixed {{ width: {int(w*0.8)}px; right: 10px; top: {top_px+2}px; }}
-      }}
-    </style>
-    <img class="app-logo-fixed" src="data:image/png;base64,{b64}" alt="logo">
-    """, unsafe_allow_html=True)
-    
-
-
-# add_logo_below_deploy("D:\mohie\R.png", width=120, top_px=64, right_px=18)
-
-add_logo_below_deploy("R.png", width=120, top_px=64, right_px=18)
-
-
-# ============================ PAGE ============================
-st.set_page_config(page_title="Hyperbolic Decline Dashboard", layout="wide", page_icon="📉")
-
-# -------------------- Appearance Controls --------------------
-with st.sidebar:
-    st.markdown("### 🎨 Appearance")
-    accent_choice = st.selectbox(
-        "Accent color",
-        ["Blue", "Teal", "Purple", "Emerald"],
-        index=0,
-        help="Changes highlights, headers, and button accents."
-    )
-    # density = st.select_slider("Density", ["Compact", "Comfortable"], value="Comfortable")
-
-ACCENTS = {
-    "Blue":    {"accent":"#2748d9", "accentSoft":"#eef3ff"},
-    "Teal":    {"accent":"#0e8f8c", "accentSoft":"#e9fbfb"},
-    "Purple":  {"accent":"#6d28d9", "accentSoft":"#f3e9ff"},
-    "Emerald": {"accent":"#059669", "accentSoft":"#e9fbf4"},
-}
-ACCENT = ACCENTS[accent_choice]["accent"]
-ACCENT_SOFT = ACCENTS[accent_choice]["accentSoft"]
-PAD = "16px" 
-
-# if density=="Comfortable" else "10px"
-GAP = "18px" 
-
-# if density=="Comfortable" else "12px"
-
-# -------------------- THEME / CSS --------------------
-st.markdown(f"""
-<style>
-:root {{
-  --ink:#1f2a44;
-  --muted:#6b7a99;
-  --accent:{ACCENT};
-  --accentSoft:{ACCENT_SOFT};
-  --card:#ffffff;
-  --line:#e8ecf6;
-  --pad:{PAD};
-  --gap:{GAP};
-}}
-
-html,body,[data-testid="stAppViewContainer"] * {{ color:var(--ink) !important; }}
-[data-testid="stAppViewContainer"] {{
-  background: radial-gradient(1200px 600px at 0% 0%, #e9f0ff 0%, #f6f8ff 25%, #ffffff 60%);
-}}
-[data-testid="stHeader"]{{ background:#ffffffcc; backdrop-filter:blur(6px); border-bottom:1px solid var(--line); }}
-
-/* Sidebar */
-section[data-testid="stSidebar"]{{
-  background:linear-gradient(180deg,#eef3ff 0%,#ffffff 40%);
-  border-right:1px solid var(--line);
-}}
-section[data-testid="stSidebar"] *{{ color:var(--ink) !important; }}
-
-/* Cards with header accent bar */
-.card{{
-  background:var(--card);
-  border-radius:18px;
-  padding:calc(var(--pad) + 2px) var(--pad) var(--pad) var(--pad);
-  border:1px solid var(--line);
-  box-shadow:0 8px 24px rgba(36,71,187,.08);
-  position:relative;
-  margin-bottom:var(--gap);
-}}
-.card h3,.card h4{{ margin:0 0 10px 0; color:var(--ink)!important; font-weight:800; }}
-.card::before {{
-  content:"";
-  position:absolute; left:0; top:0; height:6px; width:100%;
-  background: linear-gradient(90deg, var(--accent), rgba(39,72,217,.0) 70%);
-  border-top-left-radius:18px; border-top-right-radius:18px;
-}}
-
-/* KPI boxes */
-.kpi-box{{
-  background:#fff; border:1px solid var(--line); border-radius:14px;
-  padding:12px 14px; box-shadow:0 4px 14px rgba(36,71,187,.08);
-}}
-.kpi-box:hover{{ box-shadow:0 8px 24px rgba(36,71,187,.14); }}
-.kpi-label{{ font-size:11px; color:var(--muted); text-transform:uppercase; letter-spacing:.05em; }}
-.kpi-value{{ font-size:26px; font-weight:800; }}
-.kpi-unit{{ font-size:11px; color:var(--muted); margin-left:6px }}
-
-/* Inputs / uploader */
-input,textarea,select{{ background:#fff !important; color:var(--ink)!important; }}
-div[data-baseweb="select"]>div,div[data-baseweb="input"]>div{{ background:#fff !important; border:1px solid var(--line)!important; }}
-[data-testid="stFileUploader"] section{{ background:#fff !important; border:1px dashed #cad3eb !important; }}
-
-/* Buttons */
-.stButton>button,.stDownloadButton>button,[data-testid="baseButton-secondary"]{{
-  background:var(--accentSoft) !important; color:var(--accent) !important; border:1px solid #dbe3ff !important;
-  border-radius:12px !important; padding:.7rem 1rem !important; font-weight:700 !important; min-height:40px;
-}}
-.stButton>button:hover,.stDownloadButton>button:hover,[data-testid="baseButton-secondary"]:hover{{
-  filter:brightness(.98);
-}}
-.stForm .stButton>button{{ width:100%; }}
-
-/* Tabs */
-[role="tablist"] button{{ color: var(--muted) !important; font-weight: 600; }}
-[role="tab"][aria-selected="true"]{{ color: var(--accent) !important; border-bottom: 2px solid var(--accent) !important; }}
-
-/* DataFrame: white, legible text, subtle grid */
-[data-testid="stDataFrame"] {{
-  border:1px solid var(--line); border-radius:14px; overflow:hidden;
-  box-shadow:0 4px 14px rgba(36,71,187,.06); background:#fff;
-}}
-[data-testid="stDataFrame"] thead tr {{ background:#f6f8ff !important; color:var(--ink)!important; font-weight:700; }}
-[data-testid="stDataFrame"] tbody tr {{ background:#ffffff !important; }}
-[data-testid="stDataFrame"] * {{ color:#1f2a44 !important; }}
-
-/* Number inputs (remove dark steppers) */
-[data-testid="stNumberInput"] > div > div {{
-  background:#fff !important; border:1px solid var(--line) !important; border-radius:12px !important; overflow:hidden;
-}}
-[data-testid="stNumberInput"] input {{ background:#fff !important; color:var(--ink) !important; }}
-[data-testid="stNumberInput"] button {{
-  background:#fff !important; color:var(--accent) !important; border-left:1px solid var(--line) !important; box-shadow:none !important;
-}}
-[data-testid="stNumberInput"] button:hover {{ background:#f3f6ff !important; }}
-[data-testid="stNumberInput"] button:active{{ background:#e7edff !important; }}
-</style>
-""", unsafe_allow_html=True)
-
-# ADD this block *after* your existing <style>…</style> (keep the rest unchanged)
-st.markdown("""
-<style>
-/* ===== File Uploader button: force light style across Streamlit versions ===== */
-[data-testid="stFileUploader"] button,
-[data-testid="stFileUploader"] [data-testid="baseButton-secondary"],
-[data-testid="stFileUploader"] [data-testid="baseButton-primary"],
-[data-testid="stFileUploader"] [data-baseweb="button"] {
-  background: var(--accentSoft) !important;
-  color: var(--accent) !important;
-  border: 1px solid #dbe3ff !important;
-  border-radius: 12px !important;
-  box-shadow: none !important;
-}
-[data-testid="stFileUploader"] button:hover { filter: brightness(.98); }
-/* remove dark overlays/focus rings that some themes inject */
-[data-testid="stFileUploader"] button::before,
-[data-testid="stFileUploader"] button::after { content: none !important; }
-[data-testid="stFileUploader"] svg path { fill: var(--accent) !important; }
-
-/* ===== Disabled buttons (e.g., Apply before changes): keep light ===== */
-.stButton>button:disabled,
-.stDownloadButton>button:disabled,
-.stForm .stButton>button:disabled,
-button[disabled],
-[aria-disabled="true"] {
-  background: #eef1f7 !important;
-  color: #9aa8c7 !important;
-  border: 1px solid #e1e6f4 !important;
-  opacity: 1 !important;        /* prevent dark dimming */
-  box-shadow: none !important;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# Add this AFTER your existing CSS block
-st.markdown("""
-<style>
-/* 1) File-uploader icons (cloud + document): remove dark fills */
-[data-testid="stFileUploader"] svg rect,
-[data-testid="stFileUploader"] svg circle { fill: transparent !important; }
-[data-testid="stFileUploader"] svg path { stroke: var(--accent) !important; fill: transparent !important; }
-/* keep icon size natural */
-[data-testid="stFileUploader"] svg { background: transparent !important; }
-
-/* 2) File-uploader small "remove file" pill: make it light */
-[data-testid="stFileUploader"] button[aria-label*="Remove"],
-[data-testid="stFileUploader"] button[title*="Remove"],
-[data-testid="stFileUploader"] [data-baseweb="button"][aria-label*="Remove"] {
-  background: var(--accentSoft) !important;
-  color: var(--accent) !important;
-  border: 1px solid #dbe3ff !important;
-  border-radius: 10px !important;
-  box-shadow: none !important;
-}
-[data-testid="stFileUploader"] button[aria-label*='Remove'] svg path { fill: var(--accent) !important; }
-
-/* 3) Disabled Apply button: force light even when BaseWeb overrides it */
-.stForm .stButton > button[disabled],
-.stForm .stButton > button:disabled,
-.stForm button[disabled],
-.stForm [aria-disabled="true"],
-.stForm [data-baseweb="button"][aria-disabled="true"] {
-  background: #eef1f7 !important;
-  color: #9aa8c7 !important;
-  border: 1px solid #e1e6f4 !important;
-  opacity: 1 !important;
-  box-shadow: none !important;
-}
-</style>
-""", unsafe_allow_html=True)
-
-st.markdown("""
-<style>
-/* ===== Select / Dropdown ===== */
-/* Closed control */
-div[data-baseweb="select"] > div {
-  background:#ffffff !important;
-  color:#111111 !important;
-  border:1px solid var(--line) !important;
-}
-div[data-baseweb="select"] * { color:#111111 !important; }
-
-/* Opened menu (lives in a portal) */
-div[role="listbox"],
-ul[role="listbox"],
-[data-baseweb="menu"] {
-  background:#ffffff !important;
-  color:#111111 !important;
-  border:1px solid var(--line) !important;
-  box-shadow: 0 8px 24px rgba(15, 23, 42, .08) !important;
-}
-
-/* Options */
-div[role="listbox"] [role="option"],
-[data-baseweb="menu"] li {
-  background:#ffffff !important;
-  color:#111111 !important;
-}
-div[role="listbox"] [role="option"]:hover,
-[data-baseweb="menu"] li:hover {
-  background:#f3f6ff !important;       /* light hover */
-  color:#111111 !important;
-}
-div[role="listbox"] [role="option"][aria-selected="true"] {
-  background:#eef3ff !important;        /* selected */
-  color:#111111 !important;
-}
-
-/* If the select has a search input in the menu, keep it white/black */
-[data-baseweb="menu"] input,
-div[role="listbox"] input {
-  background:#ffffff !important;
-  color:#111111 !important;
-  border:1px solid var(--line) !important;
-}
-
-/* ===== DataFrame / Table ===== */
-[data-testid="stDataFrame"] {
-  background:#ffffff !important;
-  border:1px solid var(--line) !important;
-  border-radius:14px !important;
-  box-shadow:0 4px 14px rgba(36,71,187,.06) !important;
-}
-[data-testid="stDataFrame"] * {
-  color:#111111 !important;            /* black text */
-}
-[data-testid="stDataFrame"] thead tr {
-  background:#ffffff !important;       /* white header */
-  border-bottom:1px solid var(--line) !important;
-}
-[data-testid="stDataFrame"] tbody tr {
-  background:#ffffff !important;       /* white rows */
-}
-[data-testid="stDataFrame"] th, 
-[data-testid="stDataFrame"] td {
-  border-color:#e9edf7 !important;     /* subtle grid lines */
-}
-</style>
-""", unsafe_allow_html=True)
-
-st.markdown("""
-<style>
-/* --- Custom icons for st.file_uploader (no f-string required) --- */
-
-/* Layout for the dropzone and file items */
-[data-testid="stFileUploader"] section { position: relative; padding-left: 68px; }
-[data-testid="stFileUploader"] ul li { position: relative; padding-left: 52px; }
-
-/* Hide default SVGs */
-[data-testid="stFileUploader"] section svg,
-[data-testid="stFileUploader"] ul li svg { display: none !important; }
-
-/* Dropzone icon (upload) */
-[data-testid="stFileUploader"] section::before {
-  content: "";
-  position: absolute; left: 18px; top: 18px;
-  width: 38px; height: 38px; border-radius: 12px;
-  background: var(--accentSoft);
-  color: var(--accent);                         /* used by SVG via currentColor */
-  background-repeat: no-repeat; background-position: center; background-size: 22px 22px;
-  box-shadow: 0 1px 3px rgba(0,0,0,.05);
-  background-image: url("data:image/svg+xml;utf8,\
-<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'>\
-<path d='M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4'/>\
-<polyline points='17 8 12 3 7 8'/>\
-<line x1='12' y1='3' x2='12' y2='15'/>\
-</svg>");
-}
-
-/* Uploaded file icon (file) */
-[data-testid="stFileUploader"] ul li::before {
-  content: "";
-  position: absolute; left: 12px; top: 8px;
-  width: 32px; height: 32px; border-radius: 10px;
-  background: var(--accentSoft);
-  color: var(--accent);
-  background-repeat: no-repeat; background-position: center; background-size: 20px 20px;
-  box-shadow: 0 1px 3px rgba(0,0,0,.05);
-  background-image: url("data:image/svg+xml;utf8,\
-<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'>\
-<path d='M14 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V8z'/>\
-<polyline points='14 2 14 8 20 8'/>\
-</svg>");
-}
-
-/* Remove button (X) */
-[data-testid="stFileUploader"] button[aria-label*="Remove"] {
-  position: relative;
-  width: 28px; height: 28px;
-  background: var(--accentSoft) !important;
-  color: var(--accent) !important;
-  border: 1px solid #dbe3ff !important;
-  border-radius: 8px !important;
-  box-shadow: none !important;
-  overflow: hidden;
-}
-[data-testid="stFileUploader"] button[aria-label*="Remove"] svg { display: none !important; }
-[data-testid="stFileUploader"] button[aria-label*="Remove"]::before {
-  content: "";
-  position: absolute; inset: 0;
-  background-repeat: no-repeat; background-position: center; background-size: 16px 16px;
-  color: var(--accent);
-  background-image: url("data:image/svg+xml;utf8,\
-<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'>\
-<line x1='18' y1='6' x2='6' y2='18'/>\
-<line x1='6' y1='6' x2='18' y2='18'/>\
-</svg>");
-}
-</style>
-""", unsafe_allow_html=True)
-
-# Put this AFTER your existing CSS blocks
-st.markdown("""
-<style>
-/* =========================
-   FINAL OVERRIDE: Apply (Submit) in forms
-   ========================= */
-
-/* 0) Nuke any dark background on wrappers around the submit button */
-.stForm .stButton,
-.stForm .stButton > div,
-.stForm .stButton > span,
-.stForm .stButton > div > div {
-  background: transparent !important;
-  box-shadow: none !important;
-  border: none !important;
-}
-
-/* 1) Style the actual control (covers button, BaseWeb div-button, role=button) */
-.stForm .stButton :is(button, [role="button"], [data-baseweb="button"]) {
-  background: var(--accentSoft) !important;
-  color: var(--accent) !important;
-  border: 1px solid #dbe3ff !important;
-  border-radius: 12px !important;
-  min-height: 40px;
-  box-shadow: none !important;
-}
-
-/* 2) Hover (enabled) */
-.stForm .stButton :is(button, [role="button"], [data-baseweb="button"]):not([disabled]):not([aria-disabled="true"]):hover {
-  filter: brightness(.98);
-}
-
-/* 3) Disabled – keep it light (no dark pill) */
-.stForm .stButton :is(button, [role="button"], [data-baseweb="button"])[disabled],
-.stForm .stButton :is(button, [role="button"], [data-baseweb="button"])[aria-disabled="true"] {
-  background: #eef1f7 !important;
-  color: #9aa8c7 !important;
-  border: 1px solid #e1e6f4 !important;
-  opacity: 1 !important;    /* avoid dim darkening */
-  box-shadow: none !important;
-}
-
-/* 4) Kill BaseWeb pseudo overlays that paint the dark background */
-.stForm .stButton :is(button, [role="button"], [data-baseweb="button"])::before,
-.stForm .stButton :is(button, [role="button"], [data-baseweb="button"])::after {
-  content: none !important;
-  background: transparent !important;
-}
-
-/* 5) Some builds wrap the label in a span with its own background—clear it too */
-.stForm .stButton :is(button, [role="button"], [data-baseweb="button"]) * {
-  background: transparent !important;
-}
-</style>
-""", unsafe_allow_html=True)
-
-st.markdown("""
-<style>
-/* ===========================================
-   FINAL OVERRIDE for open Select menus (portal)
-   Works across Streamlit/BaseWeb builds 1.30–1.36
-   =========================================== */
-
-/* The portal container that hosts the open menu */
-body > div[data-baseweb="layer"],
-body > div[role="presentation"][data-baseweb="layer"],
-body > div[aria-hidden="false"][data-baseweb="layer"] {
-  color: #111111 !important;
-}
-
-/* The actual menu panel and listbox inside the portal */
-body > div[data-baseweb="layer"]  [data-baseweb="menu"],
-body > div[data-baseweb="layer"]  [role="listbox"],
-body > div[role="presentation"][data-baseweb="layer"] [data-baseweb="menu"],
-body > div[role="presentation"][data-baseweb="layer"] [role="listbox"],
-body > div[aria-hidden="false"][data-baseweb="layer"] [data-baseweb="menu"],
-body > div[aria-hidden="false"][data-baseweb="layer"] [role="listbox"] {
-  background: #ffffff !important;
-  color: #111111 !important;
-  border: 1px solid var(--line) !important;
-  box-shadow: 0 8px 24px rgba(15,23,42,.08) !important;
-}
-
-/* Make sure everything inside reads as black on white */
-body > div[data-baseweb="layer"]  [data-baseweb="menu"] *,
-body > div[data-baseweb="layer"]  [role="listbox"] *,
-body > div[role="presentation"][data-baseweb="layer"] [data-baseweb="menu"] *,
-body > div[role="presentation"][data-baseweb="layer"] [role="listbox"] * {
-  color: #111111 !important;
-  background: #ffffff !important;
-}
-
-/* Individual options + hover/selected states */
-body > div[data-baseweb="layer"]  [data-baseweb="menu"] li,
-body > div[data-baseweb="layer"]  [role="option"],
-body > div[role="presentation"][data-baseweb="layer"] [data-baseweb="menu"] li,
-body > div[role="presentation"][data-baseweb="layer"] [role="option"] {
-  background: #ffffff !important;
-  color: #111111 !important;
-}
-body > div[data-baseweb="layer"]  [data-baseweb="menu"] li:hover,
-body > div[data-baseweb="layer"]  [role="option"]:hover,
-body > div[role="presentation"][data-baseweb="layer"] [data-baseweb="menu"] li:hover,
-body > div[role="presentation"][data-baseweb="layer"] [role="option"]:hover {
-  background: #f3f6ff !important;
-}
-body > div[data-baseweb="layer"]  [role="option"][aria-selected="true"],
-body > div[role="presentation"][data-baseweb="layer"] [role="option"][aria-selected="true"] {
-  background: #eef3ff !important;
-  color: #111111 !important;
-}
-
-/* Reinforce the closed control, in case theme tries to darken it */
-div[data-baseweb="select"] > div,
-div[data-baseweb="select"] * {
-  background: #ffffff !important;
-  color: #111111 !important;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# ============================ SIDEBAR: Data ============================
-with st.sidebar:
-    st.markdown("### 📊 Hyperbolic Decline")
-    # st.caption("Horizon-style dashboard for fitting from Qi to Qe.")
-    uploaded_file = st.file_uploader("📂 Upload CSV (columns: wellname, date, oil, days)", type=["csv"])
-    st.markdown("---")
-    st.markdown("#### ⚙️ Column Mapping & Bounds")
-
-# ============================ DATA LOAD ============================
-if uploaded_file:
-    @st.cache_data(show_spinner=False)
-    def load_data(file):
-        return pd.read_csv(file)
-
-    df_raw = load_data(uploaded_file)
-    df_raw.columns = df_raw.columns.str.strip().str.lower().str.replace(" ", "_")
-
-    with st.sidebar:
-        with st.container():
-            well_col = st.selectbox("🛢️ Well Column", df_raw.columns, key="well_col")
-            date_col = st.selectbox("📅 Date Column", df_raw.columns, key="date_col")
-            oil_col  = st.selectbox("🛢️ Total Oil Column", df_raw.columns, key="oil_col")
-            days_col = st.selectbox("📆 Days Column", df_raw.columns, key="days_col")
-            oil_rate_col = st.text_input("🆕 New Oil-Rate Column Name", "oil_rate", key="oil_rate_name")
-            b_min = st.number_input("🔽 Min b", value=0.00, step=0.01, key="b_min")
-            b_max = st.number_input("🔼 Max b", value=1.00, step=0.01, key="b_max")
-            submitted = st.button("✅ Apply", use_container_width=True, key="apply_btn")
-
-    if submitted:
-        df = df_raw[[well_col, date_col, oil_col, days_col]].copy()
-        df.columns = ["well", "date", "oil", "days"]
-
-        try:
-            # df["date"] = pd.to_datetime(df["date"])
-            df["date"] = pd.to_datetime(df["date"], dayfirst=True, errors='coerce')
-
-        except Exception as e:
-            st.error(f"❌ Date conversion error: {e}")
-            st.stop()
-
-        df["oil"] = pd.to_numeric(df["oil"], errors="coerce")
-        df["days"] = pd.to_numeric(df["days"], errors="coerce")
-        df[oil_rate_col] = df["oil"] / df["days"]
-
-        df = df[(df[oil_rate_col] > 0) & df[oil_rate_col].notna()]
-        df.dropna(subset=["well", "date", oil_rate_col], inplace=True)
-        df.sort_values(by=["well", "date"], inplace=True)
-
-        st.session_state.data_ready = df
-        st.session_state.b_range = (b_min, b_max)
-        st.session_state.oil_rate_col = oil_rate_col
-
-# ============================ MAIN ============================
-st.markdown("<div class='card'><h3>Main Dashboard</h3></div>", unsafe_allow_html=True)
-
-if "data_ready" not in st.session_state:
-    st.markdown("<div class='card'><h4>Welcome</h4><p>Upload a CSV from the left sidebar, map columns, and set b-bounds.</p></div>", unsafe_allow_html=True)
-    st.stop()
-
-df = st.session_state.data_ready
-b_min, b_max = st.session_state.b_range
-oil_rate_col = st.session_state.get("oil_rate_col", "oil_rate")
-wells = sorted(df["well"].unique())
-
-tab_overview, tab_single, tab_batch = st.tabs(["📈 Overview", "🛢️ Single Well Fit", "🧮 All Wells Summary"])
-
-# ============================ OVERVIEW ============================
-with tab_overview:
-    c1, c2, c3 = st.columns([1,1,1])
-    c1.markdown(f"<div class='kpi-box'><div class='kpi-label'>Total Wells</div><div class='kpi-value'>{len(wells)}</div></div>", unsafe_allow_html=True)
-    c2.markdown(f"<div class='kpi-box'><div class='kpi-label'>Records Loaded</div><div class='kpi-value'>{len(df):,}</div></div>", unsafe_allow_html=True)
-    span_days = int((df['date'].max() - df['date'].min()).days)
-    c3.markdown(f"<div class='kpi-box'><div class='kpi-label'>Time Span (days)</div><div class='kpi-value'>{span_days}</div></div>", unsafe_allow_html=True)
-
-# ============================ SINGLE WELL FIT ============================
-with tab_single:
-    # Layout tuned: left column for KPIs/table, right column for chart
-    left, right = st.columns([1.15, 1.85], gap="large")
-
-    with left:
-        st.markdown("<div class='card'><h4>Well Selection</h4>", unsafe_allow_html=True)
-        selected_well = st.selectbox("Select Well", wells, key="selected_well")
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    # Prepare series
-    wd = df[df["well"] == selected_well].copy()
-    qi_idx = wd[oil_rate_col].idxmax()
-    qi_date = wd.loc[qi_idx, "date"]
-    Qi = wd.loc[qi_idx, oil_rate_col]
-
-    before_qi = wd[wd["date"] < qi_date]
-    after_qi = wd[wd["date"] >= qi_date].copy()
-    after_qi["t_months"] = (after_qi["date"] - after_qi["date"].iloc[0]).dt.days / 30.4375
-    t_data = after_qi["t_months"].values
-    q_data = after_qi[oil_rate_col].values
-    Qe = q_data[-1]
-
-    def arps_rate(qi, di, b, t):
-        """Hyperbolic for b>0, exponential when b≈0 (safe)."""
-        if b <= 1e-10:
-            return qi * np.exp(-di * t)
-        return qi / (1 + b * di * t) ** (1.0 / b)
-
-    def loss(params):
-        di, b = params
-        if di <= 0 or not (b_min <= b <= b_max): return 1e6
-        q_pred = arps_rate(Qi, di, b, t_data)
-        if np.any(np.isnan(q_pred)) or np.any(q_pred < 0): return 1e6
-        weights = np.linspace(1, 3, len(q_data))
-        mse_log = np.mean(weights * (np.log1p(q_pred) - np.log1p(q_data))**2)
-        penalty_qe = (abs(q_pred[-1] - Qe) / max(Qe, 1)) ** 2 * 100
-        penalty_b = (max(b - 1, 0))**2 * 5
-        return mse_log + penalty_qe + penalty_b
-
-    result = differential_evolution(loss, bounds=[(1e-4, 0.6), (b_min, b_max)], seed=42)
-    di_opt, b_opt = result.x
-    q_fit = arps_rate(Qi, di_opt, b_opt, t_data)
-    qe_fit = q_fit[-1]
-    mismatch = (qe_fit - Qe) / max(Qe, 1) * 100
-
-    after_qi["fitted_rate"] = q_fit
-    after_qi["cumulative_actual_full"] = after_qi[oil_rate_col].cumsum()
-    after_qi["cumulative_fitted"] = after_qi["fitted_rate"].cumsum()
-    cum_actual_full = after_qi["cumulative_actual_full"].iloc[-1]
-    cum_fitted = after_qi["cumulative_fitted"].iloc[-1]
-    cum_delta_pct = (cum_fitted - cum_actual_full) / max(cum_actual_full, 1) * 100
-
-    # ---------- KPI GRID ----------
-    with left:
-        st.markdown("<div class='card'><h4>Fitting KPIs</h4>", unsafe_allow_html=True)
-        k1, k2, k3 = st.columns([1,1,1])
-        k4, k5, k6 = st.columns([1,1,1])
-
-        k1.markdown(f"<div class='kpi-box'><div class='kpi-label'>Qi (detected)</div><div class='kpi-value'>{Qi:.2f}<span class='kpi-unit'> STB/d</span></div></div>", unsafe_allow_html=True)
-        k2.markdown(f"<div class='kpi-box'><div class='kpi-label'>Qe (actual)</div><div class='kpi-value'>{Qe:.2f}<span class='kpi-unit'> STB/d</span></div></div>", unsafe_allow_html=True)
-        # colorize delta (green when fit <= actual, red otherwise)
-        delta_color = "#10b981" if mismatch <= 0 else "#ef4444"
-        k3.markdown(f"<div class='kpi-box'><div class='kpi-label'>Qe (fit)</div>"
-                    f"<div class='kpi-value'>{qe_fit:.2f}<span class='kpi-unit'> STB/d</span></div>"
-                    f"<div style='color:{delta_color};font-weight:700;margin-top:4px'>{mismatch:+.2f}% vs actual</div></div>", unsafe_allow_html=True)
-
-        k4.markdown(f"<div class='kpi-box'><div class='kpi-label'>Di</div><div class='kpi-value'>{di_opt:.5f}<span class='kpi-unit'> /month</span></div></div>", unsafe_allow_html=True)
-        k5.markdown(f"<div class='kpi-box'><div class='kpi-label'>b-factor</div><div class='kpi-value'>{b_opt:.3f}</div></div>", unsafe_allow_html=True)
-        cum_color = "#10b981" if cum_delta_pct <= 0 else "#ef4444"
-        k6.markdown(f"<div class='kpi-box'><div class='kpi-label'>Cum (fit)</div>"
-                    f"<div class='kpi-value'>{cum_fitted:,.0f}<span class='kpi-unit'> STB</span></div>"
-                    f"<div style='color:{cum_color};font-weight:700;margin-top:4px'>{cum_delta_pct:+.2f}% vs actual</div></div>", unsafe_allow_html=True)
-
-        # ---- Table ----
-        st.markdown("<div class='card'><h4>Decline Table</h4>", unsafe_allow_html=True)
-        tbl = after_qi[["date", oil_rate_col, "fitted_rate", "cumulative_fitted"]].rename(
-            columns={oil_rate_col: "oil_rate"}
-        ).copy()
-        tbl["date"] = tbl["date"].dt.strftime("%Y-%m-%d")
-        st.dataframe(tbl, use_container_width=True, height=360)
-        buffer = BytesIO()
-        after_qi.to_excel(buffer, index=False)
-        st.download_button("📥 Download Result (Excel)", buffer.getvalue(),
-                           file_name=f"{selected_well}_fit.xlsx", use_container_width=True)
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    # ---------- CHART (Matplotlib) ----------
-    with right:
-        st.markdown("<div class='card'><h4>Decline Curve</h4>", unsafe_allow_html=True)
-        fig, ax = plt.subplots(figsize=(10.5, 5.4), dpi=110)
-        ax.scatter(before_qi["date"], before_qi[oil_rate_col], s=26, label="Pre-Qi")
-        ax.scatter(after_qi["date"], after_qi[oil_rate_col], s=26, label="Post-Qi")
-        ax.plot(after_qi["date"], q_fit, linewidth=2.2, label="Fitted Hyperbolic")
-        ax.axvline(qi_date, linestyle="--", color="k", alpha=0.45)
-        ax.text(qi_date, ax.get_ylim()[1]*0.96, "Qi", rotation=90, va="top", ha="right")
-
-        ax.set_title(f"{selected_well} – Fit from Qi", pad=10, loc="left", color="#243B6A", fontweight="bold")
-        ax.set_xlabel("Date"); ax.set_ylabel("Rate (STB/day)")
-        ax.grid(True, linestyle="--", alpha=0.28)
-        ax.set_facecolor("white"); fig.patch.set_facecolor("white")
-        ax.legend(frameon=False, loc="upper right")
-        st.pyplot(fig)
-        st.markdown("</div>", unsafe_allow_html=True)
-
-# ============================ BATCH: ALL WELLS ============================
-with tab_batch:
-    st.markdown("<div class='card'><h4>Compute Fitting Results for All Wells</h4>", unsafe_allow_html=True)
-    run = st.button("⚙️ Compute All-Wells Fitting Table", use_container_width=True)
-    if run:
-        results = []
-        wells_all = sorted(df["well"].unique())
-        progress = st.progress(0)
-        status = st.empty()
-
-        def arps_local(qi, di, b, t):
-            if b <= 1e-10:
-                return qi * np.exp(-di * t)
-            return qi / (1 + b * di * t) ** (1.0 / b)
-
-        for i, w in enumerate(wells_all, start=1):
-            status.info(f"Processing **{w}** ({i}/{len(wells_all)}) …")
-            wdf = df[df["well"] == w].copy()
-            try:
-                qi_idx_w = wdf[oil_rate_col].idxmax()
-                qi_date_w = wdf.loc[qi_idx_w, "date"]
-                Qi_w = wdf.loc[qi_idx_w, oil_rate_col]
-
-                after = wdf[wdf["date"] >= qi_date_w].copy()
-                after["t_months"] = (after["date"] - after["date"].iloc[0]).dt.days / 30.4375
-                t_w = after["t_months"].values
-                q_w = after[oil_rate_col].values
-
-                if len(t_w) < 3:
-                    results.append({
-                        "well": w, "qi_date": qi_date_w.date(), "Qi_detected": Qi_w,
-                        "Qe_actual_last": q_w[-1] if len(q_w)>0 else np.nan,
-                        "Qe_fit": np.nan, "Mismatch_%": np.nan, "Di_per_month": np.nan,
-                        "b_factor": np.nan,
-                        "Cum_Actual_All": after[oil_rate_col].cumsum().iloc[-1] if len(q_w)>0 else np.nan,
-                        "Cum_Fitted": np.nan, "status": "insufficient data"
-                    })
-                    progress.progress(i/len(wells_all))
-                    continue
-
-                Qe_w = q_w[-1]
-
-                def loss_w(params):
-                    di, b = params
-                    if di <= 0 or not (b_min <= b <= b_max): return 1e6
-                    q_pred = arps_local(Qi_w, di, b, t_w)
-                    if np.any(np.isnan(q_pred)) or np.any(q_pred < 0): return 1e6
-                    weights = np.linspace(1, 3, len(q_w))
-                    mse_log = np.mean(weights * (np.log1p(q_pred) - np.log1p(q_w))**2)
-                    penalty_qe = (abs(q_pred[-1] - Qe_w) / max(Qe_w, 1)) ** 2 * 100
-                    penalty_b = (max(b - 1, 0))**2 * 5
-                    return mse_log + penalty_qe + penalty_b
-
-                res_w = differential_evolution(loss_w, bounds=[(1e-4, 0.6), (b_min, b_max)], seed=42)
-                di_w, b_w = res_w.x
-                q_fit_w = arps_local(Qi_w, di_w, b_w, t_w)
-                qe_fit_w = q_fit_w[-1]
-                mismatch_w = abs(qe_fit_w - Qe_w) / max(Qe_w, 1) * 100
-
-                after["fitted_rate"] = q_fit_w
-                after["cumulative_actual_full"] = after[oil_rate_col].cumsum()
-                after["cumulative_fitted"] = after["fitted_rate"].cumsum()
-
-                results.append({
-                    "well": w, "qi_date": qi_date_w.date(), "Qi_detected": Qi_w,
-                    "Qe_actual_last": Qe_w, "Qe_fit": qe_fit_w, "Mismatch_%": mismatch_w,
-                    "Di_per_month": di_w, "b_factor": b_w,
-                    "Cum_Actual_All": after["cumulative_actual_full"].iloc[-1],
-                    "Cum_Fitted": after["cumulative_fitted"].iloc[-1], "status": "ok"
-                })
-
-            except Exception as e:
-                results.append({
-                    "well": w, "qi_date": None, "Qi_detected": np.nan,
-                    "Qe_actual_last": np.nan, "Qe_fit": np.nan, "Mismatch_%": np.nan,
-                    "Di_per_month": np.nan, "b_factor": np.nan,
-                    "Cum_Actual_All": np.nan, "Cum_Fitted": np.nan,
-                    "status": f"error: {e}"
-                })
-
-            progress.progress(i/len(wells_all))
-
-        status.success("✅ Done.")
-        summary_df = pd.DataFrame(results)
-        st.markdown("<div class='card'><h4>All-Wells Fitting Summary</h4>", unsafe_allow_html=True)
-        st.dataframe(summary_df, use_container_width=True, height=420)
-
-        sum_buffer = BytesIO()
-        with pd.ExcelWriter(sum_buffer, engine="xlsxwriter") as writer:
-            summary_df.to_excel(writer, sheet_name="summary", index=False)
-        st.download_button("📥 Download Summary (Excel)", sum_buffer.getvalue(),
-                           file_name="all_wells_fitting_summary.xlsx", use_container_width=True)
-        st.markdown("</div>", unsafe_allow_html=True)
-
-
-
-
-
-
-
-
+
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from dca import engine
+from dca import export
+from dca import forecast
+from dca import ingest
+from dca import jobs
+from dca import models
+from dca import render
+from dca import rules
+from dca import typecurve
+from dca import uncertainty
+from dca.cache import DEFAULT_CACHE_DIR, FitCache
+from dca.partition import WellPartition, as_dates
+from dca.profiling import Capture, RunProfile, count_fits
+from dca.storage import is_store, open_store, write_store
+
+# per-rerun stage timers; a cProfile capture only when armed from the Diagnostics panel
+prof = RunProfile("rerun")
+capture = Capture() if st.session_state.pop("cprofile_armed", False) else None
+prof.start("css")
+
+
+import os, textwrap, pathlib
+import functools
+import base64, io
+
+THEME_TOML = textwrap.dedent("""\
+[theme]
+base = "light"
+primaryColor = "#2748d9"
+backgroundColor = "#FFFFFF"
+secondaryBackgroundColor = "#F6F8FF"
+textColor = "#1f2a44"
+""")
+
+
+@st.cache_resource(show_spinner=False)
+def ensure_config(text: str, path: str = ".streamlit/config.toml") -> bool:
+    """Write the theme config once per server process, and only if its content differs."""
+    cfg = pathlib.Path(path)
+    if cfg.is_file() and cfg.read_text(encoding="utf-8") == text:
+        return False
+    cfg.parent.mkdir(exist_ok=True)
+    cfg.write_text(text, encoding="utf-8")
+    return True
+
+ensure_config(THEME_TOML)
+
+
+@st.cache_data(show_spinner=False)
+def logo_html(path: str, mtime: float, width: int = 120, top_px: int = 64, right_px: int = 16) -> str:
+    """Fixed-position logo markup with the image inlined; rebuilt only when the file changes."""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        h = int(img.height * (width / img.width))
+        if img.format == "PNG":
+            data = pathlib.Path(path).read_bytes()  # already PNG: inline as-is
+        else:
+            buf = io.BytesIO(); img.save(buf, format="PNG"); data = buf.getvalue()
+    b64 = base64.b64encode(data).decode()
+    w = width
+    return f"""
+    <style>
+      /* place the logo below the header, aligned to the right (under "Deploy") */
+      .app-logo-fixed {{
+        position: fixed;
+        top: {top_px}px;              /* distance from top of page; increase to go lower */
+        right: {right_px}px;          /* distance from right edge; increase to move left */
+        width: {w}px;
+        height: {h}px;
+        z-index: 1000;                /* above page content */
+        pointer-events: none;         /* clicks pass through */
+      }}
+      @media (max-width: 900px) {{
+        .app-logo-fixed {{ width: {int(w*0.8)}px; right: 10px; top: {top_px+2}px; }}
+      }}
+    </style>
+    <img class="app-logo-fixed" src="data:image/png;base64,{b64}" alt="logo">
+    """
+
+
+def add_logo_below_deploy(path:str, width:int=120, top_px:int=64, right_px:int=16):
+    """Renders a logo fixed just below the header, near the Deploy menu."""
+    if os.path.isfile(path):
+        st.markdown(logo_html(path, os.path.getmtime(path), width, top_px, right_px), unsafe_allow_html=True)
+
+
+# add_logo_below_deploy("D:\mohie\R.png", width=120, top_px=64, right_px=18)
+
+add_logo_below_deploy("R.png", width=120, top_px=64, right_px=18)
+
+
+@st.cache_resource(show_spinner=False)
+def get_fit_cache():
+    """One fit cache per server process; entries are content-keyed so sessions can share it."""
+    return FitCache()
+
+fit_cache = get_fit_cache()
+
+
+@st.cache_resource(show_spinner=False)
+def get_render_cache():
+    """Rendered chart PNGs, shared by sessions; keys include the data digest and theme."""
+    return render.PngCache(maxsize=128)
+
+render_cache = get_render_cache()
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_table():
+    """Background job table; jobs outlive sessions, so every session sees the same one."""
+    return jobs.JobTable()
+
+job_table = get_job_table()
+
+
+# ============================ PAGE ============================
+st.set_page_config(page_title="Hyperbolic Decline Dashboard", layout="wide", page_icon="📉")
+
+# -------------------- Appearance Controls --------------------
+ACCENTS = {
+    "Blue":    {"accent":"#2748d9", "accentSoft":"#eef3ff"},
+    "Teal":    {"accent":"#0e8f8c", "accentSoft":"#e9fbfb"},
+    "Purple":  {"accent":"#6d28d9", "accentSoft":"#f3e9ff"},
+    "Emerald": {"accent":"#059669", "accentSoft":"#e9fbf4"},
+}
+PAD = "16px" 
+
+# if density=="Comfortable" else "10px"
+GAP = "18px" 
+
+# if density=="Comfortable" else "12px"
+
+# -------------------- THEME / CSS --------------------
+# The stylesheet is assembled once per accent (page_css) and injected as one element.
+THEME_CSS = """
+<style>
+:root {{
+  --ink:#1f2a44;
+  --muted:#6b7a99;
+  --accent:{ACCENT};
+  --accentSoft:{ACCENT_SOFT};
+  --card:#ffffff;
+  --line:#e8ecf6;
+  --pad:{PAD};
+  --gap:{GAP};
+}}
+
+html,body,[data-testid="stAppViewContainer"] * {{ color:var(--ink) !important; }}
+[data-testid="stAppViewContainer"] {{
+  background: radial-gradient(1200px 600px at 0% 0%, #e9f0ff 0%, #f6f8ff 25%, #ffffff 60%);
+}}
+[data-testid="stHeader"]{{ background:#ffffffcc; backdrop-filter:blur(6px); border-bottom:1px solid var(--line); }}
+
+/* Sidebar */
+section[data-testid="stSidebar"]{{
+  background:linear-gradient(180deg,#eef3ff 0%,#ffffff 40%);
+  border-right:1px solid var(--line);
+}}
+section[data-testid="stSidebar"] *{{ color:var(--ink) !important; }}
+
+/* Cards with header accent bar */
+.card{{
+  background:var(--card);
+  border-radius:18px;
+  padding:calc(var(--pad) + 2px) var(--pad) var(--pad) var(--pad);
+  border:1px solid var(--line);
+  box-shadow:0 8px 24px rgba(36,71,187,.08);
+  position:relative;
+  margin-bottom:var(--gap);
+}}
+.card h3,.card h4{{ margin:0 0 10px 0; color:var(--ink)!important; font-weight:800; }}
+.card::before {{
+  content:"";
+  position:absolute; left:0; top:0; height:6px; width:100%;
+  background: linear-gradient(90deg, var(--accent), rgba(39,72,217,.0) 70%);
+  border-top-left-radius:18px; border-top-right-radius:18px;
+}}
+
+/* KPI boxes */
+.kpi-box{{
+  background:#fff; border:1px solid var(--line); border-radius:14px;
+  padding:12px 14px; box-shadow:0 4px 14px rgba(36,71,187,.08);
+}}
+.kpi-box:hover{{ box-shadow:0 8px 24px rgba(36,71,187,.14); }}
+.kpi-label{{ font-size:11px; color:var(--muted); text-transform:uppercase; letter-spacing:.05em; }}
+.kpi-value{{ font-size:26px; font-weight:800; }}
+.kpi-unit{{ font-size:11px; color:var(--muted); margin-left:6px }}
+
+/* Inputs / uploader */
+input,textarea,select{{ background:#fff !important; color:var(--ink)!important; }}
+div[data-baseweb="select"]>div,div[data-baseweb="input"]>div{{ background:#fff !important; border:1px solid var(--line)!important; }}
+[data-testid="stFileUploader"] section{{ background:#fff !important; border:1px dashed #cad3eb !important; }}
+
+/* Buttons */
+.stButton>button,.stDownloadButton>button,[data-testid="baseButton-secondary"]{{
+  background:var(--accentSoft) !important; color:var(--accent) !important; border:1px solid #dbe3ff !important;
+  border-radius:12px !important; padding:.7rem 1rem !important; font-weight:700 !important; min-height:40px;
+}}
+.stButton>button:hover,.stDownloadButton>button:hover,[data-testid="baseButton-secondary"]:hover{{
+  filter:brightness(.98);
+}}
+.stForm .stButton>button{{ width:100%; }}
+
+/* Tabs */
+[role="tablist"] button{{ color: var(--muted) !important; font-weight: 600; }}
+[role="tab"][aria-selected="true"]{{ color: var(--accent) !important; border-bottom: 2px solid var(--accent) !important; }}
+
+/* DataFrame: white, legible text, subtle grid */
+[data-testid="stDataFrame"] {{
+  border:1px solid var(--line); border-radius:14px; overflow:hidden;
+  box-shadow:0 4px 14px rgba(36,71,187,.06); background:#fff;
+}}
+[data-testid="stDataFrame"] thead tr {{ background:#f6f8ff !important; color:var(--ink)!important; font-weight:700; }}
+[data-testid="stDataFrame"] tbody tr {{ background:#ffffff !important; }}
+[data-testid="stDataFrame"] * {{ color:#1f2a44 !important; }}
+
+/* Number inputs (remove dark steppers) */
+[data-testid="stNumberInput"] > div > div {{
+  background:#fff !important; border:1px solid var(--line) !important; border-radius:12px !important; overflow:hidden;
+}}
+[data-testid="stNumberInput"] input {{ background:#fff !important; color:var(--ink) !important; }}
+[data-testid="stNumberInput"] button {{
+  background:#fff !important; color:var(--accent) !important; border-left:1px solid var(--line) !important; box-shadow:none !important;
+}}
+[data-testid="stNumberInput"] button:hover {{ background:#f3f6ff !important; }}
+[data-testid="stNumberInput"] button:active{{ background:#e7edff !important; }}
+</style>
+"""
+
+OVERRIDE_CSS = """
+<style>
+/* ===== File Uploader button: force light style across Streamlit versions ===== */
+[data-testid="stFileUploader"] button,
+[data-testid="stFileUploader"] [data-testid="baseButton-secondary"],
+[data-testid="stFileUploader"] [data-testid="baseButton-primary"],
+[data-testid="stFileUploader"] [data-baseweb="button"] {
+  background: var(--accentSoft) !important;
+  color: var(--accent) !important;
+  border: 1px solid #dbe3ff !important;
+  border-radius: 12px !important;
+  box-shadow: none !important;
+}
+[data-testid="stFileUploader"] button:hover { filter: brightness(.98); }
+/* remove dark overlays/focus rings that some themes inject */
+[data-testid="stFileUploader"] button::before,
+[data-testid="stFileUploader"] button::after { content: none !important; }
+[data-testid="stFileUploader"] svg path { fill: var(--accent) !important; }
+
+/* ===== Disabled buttons (e.g., Apply before changes): keep light ===== */
+.stButton>button:disabled,
+.stDownloadButton>button:disabled,
+.stForm .stButton>button:disabled,
+button[disabled],
+[aria-disabled="true"] {
+  background: #eef1f7 !important;
+  color: #9aa8c7 !important;
+  border: 1px solid #e1e6f4 !important;
+  opacity: 1 !important;        /* prevent dark dimming */
+  box-shadow: none !important;
+}
+</style>
+
+<style>
+/* 1) File-uploader icons (cloud + document): remove dark fills */
+[data-testid="stFileUploader"] svg rect,
+[data-testid="stFileUploader"] svg circle { fill: transparent !important; }
+[data-testid="stFileUploader"] svg path { stroke: var(--accent) !important; fill: transparent !important; }
+/* keep icon size natural */
+[data-testid="stFileUploader"] svg { background: transparent !important; }
+
+/* 2) File-uploader small "remove file" pill: make it light */
+[data-testid="stFileUploader"] button[aria-label*="Remove"],
+[data-testid="stFileUploader"] button[title*="Remove"],
+[data-testid="stFileUploader"] [data-baseweb="button"][aria-label*="Remove"] {
+  background: var(--accentSoft) !important;
+  color: var(--accent) !important;
+  border: 1px solid #dbe3ff !important;
+  border-radius: 10px !important;
+  box-shadow: none !important;
+}
+[data-testid="stFileUploader"] button[aria-label*='Remove'] svg path { fill: var(--accent) !important; }
+
+/* 3) Disabled Apply button: force light even when BaseWeb overrides it */
+.stForm .stButton > button[disabled],
+.stForm .stButton > button:disabled,
+.stForm button[disabled],
+.stForm [aria-disabled="true"],
+.stForm [data-baseweb="button"][aria-disabled="true"] {
+  background: #eef1f7 !important;
+  color: #9aa8c7 !important;
+  border: 1px solid #e1e6f4 !important;
+  opacity: 1 !important;
+  box-shadow: none !important;
+}
+</style>
+
+<style>
+/* ===== Select / Dropdown ===== */
+/* Closed control */
+div[data-baseweb="select"] > div {
+  background:#ffffff !important;
+  color:#111111 !important;
+  border:1px solid var(--line) !important;
+}
+div[data-baseweb="select"] * { color:#111111 !important; }
+
+/* Opened menu (lives in a portal) */
+div[role="listbox"],
+ul[role="listbox"],
+[data-baseweb="menu"] {
+  background:#ffffff !important;
+  color:#111111 !important;
+  border:1px solid var(--line) !important;
+  box-shadow: 0 8px 24px rgba(15, 23, 42, .08) !important;
+}
+
+/* Options */
+div[role="listbox"] [role="option"],
+[data-baseweb="menu"] li {
+  background:#ffffff !important;
+  color:#111111 !important;
+}
+div[role="listbox"] [role="option"]:hover,
+[data-baseweb="menu"] li:hover {
+  background:#f3f6ff !important;       /* light hover */
+  color:#111111 !important;
+}
+div[role="listbox"] [role="option"][aria-selected="true"] {
+  background:#eef3ff !important;        /* selected */
+  color:#111111 !important;
+}
+
+/* If the select has a search input in the menu, keep it white/black */
+[data-baseweb="menu"] input,
+div[role="listbox"] input {
+  background:#ffffff !important;
+  color:#111111 !important;
+  border:1px solid var(--line) !important;
+}
+
+/* ===== DataFrame / Table ===== */
+[data-testid="stDataFrame"] {
+  background:#ffffff !important;
+  border:1px solid var(--line) !important;
+  border-radius:14px !important;
+  box-shadow:0 4px 14px rgba(36,71,187,.06) !important;
+}
+[data-testid="stDataFrame"] * {
+  color:#111111 !important;            /* black text */
+}
+[data-testid="stDataFrame"] thead tr {
+  background:#ffffff !important;       /* white header */
+  border-bottom:1px solid var(--line) !important;
+}
+[data-testid="stDataFrame"] tbody tr {
+  background:#ffffff !important;       /* white rows */
+}
+[data-testid="stDataFrame"] th, 
+[data-testid="stDataFrame"] td {
+  border-color:#e9edf7 !important;     /* subtle grid lines */
+}
+</style>
+
+<style>
+/* --- Custom icons for st.file_uploader (no f-string required) --- */
+
+/* Layout for the dropzone and file items */
+[data-testid="stFileUploader"] section { position: relative; padding-left: 68px; }
+[data-testid="stFileUploader"] ul li { position: relative; padding-left: 52px; }
+
+/* Hide default SVGs */
+[data-testid="stFileUploader"] section svg,
+[data-testid="stFileUploader"] ul li svg { display: none !important; }
+
+/* Dropzone icon (upload) */
+[data-testid="stFileUploader"] section::before {
+  content: "";
+  position: absolute; left: 18px; top: 18px;
+  width: 38px; height: 38px; border-radius: 12px;
+  background: var(--accentSoft);
+  color: var(--accent);                         /* used by SVG via currentColor */
+  background-repeat: no-repeat; background-position: center; background-size: 22px 22px;
+  box-shadow: 0 1px 3px rgba(0,0,0,.05);
+  background-image: url("data:image/svg+xml;utf8,\
+<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'>\
+<path d='M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4'/>\
+<polyline points='17 8 12 3 7 8'/>\
+<line x1='12' y1='3' x2='12' y2='15'/>\
+</svg>");
+}
+
+/* Uploaded file icon (file) */
+[data-testid="stFileUploader"] ul li::before {
+  content: "";
+  position: absolute; left: 12px; top: 8px;
+  width: 32px; height: 32px; border-radius: 10px;
+  background: var(--accentSoft);
+  color: var(--accent);
+  background-repeat: no-repeat; background-position: center; background-size: 20px 20px;
+  box-shadow: 0 1px 3px rgba(0,0,0,.05);
+  background-image: url("data:image/svg+xml;utf8,\
+<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'>\
+<path d='M14 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V8z'/>\
+<polyline points='14 2 14 8 20 8'/>\
+</svg>");
+}
+
+/* Remove button (X) */
+[data-testid="stFileUploader"] button[aria-label*="Remove"] {
+  position: relative;
+  width: 28px; height: 28px;
+  background: var(--accentSoft) !important;
+  color: var(--accent) !important;
+  border: 1px solid #dbe3ff !important;
+  border-radius: 8px !important;
+  box-shadow: none !important;
+  overflow: hidden;
+}
+[data-testid="stFileUploader"] button[aria-label*="Remove"] svg { display: none !important; }
+[data-testid="stFileUploader"] button[aria-label*="Remove"]::before {
+  content: "";
+  position: absolute; inset: 0;
+  background-repeat: no-repeat; background-position: center; background-size: 16px 16px;
+  color: var(--accent);
+  background-image: url("data:image/svg+xml;utf8,\
+<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'>\
+<line x1='18' y1='6' x2='6' y2='18'/>\
+<line x1='6' y1='6' x2='18' y2='18'/>\
+</svg>");
+}
+</style>
+
+<style>
+/* =========================
+   FINAL OVERRIDE: Apply (Submit) in forms
+   ========================= */
+
+/* 0) Nuke any dark background on wrappers around the submit button */
+.stForm .stButton,
+.stForm .stButton > div,
+.stForm .stButton > span,
+.stForm .stButton > div > div {
+  background: transparent !important;
+  box-shadow: none !important;
+  border: none !important;
+}
+
+/* 1) Style the actual control (covers button, BaseWeb div-button, role=button) */
+.stForm .stButton :is(button, [role="button"], [data-baseweb="button"]) {
+  background: var(--accentSoft) !important;
+  color: var(--accent) !important;
+  border: 1px solid #dbe3ff !important;
+  border-radius: 12px !important;
+  min-height: 40px;
+  box-shadow: none !important;
+}
+
+/* 2) Hover (enabled) */
+.stForm .stButton :is(button, [role="button"], [data-baseweb="button"]):not([disabled]):not([aria-disabled="true"]):hover {
+  filter: brightness(.98);
+}
+
+/* 3) Disabled – keep it light (no dark pill) */
+.stForm .stButton :is(button, [role="button"], [data-baseweb="button"])[disabled],
+.stForm .stButton :is(button, [role="button"], [data-baseweb="button"])[aria-disabled="true"] {
+  background: #eef1f7 !important;
+  color: #9aa8c7 !important;
+  border: 1px solid #e1e6f4 !important;
+  opacity: 1 !important;    /* avoid dim darkening */
+  box-shadow: none !important;
+}
+
+/* 4) Kill BaseWeb pseudo overlays that paint the dark background */
+.stForm .stButton :is(button, [role="button"], [data-baseweb="button"])::before,
+.stForm .stButton :is(button, [role="button"], [data-baseweb="button"])::after {
+  content: none !important;
+  background: transparent !important;
+}
+
+/* 5) Some builds wrap the label in a span with its own background—clear it too */
+.stForm .stButton :is(button, [role="button"], [data-baseweb="button"]) * {
+  background: transparent !important;
+}
+</style>
+
+<style>
+/* ===========================================
+   FINAL OVERRIDE for open Select menus (portal)
+   Works across Streamlit/BaseWeb builds 1.30–1.36
+   =========================================== */
+
+/* The portal container that hosts the open menu */
+body > div[data-baseweb="layer"],
+body > div[role="presentation"][data-baseweb="layer"],
+body > div[aria-hidden="false"][data-baseweb="layer"] {
+  color: #111111 !important;
+}
+
+/* The actual menu panel and listbox inside the portal */
+body > div[data-baseweb="layer"]  [data-baseweb="menu"],
+body > div[data-baseweb="layer"]  [role="listbox"],
+body > div[role="presentation"][data-baseweb="layer"] [data-baseweb="menu"],
+body > div[role="presentation"][data-baseweb="layer"] [role="listbox"],
+body > div[aria-hidden="false"][data-baseweb="layer"] [data-baseweb="menu"],
+body > div[aria-hidden="false"][data-baseweb="layer"] [role="listbox"] {
+  background: #ffffff !important;
+  color: #111111 !important;
+  border: 1px solid var(--line) !important;
+  box-shadow: 0 8px 24px rgba(15,23,42,.08) !important;
+}
+
+/* Make sure everything inside reads as black on white */
+body > div[data-baseweb="layer"]  [data-baseweb="menu"] *,
+body > div[data-baseweb="layer"]  [role="listbox"] *,
+body > div[role="presentation"][data-baseweb="layer"] [data-baseweb="menu"] *,
+body > div[role="presentation"][data-baseweb="layer"] [role="listbox"] * {
+  color: #111111 !important;
+  background: #ffffff !important;
+}
+
+/* Individual options + hover/selected states */
+body > div[data-baseweb="layer"]  [data-baseweb="menu"] li,
+body > div[data-baseweb="layer"]  [role="option"],
+body > div[role="presentation"][data-baseweb="layer"] [data-baseweb="menu"] li,
+body > div[role="presentation"][data-baseweb="layer"] [role="option"] {
+  background: #ffffff !important;
+  color: #111111 !important;
+}
+body > div[data-baseweb="layer"]  [data-baseweb="menu"] li:hover,
+body > div[data-baseweb="layer"]  [role="option"]:hover,
+body > div[role="presentation"][data-baseweb="layer"] [data-baseweb="menu"] li:hover,
+body > div[role="presentation"][data-baseweb="layer"] [role="option"]:hover {
+  background: #f3f6ff !important;
+}
+body > div[data-baseweb="layer"]  [role="option"][aria-selected="true"],
+body > div[role="presentation"][data-baseweb="layer"] [role="option"][aria-selected="true"] {
+  background: #eef3ff !important;
+  color: #111111 !important;
+}
+
+/* Reinforce the closed control, in case theme tries to darken it */
+div[data-baseweb="select"] > div,
+div[data-baseweb="select"] * {
+  background: #ffffff !important;
+  color: #111111 !important;
+}
+</style>
+"""
+
+
+@st.cache_data(show_spinner=False)
+def page_css(accent: str, accent_soft: str, pad: str = PAD, gap: str = GAP) -> str:
+    return THEME_CSS.format(ACCENT=accent, ACCENT_SOFT=accent_soft, PAD=pad, GAP=gap) + OVERRIDE_CSS
+
+
+def accent_colors():
+    """(accent, soft accent) of the current choice; read at draw time so fragments see a change."""
+    choice = ACCENTS[st.session_state.get("accent_choice", "Blue")]
+    return choice["accent"], choice["accentSoft"]
+
+
+@st.fragment
+def appearance():
+    """Accent picker. A change reruns only this fragment, which swaps the stylesheet and does no
+    numeric work; charts take the new accent the next time they are drawn."""
+    st.markdown("### 🎨 Appearance")
+    st.selectbox("Accent color", list(ACCENTS), key="accent_choice",
+                 help="Changes highlights, headers, and button accents.")
+    # density = st.select_slider("Density", ["Compact", "Comfortable"], value="Comfortable")
+    st.markdown(page_css(*accent_colors()), unsafe_allow_html=True)
+
+with st.sidebar:
+    appearance()
+
+prof.stop("css")
+
+
+def fragment_profile(name):
+    """Fragment decorator: a fragment-only rerun records into a profile of its own.
+
+    During a full rerun the fragment's stages go to the rerun's ``prof``. A fragment rerunning on
+    its own finds that profile finished (see ``show_diagnostics``), so it gets a fresh
+    ``RunProfile`` for the call, kept as the fragment's latest run in
+    ``st.session_state.fragment_profiles`` for the Diagnostics panel."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            global prof
+            if not prof.finished:
+                return fn(*args, **kwargs)
+            rerun_prof, prof = prof, RunProfile(f"fragment:{name}")
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.finish()
+                st.session_state.setdefault("fragment_profiles", {})[name] = prof
+                prof = rerun_prof
+        return run
+    return wrap
+
+
+def show_profile(p):
+    st.dataframe(p.table().round(4), use_container_width=True, hide_index=True)
+    if p.counters:
+        st.caption(" · ".join(f"{k}: {v:,}" for k, v in p.counters.items()))
+
+
+@st.fragment
+def fragment_timings():
+    """Latest fragment-only rerun of each fragment; Refresh redraws just this list."""
+    runs = st.session_state.get("fragment_profiles", {})
+    if st.button("🔄 Refresh fragment timings", key="fragment_refresh", use_container_width=True):
+        st.rerun(scope="fragment")
+    if not runs:
+        st.caption("No fragment-only reruns yet.")
+    for name, p in runs.items():
+        st.markdown(f"**{name}** — {p.started:%H:%M:%S} UTC, {p.elapsed() * 1e3:.0f} ms")
+        show_profile(p)
+
+
+def show_diagnostics():
+    """Sidebar panel with this rerun's stage timings, counters and the last cProfile capture,
+    plus the latest fragment-only rerun of each fragment."""
+    prof.finish()
+    if capture is not None:
+        prof.cprofile = st.session_state.last_cprofile = capture.stop()
+        st.session_state.cprofile_arm = False  # one rerun only
+    with st.sidebar.expander("🩺 Diagnostics", expanded=False):
+        show_profile(prof)
+        st.download_button("📥 Timings (JSON)", prof.to_json(), file_name="dca_profile.json",
+                           mime="application/json", use_container_width=True)
+        st.markdown("###### Fragment reruns")
+        fragment_timings()
+        if st.checkbox("🔬 cProfile the next rerun", key="cprofile_arm"):
+            st.session_state.cprofile_armed = True
+        if st.session_state.get("last_cprofile"):
+            st.code(st.session_state.last_cprofile, language=None)
+
+
+# ============================ SIDEBAR: Data ============================
+with st.sidebar:
+    st.markdown("### 📊 Hyperbolic Decline")
+    # st.caption("Horizon-style dashboard for fitting from Qi to Qe.")
+    uploaded_file = st.file_uploader("📂 Upload CSV (columns: wellname, date, oil, days)", type=["csv"])
+    st.markdown("---")
+    st.markdown("#### ⚙️ Column Mapping & Bounds")
+
+# ============================ DATA LOAD ============================
+if uploaded_file:
+    # only the header is read here; the mapped columns are ingested on Apply
+    with prof.stage("ingest"):
+        raw_columns = list(ingest.header_map(uploaded_file))
+
+    with st.sidebar:
+        with st.container():
+            well_col = st.selectbox("🛢️ Well Column", raw_columns, key="well_col")
+            date_col = st.selectbox("📅 Date Column", raw_columns, key="date_col")
+            oil_col  = st.selectbox("🛢️ Total Oil Column", raw_columns, key="oil_col")
+            days_col = st.selectbox("📆 Days Column", raw_columns, key="days_col")
+            oil_rate_col = st.text_input("🆕 New Oil-Rate Column Name", "oil_rate", key="oil_rate_name")
+            s1, s2 = st.columns(2)
+            gas_col = s1.selectbox("🔥 Gas Column", [None] + raw_columns, key="gas_col",
+                                   format_func=lambda c: "— none —" if c is None else c,
+                                   help="Optional gas volumes, fitted alongside oil with a GOR trend.")
+            water_col = s2.selectbox("💧 Water Column", [None] + raw_columns, key="water_col",
+                                     format_func=lambda c: "— none —" if c is None else c,
+                                     help="Optional water volumes, fitted alongside oil with a WOR trend.")
+            b_min = st.number_input("🔽 Min b", value=0.00, step=0.01, key="b_min")
+            b_max = st.number_input("🔼 Max b", value=1.00, step=0.01, key="b_max")
+            r1, r2 = st.columns(2)
+            min_days = r1.number_input("🧹 Min days on", min_value=0.0, value=0.0, step=1.0, key="min_days",
+                                       help="Drop months with fewer producing days (0 = keep all).")
+            outlier_k = r2.number_input("🧹 Outlier k", min_value=0.0, value=0.0, step=0.5, key="outlier_k",
+                                        help="Drop rates more than k robust std devs from their rolling "
+                                             "median within the well (0 = off).")
+            out_of_core = st.checkbox("💾 Memory-mapped storage", key="out_of_core",
+                                      help="Keep the cleaned columns in a memory-mapped file instead of "
+                                           "session memory; for datasets larger than RAM.")
+            solver = st.selectbox("🧠 Solver", ["de", "lsq"], key="solver_choice",
+                                  format_func={"de": "Differential evolution (global)",
+                                               "lsq": "Least squares, DE fallback (fast)"}.get)
+            submitted = st.button("✅ Apply", use_container_width=True, key="apply_btn")
+
+    if submitted:
+        streams = {name: c for name, c in (("gas", gas_col), ("water", water_col)) if c}
+        store_path = None
+        if out_of_core:
+            with prof.stage("ingest"):
+                key = ingest.ingest_key(uploaded_file, well_col, date_col, oil_col, days_col, oil_rate_col,
+                                        streams)
+            tag = rules.rules_tag(min_days, outlier_k)
+            store_path = os.path.join(DEFAULT_CACHE_DIR, "stores", f"{key}-{tag}" if tag else key)
+        dropped = None
+        if store_path and is_store(store_path):
+            with prof.stage("partition"):
+                part = open_store(store_path)
+        else:
+            try:
+                with prof.stage("apply_clean"):
+                    df = ingest.ingest_csv(uploaded_file, well_col, date_col, oil_col, days_col, oil_rate_col,
+                                           cache_dir=DEFAULT_CACHE_DIR, streams=streams)
+            except Exception as e:
+                st.error(f"❌ Date conversion error: {e}")
+                st.stop()
+            with prof.stage("rules"):
+                df, dropped = rules.apply_rules(df, oil_rate_col, min_days, outlier_k)
+            with prof.stage("partition"):
+                part = WellPartition(df, oil_rate_col, tuple(streams))
+                del df  # the partition's compact columns replace the cleaned frame
+                if store_path:
+                    part = write_store(part, store_path)
+        prof.count("rows", part.n_rows)
+
+        st.session_state.data_ready = part
+        st.session_state.well_index = part
+        st.session_state.b_range = (b_min, b_max)
+        st.session_state.solver = solver
+        st.session_state.pop("last_summary", None)  # prior results were fitted under the old settings
+        st.session_state.pop("batch_job", None)
+        st.query_params.pop("job", None)
+        st.session_state.oil_rate_col = oil_rate_col
+        st.session_state.rows_dropped = dropped
+
+# ============================ MAIN ============================
+st.markdown("<div class='card'><h3>Main Dashboard</h3></div>", unsafe_allow_html=True)
+
+if "data_ready" not in st.session_state:
+    st.markdown("<div class='card'><h4>Welcome</h4><p>Upload a CSV from the left sidebar, map columns, and set b-bounds.</p></div>", unsafe_allow_html=True)
+    show_diagnostics()
+    st.stop()
+
+data = st.session_state.data_ready
+b_min, b_max = st.session_state.b_range
+solver = st.session_state.get("solver", "de")
+oil_rate_col = st.session_state.get("oil_rate_col", "oil_rate")
+if "well_index" not in st.session_state:
+    with prof.stage("partition"):
+        st.session_state.well_index = data if isinstance(data, WellPartition) else WellPartition(data, oil_rate_col)
+part = st.session_state.well_index
+wells = list(part.wells)
+
+with st.sidebar.expander("🎲 Uncertainty (bootstrap)", expanded=False):
+    boot_on = st.checkbox("Enable bootstrap bands & P10/P50/P90", key="boot_on",
+                          help="Refits resampled copies of each post-Qi series; multiplies fit time by the sample count.")
+    boot_n = st.number_input("Samples per well", min_value=20, max_value=1000, value=200, step=20, key="boot_n")
+    boot_method = st.selectbox("Resampling", uncertainty.METHODS, key="boot_method",
+                               format_func={"residual": "Residuals (independent)",
+                                            "block": "Residual blocks (keeps autocorrelation)"}.get)
+    boot_block = st.number_input("Block length (months)", min_value=2, max_value=24, value=6, step=1,
+                                 key="boot_block", disabled=boot_method != "block")
+    boot_cap = st.number_input("Time cap (s)", min_value=5, max_value=3600, value=60, step=5, key="boot_cap")
+export_fmt = st.sidebar.selectbox("📦 Export format", export.FORMATS, key="export_fmt",
+                                  format_func={"xlsx": "Excel (.xlsx)", "csv": "CSV", "parquet": "Parquet"}.get)
+
+
+def download_button(label, make, stem, sheets=None):
+    """Download in the chosen format, built only when clicked (``make`` returns a frame).
+
+    ``sheets`` (a callable returning ``{sheet: frame}``) replaces ``make`` for
+    Excel so related tables land in one workbook.
+    """
+    if export_fmt == "xlsx" and sheets is not None:
+        data = lambda: export.workbook_bytes(sheets())
+    else:
+        data = lambda: export.to_bytes(make(), export_fmt)
+    st.download_button(label, data, file_name=f"{stem}.{export_fmt}", mime=export.MIME[export_fmt],
+                       on_click="ignore", use_container_width=True)
+
+
+# serial for the well on screen: a few sample chunks of one well don't repay a process pool's
+# startup; the batch job path adds the full pool
+boot_kw = dict(n_samples=int(boot_n), method=boot_method, block=int(boot_block), solver="lsq",
+               workers=1, max_seconds=float(boot_cap))
+
+def data_span():
+    """(first, last) record date of the loaded dataset, scanned once per dataset."""
+    span = st.session_state.get("data_span")
+    if span is None or span[0] is not part:
+        ends = tuple(as_dates([part.day.min(), part.day.max()])) if part.n_rows else (None, None)
+        span = st.session_state.data_span = (part, *ends)
+    return span[1:]
+
+
+def size_parts(n_bytes):
+    """(value, unit) of a byte count in the largest binary unit under 1024."""
+    for unit in ("B", "KiB", "MiB"):
+        if n_bytes < 1024:
+            return n_bytes, unit
+        n_bytes /= 1024
+    return n_bytes, "GiB"
+
+
+tab_overview, tab_single, tab_batch, tab_type = st.tabs(
+    ["📈 Overview", "🛢️ Single Well Fit", "🧮 All Wells Summary", "📐 Type Curves"])
+
+# ============================ OVERVIEW ============================
+with tab_overview:
+    first, last = data_span()
+    span_days = int((last - first) / np.timedelta64(1, "D")) if part.n_rows else 0
+    c1, c2, c3, c4 = st.columns([1,1,1,1])
+    c1.markdown(f"<div class='kpi-box'><div class='kpi-label'>Total Wells</div><div class='kpi-value'>{len(wells)}</div></div>", unsafe_allow_html=True)
+    c2.markdown(f"<div class='kpi-box'><div class='kpi-label'>Records Loaded</div><div class='kpi-value'>{part.n_rows:,}</div></div>", unsafe_allow_html=True)
+    c3.markdown(f"<div class='kpi-box'><div class='kpi-label'>Time Span (days)</div><div class='kpi-value'>{span_days}</div></div>", unsafe_allow_html=True)
+    # measured from the partition's arrays; a memory-mapped store only pages in what is read
+    mem_label = "Data Size (mapped)" if getattr(part, "path", None) else "Data in Memory"
+    mem, mem_unit = size_parts(part.nbytes)
+    c4.markdown(f"<div class='kpi-box'><div class='kpi-label'>{mem_label}</div><div class='kpi-value'>"
+                f"{mem:,.1f}<span class='kpi-unit'> {mem_unit}</span></div></div>", unsafe_allow_html=True)
+    dropped = st.session_state.get("rows_dropped")
+    if dropped and any(dropped.values()):
+        st.caption("🧹 Cleaning rules dropped " + ", ".join(f"{n:,} {rule.replace('_', ' ')} rows"
+                                                          for rule, n in dropped.items() if n))
+
+# ============================ SINGLE WELL FIT ============================
+@st.fragment
+@fragment_profile("single_well")
+def single_well_tab():
+    """Well picker, fit, KPIs, table and chart. Picking a well reruns only this fragment: one
+    well's slice, its (cached) fit and its (cached) chart; the other tabs are left as they are."""
+    accent, _ = accent_colors()
+    # Layout tuned: left column for KPIs/table, right column for chart
+    left, right = st.columns([1.15, 1.85], gap="large")
+
+    with left:
+        st.markdown("<div class='card'><h4>Well Selection</h4>", unsafe_allow_html=True)
+        selected_well = st.selectbox("Select Well", wells, key="selected_well")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    # Prepare series
+    with prof.stage("slice"):
+        qi_date, Qi, before_qi, after_qi = part.split(selected_well)
+    t_data = after_qi["t_months"].values
+    q_data = after_qi[oil_rate_col].values
+    Qe = q_data[-1]
+
+    fit_stats = {}
+    with prof.stage("fit"):
+        di_opt, b_opt, q_fit, solver_path = engine.fit_decline(t_data, q_data, Qi, b_min, b_max, solver,
+                                                               cache=fit_cache, stats=fit_stats)
+    prof.count("fits")
+    prof.count("objective_evals", fit_stats["nfev"])
+    qe_fit = q_fit[-1]
+    mismatch = (qe_fit - Qe) / max(Qe, 1) * 100
+
+    bands = None
+    if boot_on:
+        boot_key = (selected_well, b_min, b_max, solver, di_opt, b_opt, tuple(sorted(boot_kw.items())))
+        boot_store = st.session_state.setdefault("boot_single", {})
+        if boot_key not in boot_store:
+            one = pd.DataFrame({"well": [selected_well], "status": ["ok"],
+                                "Di_per_month": [di_opt], "b_factor": [b_opt]})
+            with prof.stage("bootstrap"), st.spinner("Bootstrapping …"):
+                boot_store.clear()  # keep only the well on screen
+                boot_store[boot_key] = uncertainty.bootstrap_wells(part, one, b_min, b_max, **boot_kw)[selected_well]
+        boot_draws = boot_store[boot_key]
+        prof.count("bootstrap_samples", len(boot_draws))
+        if len(boot_draws):
+            bands = uncertainty.rate_bands(Qi, t_data, boot_draws)
+
+    after_qi["fitted_rate"] = q_fit
+    after_qi["cumulative_actual_full"] = after_qi[oil_rate_col].cumsum()
+    after_qi["cumulative_fitted"] = after_qi["fitted_rate"].cumsum()
+    cum_actual_full = after_qi["cumulative_actual_full"].iloc[-1]
+    cum_fitted = after_qi["cumulative_fitted"].iloc[-1]
+    cum_delta_pct = (cum_fitted - cum_actual_full) / max(cum_actual_full, 1) * 100
+
+    # ---------- KPI GRID ----------
+    with left:
+        st.markdown("<div class='card'><h4>Fitting KPIs</h4>", unsafe_allow_html=True)
+        k1, k2, k3 = st.columns([1,1,1])
+        k4, k5, k6 = st.columns([1,1,1])
+
+        k1.markdown(f"<div class='kpi-box'><div class='kpi-label'>Qi (detected)</div><div class='kpi-value'>{Qi:.2f}<span class='kpi-unit'> STB/d</span></div></div>", unsafe_allow_html=True)
+        k2.markdown(f"<div class='kpi-box'><div class='kpi-label'>Qe (actual)</div><div class='kpi-value'>{Qe:.2f}<span class='kpi-unit'> STB/d</span></div></div>", unsafe_allow_html=True)
+        # colorize delta (green when fit <= actual, red otherwise)
+        delta_color = "#10b981" if mismatch <= 0 else "#ef4444"
+        k3.markdown(f"<div class='kpi-box'><div class='kpi-label'>Qe (fit)</div>"
+                    f"<div class='kpi-value'>{qe_fit:.2f}<span class='kpi-unit'> STB/d</span></div>"
+                    f"<div style='color:{delta_color};font-weight:700;margin-top:4px'>{mismatch:+.2f}% vs actual</div></div>", unsafe_allow_html=True)
+
+        k4.markdown(f"<div class='kpi-box'><div class='kpi-label'>Di</div><div class='kpi-value'>{di_opt:.5f}<span class='kpi-unit'> /month</span></div></div>", unsafe_allow_html=True)
+        k5.markdown(f"<div class='kpi-box'><div class='kpi-label'>b-factor</div><div class='kpi-value'>{b_opt:.3f}</div></div>", unsafe_allow_html=True)
+        cum_color = "#10b981" if cum_delta_pct <= 0 else "#ef4444"
+        k6.markdown(f"<div class='kpi-box'><div class='kpi-label'>Cum (fit)</div>"
+                    f"<div class='kpi-value'>{cum_fitted:,.0f}<span class='kpi-unit'> STB</span></div>"
+                    f"<div style='color:{cum_color};font-weight:700;margin-top:4px'>{cum_delta_pct:+.2f}% vs actual</div></div>", unsafe_allow_html=True)
+        st.caption(f"Solver path: {solver_path}")
+        if bands is not None:
+            di_p = np.percentile(boot_draws[:, 0], [10, 50, 90])
+            b_p = np.percentile(boot_draws[:, 1], [10, 50, 90])
+            st.caption(f"Bootstrap ({len(boot_draws)} samples) — Di {di_p[0]:.5f} / {di_p[1]:.5f} / {di_p[2]:.5f}, "
+                       f"b {b_p[0]:.3f} / {b_p[1]:.3f} / {b_p[2]:.3f} (10th / 50th / 90th pct.)")
+
+        # ---- Table ----
+        st.markdown("<div class='card'><h4>Decline Table</h4>", unsafe_allow_html=True)
+        with prof.stage("table"):
+            tbl = after_qi[["date", oil_rate_col, "fitted_rate", "cumulative_fitted"]].rename(
+                columns={oil_rate_col: "oil_rate"}
+            ).copy()
+            tbl["date"] = tbl["date"].dt.strftime("%Y-%m-%d")
+            st.dataframe(tbl, use_container_width=True, height=360)
+        download_button("📥 Download Result", lambda: after_qi, f"{selected_well}_fit")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    # ---------- CHART (Matplotlib) ----------
+    with right:
+        st.markdown("<div class='card'><h4>Decline Curve</h4>", unsafe_allow_html=True)
+        with prof.stage("plot"):
+            well_dates, well_rates, _, _ = part.arrays(selected_well)
+            chart_key = ("decline", selected_well, di_opt, b_opt, accent, render.digest(well_dates, well_rates),
+                         render.digest(boot_draws) if bands is not None else None)
+            png = render_cache.get_or_render(chart_key, lambda: render.decline_chart(
+                selected_well, before_qi["date"].to_numpy(), before_qi[oil_rate_col].to_numpy(),
+                after_qi["date"].to_numpy(), after_qi[oil_rate_col].to_numpy(), q_fit, qi_date,
+                accent=accent, bands=bands))
+            st.image(png, use_container_width=True)
+        st.markdown("</div>", unsafe_allow_html=True)
+
+with tab_single:
+    single_well_tab()
+
+# ---------- FORECAST & EUR / OVERLAY (closed-form, all fitted wells at once) ----------
+@st.fragment
+@fragment_profile("forecast")
+def forecast_cards(summary_df):
+    """Forecast & EUR and the multi-well overlay; their controls rerun only this fragment."""
+    highlight = st.session_state.get("selected_well")
+    accent, _ = accent_colors()
+    st.markdown("<div class='card'><h4>Forecast & EUR</h4>", unsafe_allow_html=True)
+    f1, f2 = st.columns(2)
+    q_limit = f1.number_input("🛑 Economic limit (STB/d)", min_value=0.0, value=1.0, step=0.5, key="q_limit")
+    horizon_years = f2.number_input("⏳ Horizon (years)", min_value=1, max_value=100, value=30, step=1,
+                                    key="horizon_years")
+    # every well is forecast from the latest record so the well totals and field profile agree
+    as_of = pd.Timestamp(data_span()[1])
+    with prof.stage("forecast"):
+        eur_df = forecast.forecast_wells(summary_df, q_limit, horizon_years * 12, as_of=as_of)
+        field_df = forecast.field_profile(summary_df, q_limit, horizon_years * 12, as_of=as_of)
+
+    e1, e2, e3 = st.columns(3)
+    e1.markdown(f"<div class='kpi-box'><div class='kpi-label'>Field EUR</div><div class='kpi-value'>{eur_df['EUR'].sum():,.0f}<span class='kpi-unit'> STB</span></div></div>", unsafe_allow_html=True)
+    e2.markdown(f"<div class='kpi-box'><div class='kpi-label'>Remaining</div><div class='kpi-value'>{eur_df['Remaining'].sum():,.0f}<span class='kpi-unit'> STB</span></div></div>", unsafe_allow_html=True)
+    e3.markdown(f"<div class='kpi-box'><div class='kpi-label'>Wells Forecast</div><div class='kpi-value'>{len(eur_df)}</div></div>", unsafe_allow_html=True)
+
+    with prof.stage("plot"):
+        png = render_cache.get_or_render(
+            ("field", as_of, accent, render.digest(field_df["rate"].to_numpy())),
+            lambda: render.field_chart(field_df["month"], field_df["rate"], as_of, accent))
+        st.image(png, use_container_width=True)
+    st.dataframe(eur_df, use_container_width=True, height=320)
+
+    download_button("📥 Download Forecast", lambda: eur_df, "forecast_eur",
+                    sheets=lambda: {"eur": eur_df, "field_profile": field_df})
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # ---------- MULTI-WELL OVERLAY (one broadcast evaluation of every fitted curve) ----------
+    st.markdown("<div class='card'><h4>Multi-Well Overlay</h4>", unsafe_allow_html=True)
+    o1, o2, o3 = st.columns(3)
+    ov_months = o1.number_input("Months since Qi", min_value=12, max_value=600, value=120, step=12, key="ov_months")
+    ov_max = o2.number_input("Max wells drawn", min_value=10, max_value=5000, value=500, step=50, key="ov_max")
+    ov_norm = o3.checkbox("➗ Normalize by Qi", key="ov_norm")
+    with prof.stage("plot"):
+        fitted_cols = summary_df[["well", "Qi_detected", "Di_per_month", "b_factor"]]
+        png = render_cache.get_or_render(
+            ("overlay", int(ov_months), int(ov_max), ov_norm, accent, highlight,
+             render.digest(fitted_cols["well"].astype(str).to_numpy().astype("U"),
+                           fitted_cols.drop(columns="well").to_numpy(float))),
+            lambda: render.overlay_chart(summary_df, int(ov_months), int(ov_max), ov_norm, accent,
+                                         highlight=highlight))
+        st.image(png, use_container_width=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+# ============================ BATCH: ALL WELLS ============================
+with tab_batch:
+    st.markdown("<div class='card'><h4>Compute Fitting Results for All Wells</h4>", unsafe_allow_html=True)
+    n_workers = st.number_input("🧵 Worker processes", min_value=1, max_value=engine.default_workers(),
+                                value=engine.default_workers(), step=1,
+                                help="Wells are fitted in parallel; 1 runs everything in this session.")
+    prior_summary = st.session_state.get("last_summary")
+    can_increment = prior_summary is not None and not part.streams
+    incremental = st.checkbox("♻️ Incremental: only refit wells with new data since the last run",
+                              value=can_increment, disabled=not can_increment,
+                              help="Unchanged wells keep their previous results; changed wells are "
+                                   "warm-started from their previous Di and b. Not available with "
+                                   "gas/water streams mapped.")
+    compare_on = st.checkbox("🔀 Compare decline models in the same run", key="compare_on", disabled=incremental,
+                             help="Each well is also fitted with every selected model while its data is "
+                                  "loaded, and the models are ranked per well. Full runs only.")
+    model_pick, criterion = None, "aic"
+    if compare_on and not incremental:
+        m1, m2 = st.columns([3, 1])
+        model_pick = m1.multiselect("Models", list(models.MODELS), default=list(models.DEFAULT_MODELS),
+                                    format_func=lambda name: models.MODELS[name].label, key="model_pick")
+        criterion = m2.selectbox("Criterion", models.CRITERIA, format_func=str.upper, key="model_criterion")
+    run = st.button("⚙️ Compute All-Wells Fitting Table", use_container_width=True,
+                    help="Runs as a background job: the page stays usable, and a refresh or a new "
+                         "session can pick the job up again.")
+    if run:
+        boot = dict(boot_kw, workers=engine.default_workers(),
+                    q_limit=st.session_state.get("q_limit", 1.0),
+                    horizon_months=st.session_state.get("horizon_years", 30) * 12) if boot_on else None
+        with prof.stage("job_submit"):
+            job_id = jobs.submit_fit(job_table, part, oil_rate_col, b_min, b_max, solver=solver,
+                                     workers=int(n_workers), cache_path=fit_cache.path,
+                                     prior=prior_summary if incremental else None, bootstrap=boot,
+                                     models=model_pick, criterion=criterion,
+                                     streams=tuple(part.streams) or None)
+        st.session_state.batch_job = job_id
+        st.query_params["job"] = job_id  # a refresh re-attaches through the URL
+
+    job_id = st.session_state.get("batch_job") or st.query_params.get("job")
+    if job_id and job_table.get(job_id) is None:
+        job_id = None
+    if job_id:
+        st.session_state.batch_job = job_id
+
+        @st.fragment(run_every=1.5 if job_table.status(job_id) in jobs.ACTIVE else None)
+        def job_panel():
+            job = job_table.get(job_id)
+            label = {"queued": "⏳ Queued", "running": "⚙️ Running", "cancelling": "🛑 Cancelling",
+                     "done": "✅ Done", "failed": "❌ Failed", "cancelled": "🛑 Cancelled"}[job["status"]]
+            j1, j2 = st.columns([4, 1])
+            j1.markdown(f"**Job `{job_id}`** — {label}: {job['message'] or ''}")
+            if job["status"] in jobs.ACTIVE:
+                st.progress(job["done"] / job["total"] if job["total"] else 0.0)
+                if j2.button("Cancel", key="job_cancel", use_container_width=True,
+                             disabled=job["status"] == "cancelling"):
+                    job_table.cancel(job_id)
+                    st.rerun(scope="fragment")
+            elif job["status"] == "failed":
+                st.error(job["error"] or "job failed")
+            if job["status"] in ("failed", "cancelled") and j2.button(
+                    "Resume", key="job_resume", use_container_width=True,
+                    help="Continue from the job's checkpoint; wells already fitted are kept."):
+                try:
+                    jobs.resume_job(job_table, job_id)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.rerun()  # full rerun so polling starts again
+            if job["status"] not in jobs.ACTIVE and st.session_state.get("polled_job") == job_id:
+                st.session_state.polled_job = None
+                st.rerun()  # full rerun: load the results and stop polling
+            if job["status"] in jobs.ACTIVE:
+                st.session_state.polled_job = job_id
+
+        job_panel()
+        job = job_table.get(job_id)
+        if job["status"] == "done" and st.session_state.get("loaded_job") != job_id:
+            summary_df, changelog = job_table.result(job_id)
+            st.session_state.last_summary = summary_df
+            st.session_state.last_changelog = changelog
+            st.session_state.last_comparison = job_table.comparison(job_id)
+            st.session_state.loaded_job = job_id
+            count_fits(prof, summary_df)
+            n_boot = (job["params"].get("bootstrap") or {}).get("n_samples")
+            if n_boot and "n_boot" in summary_df:
+                short = summary_df.drop_duplicates("well")["n_boot"] < n_boot
+                if short.any():
+                    st.warning(f"Time cap reached: {int(short.sum())} wells got fewer than {n_boot} "
+                               f"samples (see n_boot).")
+
+    with st.expander("🗂️ Recent jobs", expanded=False):
+        recent = job_table.list()
+        if recent.empty:
+            st.caption("No jobs yet.")
+        else:
+            shown = recent.assign(created=pd.to_datetime(recent["created"], unit="s").dt.floor("s"))
+            st.dataframe(shown[["id", "status", "done", "total", "message", "created"]],
+                         use_container_width=True, height=200, hide_index=True)
+            finished = recent.loc[recent["status"] == "done", "id"].tolist()
+            r1, r2 = st.columns([3, 1])
+            pick = r1.selectbox("Finished job", finished, key="job_pick", label_visibility="collapsed")
+            if r2.button("Load results", key="job_load", disabled=not finished, use_container_width=True):
+                st.session_state.batch_job = pick
+                st.query_params["job"] = pick
+                st.rerun()
+
+    if st.session_state.get("last_summary") is not None and job_id == st.session_state.get("loaded_job"):
+        summary_df = st.session_state.last_summary
+        changelog = st.session_state.get("last_changelog")
+        st.markdown("<div class='card'><h4>All-Wells Fitting Summary</h4>", unsafe_allow_html=True)
+        with prof.stage("table"):
+            st.dataframe(summary_df, use_container_width=True, height=420)
+            if changelog is not None:
+                st.markdown(f"**Changelog** — {len(changelog)} wells moved beyond tolerance, were added or removed")
+                st.dataframe(changelog, use_container_width=True, height=240)
+
+        download_button("📥 Download Summary", lambda: summary_df, "all_wells_fitting_summary")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        comparison = st.session_state.get("last_comparison")
+        if comparison is not None:
+            job_criterion = job_table.get(job_id)["params"].get("criterion", "aic").upper()
+            st.markdown("<div class='card'><h4>Decline Model Comparison</h4>", unsafe_allow_html=True)
+            wins = (comparison.loc[comparison["best"], "model"].value_counts()
+                    .rename_axis("model").reset_index(name="wells"))
+            wins["share_%"] = wins["wells"] / max(wins["wells"].sum(), 1) * 100
+            wins["model"] = wins["model"].map(lambda name: getattr(models.MODELS.get(name), "label", name))
+            st.caption(f"Best model per well by {job_criterion}; Δ below about 2 means the data can't "
+                       f"separate two models.")
+            st.dataframe(wins, use_container_width=True, hide_index=True)
+            with prof.stage("table"):
+                st.dataframe(comparison, use_container_width=True, height=320, hide_index=True)
+            download_button("📥 Download Comparison", lambda: comparison, "decline_model_comparison")
+            st.markdown("</div>", unsafe_allow_html=True)
+
+    # ---------- WORKBOOK, FORECAST & OVERLAY ----------
+    if st.session_state.get("last_summary") is not None:
+        summary_df = st.session_state.last_summary
+        st.download_button("📚 All-wells workbook (summary + one sheet per well)",
+                           lambda: export.all_wells_workbook(part, summary_df),
+                           file_name="all_wells_fitted_tables.xlsx", mime=export.MIME["xlsx"],
+                           on_click="ignore", use_container_width=True,
+                           help="Streamed to a temporary file when clicked; fitted curves reuse the summary's Di and b.")
+        forecast_cards(summary_df)
+
+# ============================ TYPE CURVES ============================
+@st.fragment
+@fragment_profile("type_curve")
+def type_curve_tab():
+    """Type-curve filters and results; changing a filter reruns only this tab."""
+    st.markdown("<div class='card'><h4>Type Curves (P10 / P50 / P90)</h4>", unsafe_allow_html=True)
+    tc_summary = st.session_state.get("last_summary")
+    if tc_summary is None:
+        st.info("Compute the all-wells fitting table first; type curves reuse its per-well fits.")
+    else:
+        fitted = tc_summary[tc_summary["status"] == "ok"]
+        cohorts = sorted(typecurve.cohort_labels(fitted).unique())
+        qi_dates = pd.to_datetime(fitted["qi_date"])
+        g1, g2 = st.columns(2)
+        sel_cohorts = g1.multiselect("🗓️ Qi-year cohorts", cohorts, default=cohorts, key="tc_cohorts")
+        qi_range = g2.date_input("📅 Qi date range", value=(qi_dates.min().date(), qi_dates.max().date()),
+                                 key="tc_qi_range") if len(fitted) else ()
+        g3, g4, g5 = st.columns(3)
+        tc_normalize = g3.checkbox("➗ Normalize by Qi", key="tc_normalize",
+                                   help="Percentiles of q/Qi (shape only) instead of absolute rates.")
+        tc_min_wells = g4.number_input("Min wells per month", min_value=1, value=3, step=1, key="tc_min_wells")
+        tc_max_months = g5.number_input("Max months", min_value=6, value=240, step=6, key="tc_max_months")
+
+        qi_from, qi_to = (qi_range if len(qi_range) == 2 else (None, None))
+        selected = typecurve.select_wells(tc_summary, qi_from, qi_to, sel_cohorts)
+        if len(selected) < tc_min_wells:
+            st.warning(f"Only {len(selected)} fitted wells match the filters.")
+        else:
+            with prof.stage("typecurve"):
+                tc_curves, tc_params = typecurve.build_type_curves(
+                    part, selected, b_min, b_max, solver, normalize=tc_normalize,
+                    min_wells=int(tc_min_wells), max_months=int(tc_max_months), cache=fit_cache)
+
+            with prof.stage("plot"):
+                png = render_cache.get_or_render(
+                    ("typecurve", len(selected), tc_normalize,
+                     render.digest(tc_curves.drop(columns="wells").to_numpy(float))),
+                    lambda: render.type_curve_chart(tc_curves, typecurve.PERCENTILES, len(selected), tc_normalize))
+                st.image(png, use_container_width=True)
+            st.dataframe(tc_params, use_container_width=True, hide_index=True)
+
+            download_button("📥 Download Type Curves", lambda: tc_params, "type_curves",
+                            sheets=lambda: {"parameters": tc_params, "curves": tc_curves})
+    st.markdown("</div>", unsafe_allow_html=True)
+
+with tab_type:
+    type_curve_tab()
+
+# ============================ SIDEBAR: Fit cache ============================
+with st.sidebar:
+    st.markdown("---")
+    cs = fit_cache.stats()
+    st.caption(f"🗄️ Fit cache — {cs['hits']} hits ({cs['disk_hits']} from disk) · {cs['misses']} misses")
+
+show_diagnostics()
@@ -0,0 +1 @@
+"""Benchmarks for the decline-fitting engine (``python -m benchmarks.run``)."""
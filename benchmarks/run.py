@@ -0,0 +1,281 @@
+"""Benchmark the fitting, batch, model-comparison, ingest and export paths and the dashboard's startup.
+
+    python -m benchmarks.run --wells 200 --months 24:120 --workers 4
+
+Each run appends one JSON record to ``benchmarks/history.jsonl`` (per-well fit
+latency, batch throughput, ingest/export time, peak memory and the accuracy
+guard, cold-start and rerun time) and exits non-zero when the accuracy guard fails, so a speedup that
+quietly degrades the fits cannot land unnoticed. Every timed solver variant (``--solvers``; ``de-loop``
+is DE scoring one candidate per call) is guarded.
+"""
+
+import argparse
+import datetime as dt
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import scipy
+
+from dca import engine, export
+from dca.ingest import ingest_csv
+from dca.models import fit_and_compare
+from dca.partition import WellPartition
+
+from .synthetic import sample_case, synthetic_wells
+
+HISTORY = os.path.join(os.path.dirname(__file__), "history.jsonl")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_XLSX = os.path.join(ROOT, "Sample.xlsx")
+APP = os.path.join(ROOT, "DCA_EF.py")
+
+# Accuracy guard: a fixed noisy synthetic field whose truth is known.
+GUARD_WELLS, GUARD_SEED, GUARD_NOISE = 40, 12345, 0.02
+GUARD_LIMITS = {"di_rel_err_p50": 0.03, "di_rel_err_p90": 0.08,
+                "b_abs_err_p50": 0.02, "b_abs_err_p90": 0.06}
+# Sample.xlsx's design well has b≈1.9, which the b>1 penalty deliberately pulls
+# back towards 1, so it is checked against the recorded fit, not the truth.
+SAMPLE_REFERENCE = {"Di_per_month": 0.0568, "b_factor": 1.0}
+SAMPLE_TOL = {"Di_per_month": 0.05, "b_factor": 0.05, "Mismatch_%": 1.0}
+# --solvers names -> (solver, vectorized)
+SOLVER_VARIANTS = {"de": ("de", True), "de-loop": ("de", False), "lsq": ("lsq", True)}
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _clean(production):
+    buf = io.BytesIO(production.to_csv(index=False).encode())
+    return ingest_csv(buf, "wellname", "date", "oil", "days")
+
+
+def _peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def bench_ingest(production, tmpdir):
+    path = os.path.join(tmpdir, "production.csv")
+    production.to_csv(path, index=False)
+    t0 = time.perf_counter()
+    df = ingest_csv(path, "wellname", "date", "oil", "days")
+    secs = time.perf_counter() - t0
+    return df, {"seconds": secs, "rows": len(df), "rows_per_s": len(df) / secs,
+                "csv_mb": os.path.getsize(path) / 2**20}
+
+
+def bench_single(part, variant, n):
+    solver, vectorized = SOLVER_VARIANTS[variant]
+    lat = []
+    for w in list(part.wells)[:n]:
+        dates, rates, qi, post = part.arrays(w)
+        t, q = engine.post_qi_arrays(dates, rates, post)
+        if len(t) < 3:
+            continue
+        t0 = time.perf_counter()
+        engine.fit_decline(t, q, rates[qi], 0.0, 1.0, solver, vectorized)
+        lat.append((time.perf_counter() - t0) * 1e3)
+    lat = np.array(lat)
+    return {"wells": len(lat), "ms_mean": lat.mean(), "ms_p50": np.median(lat),
+            "ms_p95": np.percentile(lat, 95)}
+
+
+def bench_batch(part, variant, workers):
+    solver, vectorized = SOLVER_VARIANTS[variant]
+    t0 = time.perf_counter()
+    summary = engine.fit_all_wells(part, part.rate_col, 0.0, 1.0, solver=solver, workers=workers,
+                                   vectorized=vectorized)
+    secs = time.perf_counter() - t0
+    return summary, {"seconds": secs, "wells": len(summary), "wells_per_s": len(summary) / secs}
+
+
+def bench_compare(part, solver, workers):
+    """Every registered model per well in one pass; synthetic wells are hyperbolic."""
+    t0 = time.perf_counter()
+    _, comparison = fit_and_compare(part, part.rate_col, 0.0, 1.0, solver=solver, workers=workers)
+    secs = time.perf_counter() - t0
+    wins = comparison.loc[comparison["best"], "model"].value_counts()
+    return {"seconds": secs, "wells_per_s": len(part) / secs, "best_aic": wins.to_dict()}
+
+
+def bench_export(summary):
+    out = {}
+    for fmt in export.FORMATS:
+        t0 = time.perf_counter()
+        data = export.to_bytes(summary, fmt)
+        out[f"{fmt}_seconds"] = time.perf_counter() - t0
+        out[f"{fmt}_kb"] = len(data) / 1024
+    return out
+
+
+# Runs in a fresh interpreter so import costs count: the welcome page (no data
+# loaded) once cold, then reruns of the same session.
+_STARTUP_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=120)
+t0 = time.perf_counter(); at.run(); t1 = time.perf_counter()
+for _ in range({reruns}):
+    at.run()
+t2 = time.perf_counter()
+print(json.dumps({{"first_run_s": t1 - t0, "rerun_s": (t2 - t1) / {reruns},
+                  "scipy_loaded": "scipy.optimize" in sys.modules,
+                  "matplotlib_loaded": "matplotlib" in sys.modules,
+                  "elements": len(at.markdown)}}))
+"""
+
+
+def bench_startup(repeats=3, reruns=5):
+    """Median cold first run and warm rerun of the dashboard's welcome page."""
+    code = _STARTUP_SCRIPT.format(root=ROOT, app=APP, reruns=reruns)
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:  # the app writes .streamlit/ into its cwd
+        logo = os.path.join(ROOT, "R.png")
+        if os.path.exists(logo):
+            with open(logo, "rb") as src, open(os.path.join(tmp, "R.png"), "wb") as dst:
+                dst.write(src.read())
+        for _ in range(repeats):
+            out = subprocess.check_output([sys.executable, "-c", code], cwd=tmp, text=True,
+                                          stderr=subprocess.DEVNULL)
+            runs.append(json.loads(out.strip().splitlines()[-1]))
+    res = {k: float(np.median([r[k] for r in runs])) for k in ("first_run_s", "rerun_s")}
+    res.update({k: runs[-1][k] for k in ("scipy_loaded", "matplotlib_loaded", "elements")})
+    return res
+
+
+def accuracy_guard(variant):
+    solver, vectorized = SOLVER_VARIANTS[variant]
+    fit = lambda df: engine.fit_all_wells(df, "oil_rate", 0.0, 1.0, solver=solver, vectorized=vectorized)
+    production, truth = synthetic_wells(GUARD_WELLS, seed=GUARD_SEED, noise=GUARD_NOISE)
+    s = fit(_clean(production)).merge(truth, on="well")
+    di_err = (s["Di_per_month"] - s["di"]).abs() / s["di"]
+    b_err = (s["b_factor"] - s["b"]).abs()
+    synth = {"di_rel_err_p50": di_err.median(), "di_rel_err_p90": di_err.quantile(0.9),
+             "b_abs_err_p50": b_err.median(), "b_abs_err_p90": b_err.quantile(0.9)}
+    failures = [k for k, lim in GUARD_LIMITS.items() if not synth[k] <= lim]
+
+    production, truth = sample_case(SAMPLE_XLSX)
+    row = fit(_clean(production)).iloc[0]
+    sample = {k: float(row[k]) for k in ("Di_per_month", "b_factor", "Mismatch_%")}
+    sample.update(true_di=float(truth.at[0, "di"]), true_b=float(truth.at[0, "b"]))
+    if abs(sample["Di_per_month"] - SAMPLE_REFERENCE["Di_per_month"]) > SAMPLE_TOL["Di_per_month"] * SAMPLE_REFERENCE["Di_per_month"]:
+        failures.append("sample_Di_per_month")
+    if abs(sample["b_factor"] - SAMPLE_REFERENCE["b_factor"]) > SAMPLE_TOL["b_factor"]:
+        failures.append("sample_b_factor")
+    if not abs(sample["Mismatch_%"]) <= SAMPLE_TOL["Mismatch_%"]:
+        failures.append("sample_Mismatch_%")
+    return {"synthetic": synth, "limits": GUARD_LIMITS, "sample": sample,
+            "failures": failures, "passed": not failures}
+
+
+def _jsonable(obj):
+    if isinstance(obj, dict):
+        return {k: _jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_jsonable(v) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--wells", type=int, default=200)
+    p.add_argument("--months", default="24:120", help="min:max post-Qi months per well")
+    p.add_argument("--b-range", default="0:1", help="min:max true b")
+    p.add_argument("--noise", type=float, default=0.03)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--workers", type=int, default=engine.default_workers())
+    p.add_argument("--solvers", default="de,lsq",
+                   help=f"comma-separated solvers to time and guard ({', '.join(SOLVER_VARIANTS)})")
+    p.add_argument("--single", type=int, default=50, help="wells timed one by one per solver")
+    p.add_argument("--history", default=HISTORY, help="JSON-lines file to append to ('' = don't)")
+    p.add_argument("--no-guard", action="store_true", help="skip the accuracy guard")
+    p.add_argument("--no-startup", action="store_true", help="skip the dashboard startup benchmark")
+    args = p.parse_args(argv)
+
+    months = tuple(int(x) for x in args.months.split(":"))
+    b_range = tuple(float(x) for x in args.b_range.split(":"))
+    solvers = [s for s in args.solvers.split(",") if s]
+    unknown = sorted(set(solvers) - set(SOLVER_VARIANTS))
+    if unknown or not solvers:
+        p.error(f"--solvers: unknown {', '.join(unknown) or '(none given)'}; choose from {', '.join(SOLVER_VARIANTS)}")
+    last_solver, last_vectorized = SOLVER_VARIANTS[solvers[-1]]
+
+    production, _ = synthetic_wells(args.wells, months=months, b_range=b_range,
+                                    noise=args.noise, seed=args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        df, results["ingest"] = bench_ingest(production, tmp)
+    t0 = time.perf_counter()
+    part = WellPartition(df, "oil_rate")
+    results["partition_seconds"] = time.perf_counter() - t0
+    results["memory"] = {"frame_bytes_per_row": df.memory_usage(deep=True).sum() / max(len(df), 1),
+                         "partition_bytes_per_row": part.nbytes / max(part.n_rows, 1)}
+
+    results["single_well"] = {s: bench_single(part, s, args.single) for s in solvers}
+    results["batch"] = {}
+    summary = None
+    for s in solvers:
+        summary, results["batch"][s] = bench_batch(part, s, args.workers)
+    results["compare"] = bench_compare(part, last_solver, args.workers)
+    results["export"] = bench_export(summary)
+    if not args.no_startup:
+        results["startup"] = bench_startup()
+
+    sub = WellPartition(df[df["well"].isin(list(part.wells)[:min(len(part), 50)])], "oil_rate")
+    results["peak_mb"] = {
+        "ingest": _peak_mb(lambda: _clean(production)),
+        "batch_serial_50_wells": _peak_mb(lambda: engine.fit_all_wells(sub, "oil_rate", 0.0, 1.0,
+                                                                       solver=last_solver,
+                                                                       vectorized=last_vectorized)),
+        "process_max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+    record = {
+        "timestamp": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        "git_rev": _git_rev(), "host": platform.node(), "python": platform.python_version(),
+        "numpy": np.__version__, "scipy": scipy.__version__, "pandas": pd.__version__,
+        "cpus": os.cpu_count(),
+        "params": {"wells": args.wells, "months": months, "b_range": b_range, "noise": args.noise,
+                   "seed": args.seed, "workers": args.workers, "rows": len(df)},
+        "results": results,
+    }
+    if not args.no_guard:
+        guards = {s: accuracy_guard(s) for s in solvers}
+        record["accuracy"] = {"solvers": guards, "passed": all(g["passed"] for g in guards.values()),
+                              "failures": [f"{s}:{k}" for s, g in guards.items() for k in g["failures"]]}
+    record = _jsonable(record)
+
+    print(json.dumps(record, indent=2))
+    if args.history:
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    if not args.no_guard and not record["accuracy"]["passed"]:
+        print(f"ACCURACY GUARD FAILED: {record['accuracy']['failures']}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
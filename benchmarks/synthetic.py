@@ -0,0 +1,68 @@
+"""Synthetic Arps wells with known (Qi, Di, b) for benchmarks and accuracy checks."""
+
+import numpy as np
+import pandas as pd
+
+from dca.engine import DAYS_PER_MONTH, arps_rate
+
+
+def synthetic_wells(n_wells=100, months=(24, 120), b_range=(0.0, 1.0), di_range=(0.02, 0.3),
+                    qi_range=(50.0, 1000.0), noise=0.03, ramp=3, seed=0, start="2015-01-01"):
+    """Monthly production for ``n_wells`` hyperbolic wells plus their true parameters.
+
+    Each well ramps up for ``ramp`` months, peaks at Qi and then follows
+    ``arps_rate`` with log-normal noise of sigma ``noise`` (kept below Qi so
+    the peak is always detected where it was placed). Returns
+    ``(production, truth)``: production has the dashboard's upload columns
+    (wellname, date as dd/mm/yyyy, oil volume, days); truth has well, qi, di,
+    b and months.
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(start)
+    frames, truth = [], []
+    for k in range(n_wells):
+        n = int(rng.integers(months[0], months[1] + 1))
+        qi = rng.uniform(*qi_range)
+        di = rng.uniform(*di_range)
+        b = rng.uniform(*b_range)
+        first = start + pd.DateOffset(months=int(rng.integers(0, 36)))
+        dates = pd.date_range(first, periods=n + ramp, freq="MS")
+
+        t = (dates[ramp:] - dates[ramp]).days.to_numpy() / DAYS_PER_MONTH
+        q = arps_rate(qi, di, b, t) * np.exp(rng.normal(0.0, noise, n))
+        q[0] = qi
+        q[1:] = np.minimum(q[1:], qi * 0.999)
+        q = np.concatenate([qi * np.linspace(0.3, 0.9, ramp), q]) if ramp else q
+
+        days = dates.days_in_month.to_numpy().astype(float)
+        name = f"SYN-{k:05d}"
+        frames.append(pd.DataFrame({"wellname": name, "date": dates.strftime("%d/%m/%Y"),
+                                    "oil": q * days, "days": days}))
+        truth.append({"well": name, "qi": qi, "di": di, "b": b, "months": n})
+    return pd.concat(frames, ignore_index=True), pd.DataFrame(truth)
+
+
+def sample_case(path="Sample.xlsx", noise=0.0, seed=0):
+    """One well built from the bundled ``Sample.xlsx`` design row.
+
+    The sheet gives Qi, Qe, a horizon in months and an effective monthly
+    decline. b is solved so the hyperbolic (with the effective-to-nominal
+    conversion Di = ((1 - De)^-b - 1) / b) reaches Qe at the horizon.
+    """
+    from scipy.optimize import brentq
+
+    row = pd.read_excel(path).iloc[0]
+    qi, qe, horizon, de = float(row["Qi"]), float(row["Qe"]), int(row["t, months"]), float(row["Di Mon Eff"])
+    nominal = lambda b: ((1 - de) ** (-b) - 1) / b
+    b = brentq(lambda b: arps_rate(qi, nominal(b), b, horizon) - qe, 1e-3, 5.0)
+    di = nominal(b)
+
+    dates = pd.date_range(pd.Timestamp(row["Start date"]).normalize(), periods=horizon + 1, freq="MS")
+    t = (dates - dates[0]).days.to_numpy() / DAYS_PER_MONTH
+    q = arps_rate(qi, di, b, t) * np.exp(np.random.default_rng(seed).normal(0.0, noise, len(t)))
+    q[0] = qi
+    q[1:] = np.minimum(q[1:], qi * 0.999)
+    days = dates.days_in_month.to_numpy().astype(float)
+    name = str(row["Well Name"])
+    prod = pd.DataFrame({"wellname": name, "date": dates.strftime("%d/%m/%Y"), "oil": q * days, "days": days})
+    return prod, pd.DataFrame([{"well": name, "qi": qi, "di": di, "b": b, "months": horizon}])
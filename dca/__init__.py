@@ -0,0 +1,15 @@
+"""Decline-curve analysis engine behind the Hyperbolic Decline Dashboard."""
+
+from .engine import (
+    DAYS_PER_MONTH, SOLVERS,
+    arps_rate, arps_jacobian, make_loss, make_vectorized_loss, make_residuals, fit_decline,
+    read_production, normalize_columns, clean_production, split_at_qi, post_qi_arrays,
+    fit_well_row, iter_fit_rows, fit_all_wells, default_workers,
+)
+from .partition import WellPartition
+from .incremental import incremental_fit
+from .checkpoint import stream_fit, checkpointed_fit
+from .forecast import arps_cum, time_to_rate, forecast_wells, field_profile
+from .models import MODELS, DeclineModel, register_model, fit_model, rank_models, fit_and_compare
+from .streams import STREAMS, fit_streams
+from .typecurve import align_wells, percentile_curves, build_type_curves
@@ -0,0 +1,110 @@
+"""Fit-result cache keyed by series content and fit settings.
+
+An in-memory LRU sits in front of a SQLite file, so refitting a well that was
+already seen — in this session, another session or before a restart — is a
+lookup. Keys hash the post-Qi (t, q) arrays, Qi, the b-bounds, the solver,
+the warm start when there is one (it can change which optimum a solver lands
+in) and ``engine.FIT_VERSION``; bump that constant whenever the objective
+changes.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.environ.get("DCA_CACHE_DIR", ".dca_cache")
+
+
+def fit_key(t, q, qi, b_min, b_max, solver, vectorized, version, x0=None):
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(t, dtype=np.float64).tobytes())
+    h.update(b"|")
+    h.update(np.ascontiguousarray(q, dtype=np.float64).tobytes())
+    settings = (float(qi), float(b_min), float(b_max), solver, bool(vectorized), version)
+    if x0 is not None:  # cold-start keys are unchanged
+        settings += (tuple(float(v) for v in x0),)
+    h.update(repr(settings).encode())
+    return h.hexdigest()
+
+
+class FitCache:
+    """LRU + SQLite store of ``key -> (di, b, path)``. Safe to share across threads.
+
+    Pickles as just its settings, so process-pool workers reopen the same
+    SQLite file rather than copying the in-memory entries.
+    """
+
+    def __init__(self, path=None, maxsize=4096):
+        self.path = path if path is not None else os.path.join(DEFAULT_CACHE_DIR, "fits.sqlite")
+        self.maxsize = maxsize
+        self._init_state()
+
+    def _init_state(self):
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = self.disk_hits = self.misses = 0
+
+    def __getstate__(self):
+        return {"path": self.path, "maxsize": self.maxsize}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
+
+    def _db(self):
+        if self._conn is None and self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fits (key TEXT PRIMARY KEY, di REAL, b REAL, path TEXT)")
+        return self._conn
+
+    def _remember(self, key, value):
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.maxsize:
+            self._mem.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return self._mem[key]
+            db = self._db()
+            row = db.execute("SELECT di, b, path FROM fits WHERE key = ?", (key,)).fetchone() if db else None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, row)
+            return row
+
+    def put(self, key, value):
+        di, b, path = value
+        value = (float(di), float(b), path)
+        with self._lock:
+            self._remember(key, value)
+            db = self._db()
+            if db:
+                db.execute("INSERT OR REPLACE INTO fits VALUES (?, ?, ?, ?)", (key, *value))
+                db.commit()
+
+    def stats(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "in_memory": len(self._mem)}
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            db = self._db()
+            if db:
+                db.execute("DELETE FROM fits")
+                db.commit()
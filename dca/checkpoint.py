@@ -0,0 +1,270 @@
+"""Checkpointed, memory-bounded all-wells fits streamed to an on-disk sink.
+
+``stream_fit`` is a generator over fitted wells. Each summary row, and
+optionally the well's fitted post-Qi series, goes into a SQLite file in small
+transactions. If the run is stopped, whether by a crash, a cancelled job or
+a closed generator, at most one unflushed batch is lost, and rerunning with
+the same file skips every well already fitted; wells whose fit raised an
+error are tried again. The file also records the fit settings and a digest
+of the wells' data (``WellPartition.digest``), so resuming under different
+b-bounds, another solver or on changed data is refused instead of mixing
+results.
+
+Peak memory is bounded by ``memory_mb``. With ``models`` each well's model-comparison rows (see
+``models``), and with ``streams`` its gas/water fits (see ``streams``), are
+stored next to its summary row. The budget caps how many wells wait
+in the process pool, since their series are pickled into the queue, and
+sets how much buffered output triggers a flush. The summary is only
+assembled at the end, when ``summary()`` reads it back.
+"""
+
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from .engine import SUMMARY_COLUMNS, arps_rate, iter_fit_rows, post_qi_arrays
+from .models import COMPARE_COLUMNS
+from .streams import STREAM_ROW_COLUMNS
+
+SERIES_COLUMNS = ["well", "date", "oil_rate", "fitted_rate"]
+FLUSH_ROWS = 200  # summary rows per transaction at most
+DEFAULT_MEMORY_MB = 256
+ROW_BYTES = 1024  # rough size of one buffered summary row
+POINT_BYTES = 16  # one (date, rate) pair queued for a worker
+SERIES_POINT_BYTES = 48  # one buffered (well, date, rate, fitted) tuple
+_DATE_COLUMNS = ("qi_date", "last_date")
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _value(v):
+    if v is None:
+        return None
+    if hasattr(v, "isoformat"):
+        return v.isoformat()
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, float) and not np.isfinite(v):
+        return None
+    return v
+
+
+class CheckpointSink:
+    """SQLite file of finished summary rows (and optional fitted series) for one run."""
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        cols = ", ".join(_quote(c) for c in SUMMARY_COLUMNS)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS summary ({cols}, PRIMARY KEY (well))")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS series (well, day INTEGER, oil_rate REAL, "
+                               "fitted_rate REAL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS series_well ON series (well)")
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS models "
+                               f"({', '.join(_quote(c) for c in COMPARE_COLUMNS)})")
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS streams "
+                               f"({', '.join(_quote(c) for c in STREAM_ROW_COLUMNS)}, PRIMARY KEY (well, stream))")
+
+    def close(self):
+        self._conn.close()
+
+    def clear(self):
+        with self._conn:
+            for table in ("meta", "summary", "series", "models", "streams"):
+                self._conn.execute(f"DELETE FROM {table}")
+
+    def check_settings(self, settings):
+        """Record the run's settings, or refuse if the file holds a run with other settings."""
+        value = json.dumps(settings, sort_keys=True)
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'settings'").fetchone()
+        if row is None:
+            with self._conn:
+                self._conn.execute("INSERT INTO meta VALUES ('settings', ?)", (value,))
+        elif row[0] != value:
+            raise ValueError(f"checkpoint {self.path} was written with different settings "
+                             f"({row[0]}); use a new file or start over without resume")
+
+    def done_wells(self):
+        """Wells with a stored row, except those whose fit raised an error (retried on resume)."""
+        return {w for (w,) in self._conn.execute("SELECT well FROM summary WHERE status NOT LIKE 'error%'")}
+
+    def append(self, rows, series=()):
+        """Write a batch of summary rows, their model and stream rows and their series in one transaction."""
+        marks = ", ".join("?" * len(SUMMARY_COLUMNS))
+        model_marks = ", ".join("?" * len(COMPARE_COLUMNS))
+        stream_marks = ", ".join("?" * len(STREAM_ROW_COLUMNS))
+        with self._conn:
+            self._conn.executemany(f"INSERT OR REPLACE INTO summary VALUES ({marks})",
+                                   [[_value(r[c]) for c in SUMMARY_COLUMNS] for r in rows])
+            for r in rows:
+                if "models" in r:
+                    self._conn.execute("DELETE FROM models WHERE well = ?", (r["well"],))
+                    self._conn.executemany(f"INSERT INTO models VALUES ({model_marks})",
+                                           [[_value({"well": r["well"], **m}.get(c)) for c in COMPARE_COLUMNS]
+                                            for m in r["models"]])
+            self._conn.executemany(f"INSERT OR REPLACE INTO streams VALUES ({stream_marks})",
+                                   [[_value({**sr, "well": r["well"], "stream": s}[c]) for c in STREAM_ROW_COLUMNS]
+                                    for r in rows for s, sr in r.get("streams", {}).items()])
+            for well, day, q, q_fit in series:
+                self._conn.execute("DELETE FROM series WHERE well = ?", (well,))
+                self._conn.executemany("INSERT INTO series VALUES (?, ?, ?, ?)",
+                                       zip([well] * len(day), day.tolist(), q.tolist(), q_fit.tolist()))
+
+    def summary(self, order=None):
+        """The stored rows as a summary frame; only the wells of ``order`` (a well sequence), in
+        that order, when given."""
+        df = pd.read_sql_query("SELECT * FROM summary", self._conn)
+        for c in _DATE_COLUMNS:
+            df[c] = pd.to_datetime(df[c]).dt.date
+        return _in_order(df, order).reindex(columns=SUMMARY_COLUMNS)
+
+    def comparison(self, order=None):
+        """The stored model-comparison rows (``models.COMPARE_COLUMNS``), unranked."""
+        df = pd.read_sql_query("SELECT * FROM models ORDER BY rowid", self._conn)
+        return _in_order(df, order).reindex(columns=COMPARE_COLUMNS)
+
+    def stream_rows(self, order=None):
+        """The stored per-stream fits as a long frame of ``streams.STREAM_ROW_COLUMNS``."""
+        df = pd.read_sql_query("SELECT * FROM streams ORDER BY rowid", self._conn)
+        df["qi_date"] = pd.to_datetime(df["qi_date"]).dt.date
+        return _in_order(df, order).reindex(columns=STREAM_ROW_COLUMNS)
+
+    def iter_series(self, wells_per_chunk=500):
+        """Stored fitted series as frames of ``SERIES_COLUMNS``, a few hundred wells at a time."""
+        wells = [w for (w,) in self._conn.execute("SELECT DISTINCT well FROM series ORDER BY rowid")]
+        for lo in range(0, len(wells), wells_per_chunk):
+            chunk = wells[lo:lo + wells_per_chunk]
+            df = pd.read_sql_query(
+                f"SELECT * FROM series WHERE well IN ({', '.join('?' * len(chunk))}) ORDER BY rowid",
+                self._conn, params=chunk)
+            df["day"] = df["day"].to_numpy(np.int64).astype("datetime64[D]").astype("datetime64[ns]")
+            yield df.rename(columns={"day": "date"})[SERIES_COLUMNS]
+
+    def write_series(self, path):
+        """Stream the fitted series to a Parquet file without loading them all at once."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for df in self.iter_series():
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            pd.DataFrame(columns=SERIES_COLUMNS).to_parquet(path, index=False)
+        return path
+
+
+def _in_order(df, order):
+    """Rows of the wells in ``order``, sorted into that order (stable within a well)."""
+    if order is None:
+        return df
+    rank = df["well"].map({w: i for i, w in enumerate(order)})
+    keep = rank.notna()
+    return df[keep].iloc[np.argsort(rank[keep].to_numpy(), kind="stable")].reset_index(drop=True)
+
+
+def fitted_series(part, row):
+    """(well, day numbers, rates, fitted rates) of one fitted summary row."""
+    dates, rates, qi, post = part.arrays(row["well"])
+    t, q = post_qi_arrays(dates, rates, post, part.times(row["well"]))
+    q_fit = arps_rate(rates[qi], row["Di_per_month"], row["b_factor"], t)
+    day = np.asarray(dates[post:]).astype("datetime64[D]").astype(np.int64)
+    return row["well"], day, np.asarray(q, dtype=float), np.asarray(q_fit, dtype=float)
+
+
+def plan_memory(part, wells, workers, memory_mb=DEFAULT_MEMORY_MB):
+    """(max wells queued in the pool, buffered bytes per flush) for a ``memory_mb`` budget.
+
+    Half the budget goes to the pool queue, sized by the longest well, and a
+    quarter to buffered output; the rest is headroom for the summary itself.
+    """
+    budget = memory_mb * 2 ** 20
+    lengths = part.lengths()[part.rows(wells)] if len(wells) else np.zeros(1, dtype=np.int64)
+    longest = max(int(lengths.max()), 1)
+    inflight = max(2 * workers, int(budget // 2 // (longest * POINT_BYTES)))
+    return inflight, budget // 4
+
+
+def stream_fit(part, sink, b_min, b_max, solver="de", workers=1, vectorized=True, cache=None,
+               series=False, memory_mb=DEFAULT_MEMORY_MB, resume=True, models=None, streams=None, wells=None):
+    """Fit every well of ``part`` (or of ``wells``) not yet in ``sink``; yields ``(done, total, row)``.
+
+    Rows (and with ``series`` the fitted post-Qi rates) are flushed to the
+    sink every ``FLUSH_ROWS`` wells or when the buffer reaches its share of
+    ``memory_mb``, and once more when the generator stops for any reason.
+    ``resume=False`` empties the sink first. ``models`` (registry names) also
+    stores each well's model comparison; read it back with ``sink.comparison()``.
+    ``streams`` (names of ``part.streams``) stores each well's stream fits for
+    ``sink.stream_rows()``. ``wells`` limits the run to a subset of
+    ``part``, such as one shard's wells (see ``shards``). The settings
+    record a digest of the fitted wells' data, so a sink filled from other
+    data is refused.
+    """
+    if not resume:
+        sink.clear()
+    wells = part.wells if wells is None else wells
+    settings = {"rate_col": part.rate_col, "b_min": float(b_min), "b_max": float(b_max),
+                "solver": solver, "vectorized": bool(vectorized),
+                "data": part.digest(wells, streams or ())}
+    if models:
+        settings["models"] = list(models)
+    if streams:
+        settings["streams"] = list(streams)
+    sink.check_settings(settings)
+    done = sink.done_wells()
+    todo = [w for w in wells if w not in done]
+    total, i = len(wells), len(wells) - len(todo)
+    inflight, flush_bytes = plan_memory(part, todo, workers, memory_mb)
+    rows = iter_fit_rows(part, b_min, b_max, wells=todo, workers=workers, solver=solver,
+                         vectorized=vectorized, cache=cache, max_inflight=inflight, models=models,
+                         streams=streams)
+    buf, buf_series, buffered = [], [], 0
+    try:
+        for row in rows:
+            buf.append(row)
+            buffered += ROW_BYTES * (1 + len(row.get("models", ())) + len(row.get("streams", ())))
+            if series and row["status"] == "ok":
+                buf_series.append(fitted_series(part, row))
+                buffered += len(buf_series[-1][1]) * SERIES_POINT_BYTES
+            if len(buf) >= FLUSH_ROWS or buffered >= flush_bytes:
+                sink.append(buf, buf_series)
+                buf, buf_series, buffered = [], [], 0
+            i += 1
+            yield i, total, row
+    finally:
+        rows.close()
+        if buf:  # keep every finished well, also when stopping early
+            sink.append(buf, buf_series)
+
+
+def checkpointed_fit(part, path, b_min, b_max, progress=None, **kw):
+    """Run ``stream_fit`` into the checkpoint file at ``path`` and return the full summary.
+
+    ``progress(i, n, well)`` is called after each well; wells restored from
+    the checkpoint count as done from the start. The summary holds the
+    fitted wells only (``wells`` when given), in ``part`` order.
+    """
+    sink = CheckpointSink(path)
+    wells = kw.get("wells")
+    try:
+        for i, n, row in stream_fit(part, sink, b_min, b_max, **kw):
+            if progress is not None:
+                progress(i, n, row["well"])
+        return sink.summary(order=part.wells if wells is None else wells)
+    finally:
+        sink.close()
@@ -0,0 +1,388 @@
+"""Command-line entry point: ``python -m dca fit production.csv -o summary.xlsx``."""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from . import engine
+from .cache import FitCache
+from .checkpoint import DEFAULT_MEMORY_MB, CheckpointSink, stream_fit
+from .export import all_wells_workbook, write_workbook
+from .forecast import field_profile, forecast_wells
+from .incremental import incremental_fit
+from .jobs import JobTable, resume_job
+from .models import CRITERIA, DEFAULT_MODELS, MODELS, fit_and_compare, rank_models
+from .ingest import ingest_csv
+from .partition import WellPartition
+from .profiling import RunProfile, count_fits
+from .rules import apply_rules
+from .shards import ShardQueue, run_settings, run_shard
+from .streams import fit_streams, widen
+from .storage import is_store, open_store, write_store
+from .uncertainty import METHODS, bootstrap_wells, uncertainty_table, with_uncertainty
+
+
+def write_table(df, path):
+    """Write a table as .xlsx, .parquet or .csv depending on the extension."""
+    path = str(path)
+    low = path.lower()
+    if low.endswith(".xlsx"):
+        write_workbook(path, {"summary": df})
+    elif low.endswith((".parquet", ".pq")):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def add_column_args(p):
+    p.add_argument("input", help="production table (.csv or .parquet) or a store directory")
+    p.add_argument("--well-col", default="wellname")
+    p.add_argument("--date-col", default="date")
+    p.add_argument("--oil-col", default="oil")
+    p.add_argument("--days-col", default="days")
+    p.add_argument("--rate-col", default="oil_rate", help="name of the derived rate column")
+    p.add_argument("--cache-dir", default=None,
+                   help="reuse/store fits and parsed CSVs under DIR (off by default)")
+    p.add_argument("--min-days", type=float, default=None,
+                   help="drop months with fewer producing days than this")
+    p.add_argument("--outlier-k", type=float, default=None,
+                   help="drop rates more than K robust std devs from their rolling median")
+    p.add_argument("--gas-col", default=None, help="gas volume column; fits a gas stream and GOR trend")
+    p.add_argument("--water-col", default=None, help="water volume column; fits a water stream and WOR trend")
+
+
+def add_fit_args(p):
+    p.add_argument("--b-min", type=float, default=0.0)
+    p.add_argument("--b-max", type=float, default=1.0)
+    p.add_argument("--solver", choices=engine.SOLVERS, default="de",
+                   help="de = global differential evolution; lsq = local least squares, DE fallback")
+    p.add_argument("--no-vectorize", dest="vectorized", action="store_false",
+                   help="score DE candidates one at a time (legacy immediate updating)")
+
+
+def stream_map(args):
+    return {name: col for name, col in (("gas", args.gas_col), ("water", args.water_col)) if col}
+
+
+def load_partition(args):
+    """The cleaned input as a ``WellPartition`` with the mapped streams (a store as is)."""
+    df = load_clean(args)
+    if isinstance(df, WellPartition):
+        return df
+    return WellPartition(df, args.rate_col, tuple(stream_map(args)))
+
+
+def load_clean(args):
+    if is_store(args.input):
+        return open_store(args.input)
+    streams = stream_map(args)
+    if not str(args.input).lower().endswith((".parquet", ".pq")):
+        df = ingest_csv(args.input, args.well_col, args.date_col, args.oil_col, args.days_col,
+                        args.rate_col, cache_dir=args.cache_dir, streams=streams)
+    else:
+        df_raw = engine.normalize_columns(engine.read_production(args.input))
+        df = engine.clean_production(df_raw, args.well_col, args.date_col,
+                                     args.oil_col, args.days_col, args.rate_col, streams)
+    df, dropped = apply_rules(df, args.rate_col, args.min_days, args.outlier_k)
+    if any(dropped.values()):
+        print("Dropped " + ", ".join(f"{n} {rule} rows" for rule, n in dropped.items()), file=sys.stderr)
+    return df
+
+
+def open_cache(args):
+    if not args.cache_dir:
+        return None
+    return FitCache(os.path.join(args.cache_dir, "fits.sqlite"))
+
+
+def read_table(path):
+    path = str(path)
+    if path.lower().endswith(".xlsx"):
+        return pd.read_excel(path)
+    return engine.read_production(path)
+
+
+def model_list(text):
+    names = DEFAULT_MODELS if text == "all" else tuple(n.strip() for n in text.split(",") if n.strip())
+    unknown = [n for n in names if n not in MODELS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown models {unknown}; choose from {', '.join(MODELS)}")
+    return names
+
+
+def cmd_fit(args):
+    models = args.models if args.compare_models else None
+    comparison = None
+    prof = RunProfile("fit")
+    with prof.stage("ingest"):
+        df = load_clean(args)
+
+    def report(i, n, well):
+        if not args.quiet:
+            print(f"[{i}/{n}] {well}", file=sys.stderr)
+
+    fit_kw = dict(progress=report, workers=args.workers, solver=args.solver,
+                  vectorized=args.vectorized, cache=open_cache(args))
+    with prof.stage("partition"):
+        part = df if isinstance(df, WellPartition) else WellPartition(df, args.rate_col, tuple(stream_map(args)))
+    streams = tuple(part.streams)
+    if (models or streams) and args.prior:
+        raise SystemExit("--compare-models and gas/water streams need a full run; drop --prior")
+    if args.prior:
+        with prof.stage("fit"):
+            summary, changelog = incremental_fit(part, read_table(args.prior), args.rate_col,
+                                                 args.b_min, args.b_max, tol_di=args.tol_di,
+                                                 tol_b=args.tol_b, **fit_kw)
+        if args.changelog:
+            write_table(changelog, args.changelog)
+        print(f"Incremental run: {len(changelog)} wells changed beyond tolerance")
+    elif args.checkpoint:
+        sink = CheckpointSink(args.checkpoint)
+        with prof.stage("fit"):
+            for i, n, row in stream_fit(part, sink, args.b_min, args.b_max, solver=args.solver,
+                                        workers=args.workers, vectorized=args.vectorized,
+                                        cache=fit_kw["cache"], series=bool(args.series),
+                                        memory_mb=args.memory_mb, resume=not args.restart, models=models,
+                                        streams=streams):
+                report(i, n, row["well"])
+            summary = sink.summary(order=part.wells)
+            if models:
+                comparison = rank_models(sink.comparison(order=part.wells), args.criterion)
+            if streams:
+                summary = widen(summary, sink.stream_rows(order=part.wells), part, streams)
+        if args.series:
+            with prof.stage("export"):
+                sink.write_series(args.series)
+        sink.close()
+    elif models:
+        with prof.stage("fit"):
+            summary, comparison = fit_and_compare(part, args.rate_col, args.b_min, args.b_max, models,
+                                                  args.criterion, streams=streams, **fit_kw)
+    elif streams:
+        with prof.stage("fit"):
+            summary = fit_streams(part, args.rate_col, args.b_min, args.b_max, streams, **fit_kw)
+    else:
+        with prof.stage("fit"):
+            summary = engine.fit_all_wells(part, args.rate_col, args.b_min, args.b_max, **fit_kw)
+    count_fits(prof, summary)
+    if args.bootstrap:
+        with prof.stage("bootstrap"):
+            draws = bootstrap_wells(part, summary, args.b_min, args.b_max, n_samples=args.bootstrap,
+                                    method=args.boot_method, workers=args.workers,
+                                    max_seconds=args.boot_seconds)
+            summary = with_uncertainty(summary, uncertainty_table(summary, draws))
+    with prof.stage("export"):
+        write_table(summary, args.output)
+        if comparison is not None:
+            write_table(comparison, args.compare_models)
+        if args.wells_workbook:
+            all_wells_workbook(part, summary, args.wells_workbook)
+    if args.profile:
+        with open(args.profile, "w", encoding="utf-8") as f:
+            f.write(prof.to_json())
+    n_ok = int((summary["status"] == "ok").sum())
+    print(f"Fitted {n_ok}/{len(summary)} wells -> {args.output}")
+    if comparison is not None:
+        wins = comparison.loc[comparison["best"], "model"].value_counts()
+        print(f"Best model by {args.criterion.upper()}: "
+              + ", ".join(f"{m} {n}" for m, n in wins.items()) + f" -> {args.compare_models}")
+    return 0
+
+
+def cmd_forecast(args):
+    summary = read_table(args.summary)
+    horizon = args.horizon_years * 12
+    eur = forecast_wells(summary, args.q_limit, horizon, as_of=args.as_of)
+    write_table(eur, args.output)
+    if args.field:
+        write_table(field_profile(summary, args.q_limit, horizon, as_of=args.as_of), args.field)
+    print(f"Forecast {len(eur)} wells: EUR {eur['EUR'].sum():,.0f} STB, "
+          f"remaining {eur['Remaining'].sum():,.0f} STB -> {args.output}")
+    return 0
+
+
+def cmd_store(args):
+    store = write_store(load_partition(args), args.store_dir)
+    print(f"Wrote {store.n_rows:,} rows / {len(store)} wells -> {args.store_dir}")
+    return 0
+
+
+def cmd_shard(args):
+    models = args.models if args.compare_models else None
+    part = load_partition(args)
+    streams = tuple(part.streams)
+    queue = ShardQueue(args.root)
+    try:
+        plan = queue.plan(run_settings(part, args.b_min, args.b_max, args.solver, args.vectorized, models,
+                                       args.criterion, streams), part, args.shards)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if args.index is not None and not 0 <= args.index < plan["shards"]:
+        raise SystemExit(f"--index {args.index} is out of range for {plan['shards']} shards")
+
+    def report(i, n, well):
+        if not args.quiet:
+            print(f"[{i}/{n}] {well}", file=sys.stderr)
+
+    cache = open_cache(args)
+    while True:
+        index = queue.claim(args.index)
+        if index is None:
+            print(f"No unclaimed shards left in {args.root}")
+            return 0
+        summary = run_shard(queue, index, part, args.b_min, args.b_max, solver=args.solver,
+                            workers=args.workers, vectorized=args.vectorized, cache=cache,
+                            memory_mb=args.memory_mb, models=models, criterion=args.criterion,
+                            streams=streams, scratch=args.scratch, progress=report)
+        n_ok = int((summary["status"] == "ok").sum())
+        print(f"Shard {index}: fitted {n_ok}/{len(summary)} wells -> {queue.shard_dir(index)}")
+        if args.index is not None:
+            return 0
+
+
+def cmd_merge(args):
+    queue = ShardQueue(args.root)
+    try:
+        summary, comparison, unfinished = queue.collect()
+    except ValueError as e:
+        raise SystemExit(str(e))
+    n_shards = queue.read_plan()["shards"]
+    now = time.time()
+    for _, s in unfinished.iterrows():
+        line = f"shard {s['shard']}: {s['status']}"
+        if s["status"] in ("running", "failed"):
+            line += (f" ({s['done']:.0f}/{s['total']:.0f} wells, {s['host']} pid {s['pid']:.0f}, "
+                     f"updated {now - s['updated']:.0f}s ago)")
+        if s["stale"]:
+            line += " — stale, the next 'shard' worker takes it over"
+        if isinstance(s["error"], str):
+            line += f": {s['error']}"
+        print(line, file=sys.stderr)
+    if len(unfinished) and not args.allow_partial:
+        print(f"{len(unfinished)}/{n_shards} shards are not done; nothing written. Rerun a shard with "
+              f"'shard --index I' or pass --allow-partial.", file=sys.stderr)
+        return 1
+    write_table(summary, args.output)
+    if args.compare_models and comparison is not None:
+        write_table(comparison, args.compare_models)
+    n_ok = int((summary["status"] == "ok").sum())
+    print(f"Merged {n_shards - len(unfinished)}/{n_shards} shards: fitted {n_ok}/{len(summary)} wells "
+          f"-> {args.output}")
+    return 0
+
+
+def cmd_jobs(args):
+    table = JobTable(args.root)
+    if args.cancel:
+        table.cancel(args.cancel)
+    if args.resume:
+        resume_job(table, args.resume)
+    if args.result:
+        summary, _ = table.result(args.result[0])
+        write_table(summary, args.result[1])
+        print(f"Wrote {len(summary)} rows -> {args.result[1]}")
+        return 0
+    with pd.option_context("display.width", 160, "display.max_columns", None):
+        print(table.list(args.limit).drop(columns=["pid"]).to_string(index=False))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m dca", description=__doc__)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("fit", help="fit every well and write the all-wells summary")
+    add_column_args(p)
+    add_fit_args(p)
+    p.add_argument("-o", "--output", default="all_wells_fitting_summary.xlsx",
+                   help="summary file (.xlsx, .csv or .parquet)")
+    p.add_argument("-j", "--workers", type=int, default=engine.default_workers(),
+                   help="worker processes (1 = serial; default: all cores)")
+    p.add_argument("--prior", help="previous summary; refit only wells that gained data")
+    p.add_argument("--changelog", help="with --prior: write wells whose Di/b moved here")
+    p.add_argument("--tol-di", type=float, default=0.05, help="relative Di change to report")
+    p.add_argument("--tol-b", type=float, default=0.05, help="absolute b change to report")
+    p.add_argument("--checkpoint", help="SQLite file each finished well is flushed to; rerunning "
+                                        "with the same file skips wells already in it")
+    p.add_argument("--restart", action="store_true", help="with --checkpoint: empty it first")
+    p.add_argument("--series", help="with --checkpoint: also keep fitted series and write them "
+                                    "to this .parquet file")
+    p.add_argument("--memory-mb", type=float, default=DEFAULT_MEMORY_MB,
+                   help="with --checkpoint: peak memory budget for queued wells and buffered output")
+    p.add_argument("-q", "--quiet", action="store_true", help="no per-well progress")
+    p.add_argument("--wells-workbook", help="also write an .xlsx with one fitted-table sheet per well")
+    p.add_argument("--profile", help="write per-stage timings and fit counters as JSON here")
+    p.add_argument("--bootstrap", type=int, default=0, metavar="N",
+                   help="add P10/P50/P90 Di, b and EUR columns from N bootstrap refits per well")
+    p.add_argument("--boot-method", choices=METHODS, default="residual")
+    p.add_argument("--boot-seconds", type=float, default=None, help="wall-clock cap for the bootstrap")
+    p.add_argument("--compare-models", metavar="OUTPUT",
+                   help="also fit every --models model per well in the same pass and write the "
+                        "ranked comparison here")
+    p.add_argument("--models", type=model_list, default=DEFAULT_MODELS,
+                   help=f"comma-separated models to compare, or 'all' ({', '.join(MODELS)})")
+    p.add_argument("--criterion", choices=CRITERIA, default="aic", help="information criterion that ranks models")
+    p.set_defaults(func=cmd_fit)
+
+    p = sub.add_parser("forecast", help="EUR, remaining reserves and field profile from a summary")
+    p.add_argument("summary", help="all-wells summary written by 'fit'")
+    p.add_argument("-o", "--output", default="forecast_eur.xlsx", help="per-well EUR table")
+    p.add_argument("--field", help="also write the field monthly profile here")
+    p.add_argument("--q-limit", type=float, default=1.0, help="economic limit rate (STB/day)")
+    p.add_argument("--horizon-years", type=float, default=30.0)
+    p.add_argument("--as-of", help="forecast start date (default: each well's last record; "
+                                   "the field profile starts at the latest one)")
+    p.set_defaults(func=cmd_forecast)
+
+    p = sub.add_parser("store", help="clean a table into a memory-mapped store directory")
+    add_column_args(p)
+    p.add_argument("store_dir", help="output directory (replaced if it exists)")
+    p.set_defaults(func=cmd_store)
+
+    p = sub.add_parser("shard", help="fit shards of the wells into a shared directory (run one per host "
+                                     "or process; combine with 'merge')")
+    add_column_args(p)
+    add_fit_args(p)
+    p.add_argument("root", help="shared directory holding the plan, shard statuses and partial results")
+    p.add_argument("--shards", type=int, help="number of shards (needed by the first worker only)")
+    p.add_argument("--index", type=int, help="fit this shard only (reruns or resumes it); by default "
+                                             "claim unclaimed shards until none is left")
+    p.add_argument("-j", "--workers", type=int, default=engine.default_workers(),
+                   help="worker processes on this host (1 = serial; default: all cores)")
+    p.add_argument("--memory-mb", type=float, default=DEFAULT_MEMORY_MB,
+                   help="peak memory budget for queued wells and buffered output")
+    p.add_argument("--scratch", help="keep shard checkpoints in this local directory instead of the "
+                                     "shared one (SQLite locking is unreliable on network filesystems)")
+    p.add_argument("--compare-models", action="store_true",
+                   help="also compare --models per well; 'merge --compare-models' writes the result")
+    p.add_argument("--models", type=model_list, default=DEFAULT_MODELS,
+                   help=f"comma-separated models to compare, or 'all' ({', '.join(MODELS)})")
+    p.add_argument("--criterion", choices=CRITERIA, default="aic", help="information criterion that ranks models")
+    p.add_argument("-q", "--quiet", action="store_true", help="no per-well progress")
+    p.set_defaults(func=cmd_shard)
+
+    p = sub.add_parser("merge", help="combine the shard summaries of a shared directory")
+    p.add_argument("root", help="shared directory written by 'shard'")
+    p.add_argument("-o", "--output", default="all_wells_fitting_summary.xlsx",
+                   help="summary file (.xlsx, .csv or .parquet)")
+    p.add_argument("--compare-models", metavar="OUTPUT", help="also write the merged model comparison here")
+    p.add_argument("--allow-partial", action="store_true",
+                   help="write the done shards even if others are missing, running or failed")
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser("jobs", help="list, cancel, resume or fetch background fit jobs started from the dashboard")
+    p.add_argument("--root", default=None, help="job directory (default: <cache dir>/jobs)")
+    p.add_argument("--cancel", metavar="ID", help="ask a queued or running job to stop")
+    p.add_argument("--resume", metavar="ID", help="restart a failed or cancelled job from its checkpoint")
+    p.add_argument("--result", nargs=2, metavar=("ID", "OUTPUT"), help="write a finished job's summary")
+    p.add_argument("-n", "--limit", type=int, default=20, help="jobs to list, newest first")
+    p.set_defaults(func=cmd_jobs)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,515 @@
+"""Headless Arps decline-fitting engine (shared by the dashboard and the CLI)."""
+
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from .cache import fit_key
+from .partition import WellPartition, stream_rate_col
+
+DAYS_PER_MONTH = 30.4375
+DI_BOUNDS = (1e-4, 0.6)
+FIT_VERSION = "arps-wlog-qe-1"  # part of every fit-cache key; bump when the objective changes
+
+SOLVERS = ("de", "lsq")
+LSQ_MAX_LOSS = 0.05          # accept a local fit below this objective value ...
+LSQ_NOISE_FACTOR = 10.0      # ... or below this multiple of the series' noise level (``lsq_tolerance``)
+# (Di, fraction of the [b_min, b_max] span); stop once two starts agree
+LSQ_STARTS = ((0.05, 0.5), (0.2, 0.2), (0.01, 0.9), (0.3, 0.8), (0.005, 0.1))
+
+SUMMARY_COLUMNS = [
+    "well", "qi_date", "last_date", "n_points", "Qi_detected", "Qe_actual_last", "Qe_fit", "Mismatch_%",
+    "Di_per_month", "b_factor", "Cum_Actual_All", "Cum_Fitted", "solver", "nfev", "status",
+]
+
+
+# ============================ MODEL ============================
+def arps_rate(qi, di, b, t):
+    """Hyperbolic for b>0, exponential when b≈0 (safe)."""
+    if b <= 1e-10:
+        return qi * np.exp(-di * t)
+    return qi / (1 + b * di * t) ** (1.0 / b)
+
+
+def make_loss(t, q, qi, b_min, b_max):
+    """Weighted log-rate misfit + Qe and b>1 penalties for one post-Qi series."""
+    qe = q[-1]
+    weights = np.linspace(1, 3, len(q))
+    log_q = np.log1p(q)
+
+    def loss(params):
+        di, b = params
+        if di <= 0 or not (b_min <= b <= b_max): return 1e6
+        q_pred = arps_rate(qi, di, b, t)
+        if np.any(np.isnan(q_pred)) or np.any(q_pred < 0): return 1e6
+        mse_log = np.mean(weights * (np.log1p(q_pred) - log_q)**2)
+        penalty_qe = (abs(q_pred[-1] - qe) / max(qe, 1)) ** 2 * 100
+        penalty_b = (max(b - 1, 0))**2 * 5
+        return mse_log + penalty_qe + penalty_b
+
+    return loss
+
+
+def make_vectorized_loss(t, q, qi, b_min, b_max):
+    """Population version of ``make_loss`` for DE's ``vectorized=True`` mode.
+
+    Takes ``x`` of shape (2, S) — one (Di, b) column per candidate — and scores
+    all S candidates in one (S × len(t)) broadcast. A plain (2,) vector (as sent
+    by the polishing step) returns a scalar. ``loss.nfev`` counts the
+    candidates scored; DE's own ``nfev`` counts calls, one per generation.
+    """
+    t_row = np.asarray(t, dtype=float)[None, :]
+    qe = q[-1]
+    n = len(q)
+    weights = np.linspace(1, 3, n)
+    log_q = np.log1p(q)
+    qe_scale = max(qe, 1)
+
+    def loss(x):
+        x = np.asarray(x, dtype=float)
+        if x.ndim == 1:
+            return loss(x[:, None])[0]
+        loss.nfev += x.shape[1]
+        di = x[0][:, None]
+        b = x[1][:, None]
+        invalid = ~((di > 0) & (b_min <= b) & (b <= b_max))[:, 0]
+        exp_branch = b <= 1e-10
+        b_safe = np.where(exp_branch, 1.0, b)
+        with np.errstate(all="ignore"):
+            q_pred = np.where(exp_branch, qi * np.exp(-di * t_row),
+                              qi / (1 + b_safe * di * t_row) ** (1.0 / b_safe))
+            invalid |= np.any(np.isnan(q_pred) | (q_pred < 0), axis=1)
+            mse_log = ((np.log1p(q_pred) - log_q) ** 2) @ weights / n
+        penalty_qe = (np.abs(q_pred[:, -1] - qe) / qe_scale) ** 2 * 100
+        penalty_b = np.maximum(b[:, 0] - 1, 0) ** 2 * 5
+        return np.where(invalid, 1e6, mse_log + penalty_qe + penalty_b)
+
+    loss.nfev = 0
+
+    return loss
+
+
+def arps_jacobian(qi, di, b, t):
+    """Analytic (dq/dDi, dq/db) of ``arps_rate``; returns (q, dq_ddi, dq_db)."""
+    t = np.asarray(t, dtype=float)
+    if b <= 1e-10:
+        q = qi * np.exp(-di * t)
+        return q, -t * q, q * (di * t) ** 2 / 2
+    x = b * di * t
+    q = qi / (1 + x) ** (1.0 / b)
+    dq_ddi = -q * t / (1 + x)
+    # (ln(1+x) - x/(1+x)) / b^2, with a series where the difference cancels
+    small = np.abs(x) < 1e-3
+    with np.errstate(divide="ignore", invalid="ignore"):
+        g = (np.log1p(x) - x / (1 + x)) / b**2
+    g_series = (di * t) ** 2 * (0.5 - 2 * x / 3 + 0.75 * x**2)
+    return q, dq_ddi, q * np.where(small, g_series, g)
+
+
+def make_residuals(t, q, qi, b_min, b_max):
+    """Residual vector and Jacobian whose squared norm equals ``make_loss``."""
+    qe = q[-1]
+    n = len(q)
+    sw = np.sqrt(np.linspace(1, 3, n) / n)
+    log_q = np.log1p(q)
+    qe_scale = 10.0 / max(qe, 1)
+
+    def residuals(params):
+        di, b = params
+        q_pred = arps_rate(qi, di, b, t)
+        return np.concatenate([
+            sw * (np.log1p(q_pred) - log_q),
+            [qe_scale * (q_pred[-1] - qe), np.sqrt(5) * max(b - 1, 0)],
+        ])
+
+    def jacobian(params):
+        di, b = params
+        q_pred, dq_ddi, dq_db = arps_jacobian(qi, di, b, t)
+        J = np.empty((n + 2, 2))
+        J[:n, 0] = sw * dq_ddi / (1 + q_pred)
+        J[:n, 1] = sw * dq_db / (1 + q_pred)
+        J[n] = qe_scale * dq_ddi[-1], qe_scale * dq_db[-1]
+        J[n + 1] = 0.0, (np.sqrt(5) if b > 1 else 0.0)
+        return J
+
+    return residuals, jacobian
+
+
+def lsq_tolerance(q):
+    """Objective value below which a converged local fit of ``q`` is accepted without DE.
+
+    The noise level is half the mean squared step of log(1 + q), about the
+    log-noise variance; a good fit's objective stays within a few times it,
+    so noisy wells are not escalated for their noise alone.
+    """
+    steps = np.diff(np.log1p(q))
+    noise = np.mean(steps**2) / 2 if len(steps) else 0.0
+    return max(LSQ_MAX_LOSS, LSQ_NOISE_FACTOR * noise)
+
+
+def _clip_x0(x0, b_min, b_max):
+    if x0 is None or not np.all(np.isfinite(x0)):
+        return None
+    return (float(np.clip(x0[0], *DI_BOUNDS)), float(np.clip(x0[1], b_min, b_max)))
+
+
+def _fit_lsq(t, q, qi, b_min, b_max, loss, x0=None):
+    """Multi-start bounded trust-region fit. Returns (x, loss, nfev) or None.
+
+    A warm start ``x0`` (e.g. last month's parameters) is tried first; ``nfev``
+    counts residual evaluations over every start tried.
+    """
+    if not b_max > b_min:
+        return None
+    from scipy.optimize import least_squares  # deferred: scipy is only needed once a fit runs
+
+    residuals, jacobian = make_residuals(t, q, qi, b_min, b_max)
+    lb, ub = (DI_BOUNDS[0], b_min), (DI_BOUNDS[1], b_max)
+    starts = [(di0, b_min + f * (b_max - b_min)) for di0, f in LSQ_STARTS]
+    if x0 is not None:
+        # strictly inside the box, as trf requires
+        eps = 1e-9 * (b_max - b_min)
+        starts.insert(0, (min(max(x0[0], lb[0] * 1.001), ub[0] * 0.999),
+                          min(max(x0[1], b_min + eps), b_max - eps)))
+    best = None
+    nfev = 0
+    for start in starts:
+        try:
+            res = least_squares(residuals, start, jac=jacobian, bounds=(lb, ub), method="trf")
+        except (ValueError, FloatingPointError):
+            continue
+        nfev += res.nfev
+        if res.status <= 0 or not np.all(np.isfinite(res.x)):
+            continue
+        val = loss(res.x)
+        if not np.isfinite(val):
+            continue
+        if best is not None and abs(val - best[1]) <= 1e-9 * max(1.0, best[1]):
+            break  # two independent starts landed on the same minimum
+        if best is None or val < best[1]:
+            best = (res.x, val)
+    return None if best is None else (*best, nfev)
+
+
+def _fit_de(t, q, qi, b_min, b_max, loss, vectorized, x0=None):
+    """(DE result, candidates scored)."""
+    from scipy.optimize import differential_evolution
+
+    if vectorized:
+        vloss = make_vectorized_loss(t, q, qi, b_min, b_max)
+        result = differential_evolution(vloss, bounds=[DI_BOUNDS, (b_min, b_max)], seed=42,
+                                        vectorized=True, updating="deferred", x0=x0)
+        return result, vloss.nfev
+    result = differential_evolution(loss, bounds=[DI_BOUNDS, (b_min, b_max)], seed=42, x0=x0)
+    return result, result.nfev
+
+
+def fit_decline(t, q, qi, b_min, b_max, solver="de", vectorized=True, cache=None, x0=None,
+                stats=None):
+    """Fit (Di, b) to a post-Qi series. Returns (di, b, q_fit, path).
+
+    ``solver`` is ``"de"`` or ``"lsq"`` (local fits, DE only when needed); ``path``
+    names the one whose answer is returned. ``x0`` warm-starts from a previous (Di, b).
+    ``stats["nfev"]`` gets the objective evaluations, 0 on a ``cache`` hit.
+    """
+    x0 = _clip_x0(x0, b_min, b_max)
+    key = None
+    if cache is not None:
+        key = fit_key(t, q, qi, b_min, b_max, solver, vectorized, FIT_VERSION, x0)
+        hit = cache.get(key)
+        if hit is not None:
+            di, b, path = hit
+            if stats is not None:
+                stats["nfev"] = 0
+            return di, b, arps_rate(qi, di, b, t), path
+
+    di, b, path, nfev = _solve(t, q, qi, b_min, b_max, solver, vectorized, x0)
+    if stats is not None:
+        stats["nfev"] = nfev
+    if cache is not None:
+        cache.put(key, (di, b, path))
+    return di, b, arps_rate(qi, di, b, t), path
+
+
+def _solve(t, q, qi, b_min, b_max, solver, vectorized, x0=None):
+    loss = make_loss(t, q, qi, b_min, b_max)
+    path = "de"
+    nfev = 0
+    best = None
+    if solver == "lsq":
+        best = _fit_lsq(t, q, qi, b_min, b_max, loss, x0)
+        if best is not None and best[1] <= lsq_tolerance(q):
+            di, b = best[0]
+            return di, b, "lsq", best[2]
+        nfev = best[2] if best is not None else 0
+        path = "lsq->de"
+    result, de_nfev = _fit_de(t, q, qi, b_min, b_max, loss, vectorized, x0)
+    di, b = result.x
+    if best is not None and best[1] <= loss(result.x):  # escalating never makes a fit worse
+        di, b = best[0]
+        path = "lsq"
+    return di, b, path, nfev + de_nfev
+
+
+# ============================ DATA ============================
+def normalize_columns(df_raw):
+    """Same header clean-up the dashboard applies on upload."""
+    df_raw.columns = df_raw.columns.str.strip().str.lower().str.replace(" ", "_")
+    return df_raw
+
+
+def read_production(path):
+    """Read a production table from CSV or Parquet."""
+    path = str(path)
+    if path.lower().endswith((".parquet", ".pq")):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def clean_production(df_raw, well_col, date_col, oil_col, days_col, rate_col="oil_rate", streams=None):
+    """Map the raw columns to well/date/oil/days, derive the rate and drop bad rows.
+
+    ``streams`` maps extra stream names to raw volume columns (e.g.
+    ``{"gas": "gas_mcf"}``); each becomes a ``gas`` volume and ``gas_rate``
+    column over the same days. Rows are kept or dropped on the oil rate alone.
+    """
+    streams = streams or {}
+    df = df_raw[[well_col, date_col, oil_col, days_col, *streams.values()]].copy()
+    df.columns = ["well", "date", "oil", "days", *streams]
+
+    df["date"] = pd.to_datetime(df["date"], dayfirst=True, errors='coerce')
+    df["oil"] = pd.to_numeric(df["oil"], errors="coerce")
+    df["days"] = pd.to_numeric(df["days"], errors="coerce")
+    df[rate_col] = df["oil"] / df["days"]
+    for name in streams:
+        df[name] = pd.to_numeric(df[name], errors="coerce")
+        df[stream_rate_col(name)] = df[name] / df["days"]
+
+    df = df[(df[rate_col] > 0) & df[rate_col].notna()]
+    df = df.dropna(subset=["well", "date", rate_col])
+    df = df.sort_values(by=["well", "date"])
+    return df
+
+
+def split_at_qi(wd, rate_col):
+    """Detect Qi (max rate) and return (qi_date, Qi, before_qi, after_qi with t_months)."""
+    qi_idx = wd[rate_col].idxmax()
+    qi_date = wd.loc[qi_idx, "date"]
+    Qi = wd.loc[qi_idx, rate_col]
+
+    before_qi = wd[wd["date"] < qi_date]
+    after_qi = wd[wd["date"] >= qi_date].copy()
+    after_qi["t_months"] = (after_qi["date"] - after_qi["date"].iloc[0]).dt.days / DAYS_PER_MONTH
+    return qi_date, Qi, before_qi, after_qi
+
+
+# ============================ BATCH ============================
+def _failed_row(well, status):
+    return {
+        "well": well, "qi_date": None, "last_date": None, "n_points": 0, "Qi_detected": np.nan,
+        "Qe_actual_last": np.nan, "Qe_fit": np.nan, "Mismatch_%": np.nan,
+        "Di_per_month": np.nan, "b_factor": np.nan,
+        "Cum_Actual_All": np.nan, "Cum_Fitted": np.nan,
+        "solver": None, "nfev": 0, "status": status,
+    }
+
+
+def post_qi_arrays(dates, rates, post, t_months=None):
+    """(t_months, q) for the post-Qi rows of one well's date-sorted arrays.
+
+    ``t_months`` is the well's slice of ``WellPartition.t_months``; when given
+    it is sliced instead of recomputing the months from the dates.
+    """
+    if t_months is not None:
+        return t_months[post:], rates[post:]
+    d = dates[post:]
+    t = (d - d[0]).astype("timedelta64[D]").astype(float) / DAYS_PER_MONTH
+    return t, rates[post:]
+
+
+def positive_rows(dates, rates, qi, post, t_months=None):
+    """One well's arrays without rows whose rate is zero, negative or missing.
+
+    Returns (dates, rates, qi, post, t_months) with the offsets moved to the
+    kept rows, or None when the Qi row itself is not positive (no data).
+    """
+    keep = np.isfinite(rates) & (rates > 0)
+    if not keep[qi]:
+        return None
+    if keep.all():
+        return dates, rates, qi, post, t_months
+    before = np.cumsum(keep) - keep  # kept rows before each row
+    return (dates[keep], rates[keep], int(before[qi]), int(before[post]),
+            None if t_months is None else t_months[keep])
+
+
+def fit_well_row(well, dates, rates, qi, post, b_min, b_max, solver="de", vectorized=True,
+                 cache=None, x0=None, t_months=None, models=None, streams=None):
+    """Fit one well and return its all-wells summary row (never raises).
+
+    ``dates``/``rates`` are the well's date-sorted arrays, ``qi`` the offset of
+    the Qi record and ``post`` the first post-Qi offset (see ``WellPartition``);
+    ``t_months`` is the well's precomputed time axis, if the partition has one.
+    ``last_date``/``n_points`` let a later incremental run spot new months.
+    With ``models`` (registry names) a fitted row also carries ``"models"``:
+    ``models.compare_series`` on the same slice, reusing the Arps fit.
+    ``streams`` maps stream names to the well's ``WellPartition.stream_arrays``;
+    the row then carries ``"streams"``, one row per stream fitted on its
+    positive rates (see ``positive_rows``) in this same call.
+    """
+    if streams:
+        row = fit_well_row(well, dates, rates, qi, post, b_min, b_max, solver, vectorized, cache, x0,
+                           t_months, models)
+        row["streams"] = {}
+        for name, (s_rates, s_qi, s_post, s_t) in streams.items():
+            kept = positive_rows(dates, s_rates, s_qi, s_post, s_t)
+            row["streams"][name] = _failed_row(well, "no data") if kept is None else fit_well_row(
+                well, *kept[:4], b_min, b_max, solver, vectorized, cache, t_months=kept[4])
+        return row
+    try:
+        qi_date_w = pd.Timestamp(dates[qi])
+        last_date_w = pd.Timestamp(dates[-1]).date()
+        Qi_w = rates[qi]
+        t_w, q_w = post_qi_arrays(dates, rates, post, t_months)
+
+        if len(t_w) < 3:
+            return {
+                "well": well, "qi_date": qi_date_w.date(), "last_date": last_date_w,
+                "n_points": len(t_w), "Qi_detected": Qi_w,
+                "Qe_actual_last": q_w[-1] if len(q_w)>0 else np.nan,
+                "Qe_fit": np.nan, "Mismatch_%": np.nan, "Di_per_month": np.nan,
+                "b_factor": np.nan,
+                "Cum_Actual_All": q_w.cumsum()[-1] if len(q_w)>0 else np.nan,
+                "Cum_Fitted": np.nan, "solver": None, "nfev": 0, "status": "insufficient data"
+            }
+
+        Qe_w = q_w[-1]
+        stats = {}
+        di_w, b_w, q_fit_w, path = fit_decline(t_w, q_w, Qi_w, b_min, b_max, solver, vectorized,
+                                               cache, x0, stats)
+        qe_fit_w = q_fit_w[-1]
+        mismatch_w = abs(qe_fit_w - Qe_w) / max(Qe_w, 1) * 100
+        extra = {}
+        if models:
+            from .models import compare_series
+            extra["models"] = compare_series(t_w, q_w, Qi_w, models, b_min, b_max, arps=(di_w, b_w))
+
+        return {
+            "well": well, "qi_date": qi_date_w.date(), "last_date": last_date_w,
+            "n_points": len(t_w), "Qi_detected": Qi_w,
+            "Qe_actual_last": Qe_w, "Qe_fit": qe_fit_w, "Mismatch_%": mismatch_w,
+            "Di_per_month": di_w, "b_factor": b_w,
+            "Cum_Actual_All": q_w.cumsum()[-1],
+            "Cum_Fitted": q_fit_w.cumsum()[-1], "solver": path, "nfev": stats["nfev"], "status": "ok",
+            **extra,
+        }
+
+    except Exception as e:
+        return _failed_row(well, f"error: {e}")
+
+
+def _stream_slices(part, well, streams):
+    return {s: part.stream_arrays(well, s) for s in streams} if streams else None
+
+
+def fit_stored_well(store, well, streams=None, **fit_kw):
+    """``fit_well_row`` for one well of a (memory-mapped) partition, sliced in the worker."""
+    return fit_well_row(well, *store.arrays(well), t_months=store.times(well),
+                        streams=_stream_slices(store, well, streams), **fit_kw)
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def iter_fit_rows(part, b_min, b_max, wells=None, workers=1, solver="de", vectorized=True, cache=None,
+                  warm_starts=None, max_inflight=None, models=None, streams=None):
+    """Yield the summary row of each well of ``part`` as soon as it is fitted.
+
+    Serial runs yield in partition order; pool runs yield in completion order,
+    longest series first so a few long wells don't end up alone on the tail
+    of the job. ``max_inflight`` bounds how many wells are queued in the pool
+    at once (default: all), which bounds the pickled series held for it.
+    Closing the generator early cancels whatever is still queued. ``models``
+    and ``streams`` (names of ``part.streams``) are passed on to ``fit_well_row``.
+    """
+    wells_all = list(part.wells)
+    if wells is not None:
+        wanted = set(wells)
+        wells_all = [w for w in wells_all if w in wanted]
+    warm_starts = warm_starts or {}
+    fit_kw = dict(b_min=b_min, b_max=b_max, solver=solver, vectorized=vectorized, cache=cache,
+                  models=models)
+    n = len(wells_all)
+
+    if workers <= 1 or n <= 1:
+        for w in wells_all:
+            yield fit_well_row(w, *part.arrays(w), x0=warm_starts.get(w), t_months=part.times(w),
+                               streams=_stream_slices(part, w, streams), **fit_kw)
+        return
+
+    shared = getattr(part, "path", None) is not None  # ColumnStore: ship the path, not the rows
+    def submit(pool, w):
+        if shared:
+            return pool.submit(fit_stored_well, part, w, x0=warm_starts.get(w), streams=streams, **fit_kw)
+        return pool.submit(fit_well_row, w, *part.arrays(w), x0=warm_starts.get(w), t_months=part.times(w),
+                           streams=_stream_slices(part, w, streams), **fit_kw)
+
+    lengths = dict(zip(part.wells, part.lengths()))
+    order = iter(sorted(wells_all, key=lambda w: -lengths[w]))
+    window = n if max_inflight is None else max(int(max_inflight), workers)
+    with ProcessPoolExecutor(max_workers=min(workers, n)) as pool:
+        pending = {}
+        try:
+            for w in itertools.islice(order, window):
+                pending[submit(pool, w)] = w
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    w = pending.pop(fut)
+                    try:
+                        row = fut.result()
+                    except Exception as e:  # worker died / unpicklable result
+                        row = _failed_row(w, f"error: {e}")
+                    nxt = next(order, None)
+                    if nxt is not None:
+                        pending[submit(pool, nxt)] = nxt
+                    yield row
+        finally:
+            # e.g. a cancelled job raising from progress(): drop the queue, don't drain it
+            for fut in pending:
+                fut.cancel()
+
+
+def fit_all_wells(data, rate_col, b_min, b_max, progress=None, workers=1, solver="de",
+                  vectorized=True, cache=None, wells=None, warm_starts=None):
+    """Fit every well and return the summary table.
+
+    ``data`` is a cleaned frame or a prebuilt ``WellPartition``; ``wells``
+    restricts the run to a subset and ``warm_starts`` maps well -> (Di, b).
+    ``progress(i, n, well)`` is called after each well when given; an
+    exception raised from it stops the run (queued pool work is cancelled). With
+    ``workers > 1`` wells are fitted in a process pool (see ``iter_fit_rows``).
+    """
+    part = data if isinstance(data, WellPartition) else WellPartition(data, rate_col)
+    rows = iter_fit_rows(part, b_min, b_max, wells, workers, solver, vectorized, cache, warm_starts)
+    n = len(part.wells) if wells is None else len(set(wells) & set(part.wells))
+    by_well = collect_rows(rows, n, progress)
+    order = part.wells if wells is None else [w for w in part.wells if w in by_well]
+    return pd.DataFrame([by_well[w] for w in order], columns=SUMMARY_COLUMNS)
+
+
+def collect_rows(rows, n, progress=None):
+    """Drain an ``iter_fit_rows`` generator into {well: row}, reporting ``progress(i, n, well)``."""
+    by_well = {}
+    try:
+        for i, row in enumerate(rows, start=1):
+            by_well[row["well"]] = row
+            if progress is not None:
+                progress(i, n, row["well"])
+    finally:
+        rows.close()
+    return by_well
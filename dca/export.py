@@ -0,0 +1,123 @@
+"""On-demand table exports: streamed xlsx, CSV and Parquet.
+
+Nothing here runs until a download is requested; the dashboard hands these
+functions to ``st.download_button`` as callables. Workbooks are written with
+xlsxwriter's ``constant_memory`` mode, which flushes each row to a temp file
+as soon as the next one starts, so rows must go out strictly in order. That
+is why sheets are written here with ``write_row`` rather than through
+``DataFrame.to_excel``, which emits cells column by column. The all-wells
+workbook goes to an anonymous temp file; only the finished file is read back
+for the download.
+"""
+
+import io
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from .engine import arps_rate, post_qi_arrays
+
+FORMATS = ("xlsx", "csv", "parquet")
+MIME = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+ROWS_PER_CHUNK = 10_000
+WELL_TABLE_COLUMNS = ["date", "oil_rate", "fitted_rate", "cumulative_actual", "cumulative_fitted"]
+_SHEET_BAD = re.compile(r"[\[\]:*?/\\]")
+
+
+def _workbook(target):
+    return xlsxwriter.Workbook(target, {"constant_memory": True, "default_date_format": "yyyy-mm-dd",
+                                        "nan_inf_to_errors": True})
+
+
+def _rows(df):
+    """Row lists of plain Python values (NaN/NaT as None), ``ROWS_PER_CHUNK`` at a time."""
+    for lo in range(0, len(df), ROWS_PER_CHUNK):
+        chunk = df.iloc[lo:lo + ROWS_PER_CHUNK]
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        yield from chunk.to_numpy().tolist()
+
+
+def write_sheet(wb, name, df):
+    """Append ``df`` as a worksheet, header first, strictly row by row."""
+    ws = wb.add_worksheet(name)
+    ws.write_row(0, 0, [str(c) for c in df.columns])
+    for r, row in enumerate(_rows(df), start=1):
+        ws.write_row(r, 0, row)
+    return ws
+
+
+def sheet_name(name, taken):
+    """Excel-safe, unique sheet name (31 chars, no []:*?/\\)."""
+    base = _SHEET_BAD.sub("_", str(name)).strip("'")[:31] or "sheet"
+    out, i = base, 1
+    while out.lower() in taken:
+        suffix = f"~{i}"
+        out = base[:31 - len(suffix)] + suffix
+        i += 1
+    taken.add(out.lower())
+    return out
+
+
+def to_bytes(df, fmt="xlsx", sheet="summary"):
+    """One table serialized as ``fmt``."""
+    if fmt == "csv":
+        return df.to_csv(index=False).encode()
+    buf = io.BytesIO()
+    if fmt == "parquet":
+        df.to_parquet(buf, index=False)
+    else:
+        with _workbook(buf) as wb:
+            write_sheet(wb, sheet, df)
+    return buf.getvalue()
+
+
+def write_workbook(target, sheets):
+    """Stream several tables (``{sheet: frame}``) into one workbook at ``target``."""
+    with _workbook(target) as wb:
+        taken = set()
+        for name, df in sheets.items():
+            write_sheet(wb, sheet_name(name, taken), df)
+    return target
+
+
+def workbook_bytes(sheets):
+    return write_workbook(io.BytesIO(), sheets).getvalue()
+
+
+def well_table(dates, rates, post, qi, di, b, t_months=None):
+    """One well's post-Qi fitted table from its partition arrays and summary (Di, b)."""
+    t, q = post_qi_arrays(dates, rates, post, t_months)
+    q_fit = arps_rate(qi, di, b, t) if np.isfinite(di) and np.isfinite(b) else np.full(len(t), np.nan)
+    return pd.DataFrame({"date": pd.to_datetime(dates[post:]), "oil_rate": q, "fitted_rate": q_fit,
+                         "cumulative_actual": q.cumsum(), "cumulative_fitted": q_fit.cumsum()},
+                        columns=WELL_TABLE_COLUMNS)
+
+
+def all_wells_workbook(part, summary, target=None):
+    """Summary sheet plus one sheet per fitted well, streamed to ``target``.
+
+    The fitted tables come from the summary's Di/b, so nothing is refitted.
+    ``target`` defaults to an anonymous temp file, returned rewound; pass a
+    path to write somewhere permanent.
+    """
+    out = target if target is not None else tempfile.TemporaryFile(suffix=".xlsx")
+    fitted = summary[summary["status"] == "ok"].drop_duplicates("well")
+    with _workbook(out) as wb:
+        taken = set()
+        write_sheet(wb, sheet_name("summary", taken), summary)
+        for w, di, b in zip(fitted["well"], fitted["Di_per_month"], fitted["b_factor"]):
+            if w not in part:
+                continue
+            dates, rates, qi, post = part.arrays(w)
+            write_sheet(wb, sheet_name(w, taken), well_table(dates, rates, post, rates[qi], di, b,
+                                                                  part.times(w)))
+    if target is None:
+        out.seek(0)
+    return out
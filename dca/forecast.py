@@ -0,0 +1,156 @@
+"""Closed-form Arps forecasts, EUR and field roll-up for a fitted summary.
+
+Everything is evaluated on arrays of wells at once. Cumulatives come from the
+integrated Arps rate rather than summing monthly steps, and the time to the
+economic limit is the inverted rate equation, so a 20k-well field costs a few
+array operations plus one (wells × months) grid for the field profile.
+
+Time is in months from each well's Qi date (the fit's ``t_months`` axis) and
+rates in STB/day, so volumes are ``DAYS_PER_MONTH`` × the integral in months.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .engine import DAYS_PER_MONTH
+
+B_EXP = 1e-10     # below this b the decline is exponential, as in ``arps_rate``
+B_HARMONIC = 1e-8  # |b - 1| below this uses the harmonic (log) cumulative
+
+FORECAST_COLUMNS = [
+    "well", "Qi_detected", "Di_per_month", "b_factor", "t_now_months", "t_end_months", "end_reason",
+    "q_now", "q_end", "Np_fit_to_date", "Remaining", "EUR",
+]
+
+
+def _as_arrays(*xs):
+    return np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in xs))
+
+
+def arps_rate_v(qi, di, b, t):
+    """``arps_rate`` broadcast over arrays of wells and/or times."""
+    qi, di, b, t = _as_arrays(qi, di, b, t)
+    exp = b <= B_EXP
+    b_safe = np.where(exp, 1.0, b)
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        return np.where(exp, qi * np.exp(-di * t), qi / (1 + b_safe * di * t) ** (1.0 / b_safe))
+
+
+def arps_cum(qi, di, b, t):
+    """Cumulative volume (STB) from t=0 to ``t`` months, closed form.
+
+    Exponential: qi/Di·(1-e^(-Di t)); harmonic: qi/Di·ln(1+Di t);
+    hyperbolic: qi/((1-b)Di)·(1-(1+b Di t)^(1-1/b)). Rates are per day, so
+    the month integral is scaled by ``DAYS_PER_MONTH``.
+    """
+    qi, di, b, t = _as_arrays(qi, di, b, t)
+    exp = b <= B_EXP
+    harm = np.abs(b - 1) < B_HARMONIC
+    hyp = ~(exp | harm)
+    b_safe = np.where(hyp, b, 0.5)
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        cum = np.where(exp, qi / di * -np.expm1(-di * t),
+              np.where(harm, qi / di * np.log1p(di * t),
+                       qi / ((1 - b_safe) * di) * (1 - (1 + b_safe * di * t) ** (1 - 1 / b_safe))))
+    return cum * DAYS_PER_MONTH
+
+
+def time_to_rate(qi, di, b, q_limit):
+    """Months from Qi until the rate falls to ``q_limit`` (0 if it starts below it)."""
+    qi, di, b, q_limit = _as_arrays(qi, di, b, q_limit)
+    exp = b <= B_EXP
+    b_safe = np.where(exp, 1.0, b)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        ratio = qi / q_limit
+        t = np.where(exp, np.log(ratio) / di, (ratio ** b_safe - 1) / (b_safe * di))
+    t = np.where(q_limit > 0, t, np.inf)
+    return np.maximum(t, 0.0)
+
+
+def _month_offsets(later, earlier):
+    """Months between two datetime64 arrays on the fit's day / DAYS_PER_MONTH axis."""
+    return (later - earlier).astype("timedelta64[D]").astype(float) / DAYS_PER_MONTH
+
+
+def _fitted(summary):
+    ok = summary[(summary["status"] == "ok") & summary["Di_per_month"].notna()
+                 & summary["b_factor"].notna()]
+    qi_date = pd.to_datetime(ok["qi_date"]).to_numpy("datetime64[D]")
+    last_date = pd.to_datetime(ok["last_date"]).to_numpy("datetime64[D]")
+    return ok, qi_date, last_date
+
+
+def forecast_wells(summary, q_limit=1.0, horizon_months=360.0, as_of=None):
+    """Per-well time-to-limit, EUR and remaining reserves from a fit summary.
+
+    Each well is produced from its last record (or ``as_of`` when later) until
+    the rate reaches ``q_limit`` STB/day or ``horizon_months`` after that date,
+    whichever comes first. ``Np_fit_to_date`` is the fitted cumulative from Qi
+    to the forecast start, ``Remaining`` the forecast volume after it and
+    ``EUR`` their sum. Wells without a fit are left out.
+    """
+    ok, qi_date, last_date = _fitted(summary)
+    start = last_date
+    if as_of is not None:
+        start = np.maximum(start, np.datetime64(pd.Timestamp(as_of).date(), "D"))
+    qi = ok["Qi_detected"].to_numpy(float)
+    di = ok["Di_per_month"].to_numpy(float)
+    b = ok["b_factor"].to_numpy(float)
+
+    t_now = _month_offsets(start, qi_date)
+    t_lim = time_to_rate(qi, di, b, q_limit)
+    t_hor = t_now + horizon_months
+    t_end = np.maximum(np.minimum(t_lim, t_hor), t_now)
+    np_now = arps_cum(qi, di, b, t_now)
+    eur = arps_cum(qi, di, b, t_end)
+    reason = np.where(t_lim <= t_now, "below limit", np.where(t_lim <= t_hor, "limit", "horizon"))
+
+    return pd.DataFrame({
+        "well": ok["well"].to_numpy(), "Qi_detected": qi, "Di_per_month": di, "b_factor": b,
+        "t_now_months": t_now, "t_end_months": t_end, "end_reason": reason,
+        "q_now": arps_rate_v(qi, di, b, t_now), "q_end": arps_rate_v(qi, di, b, t_end),
+        "Np_fit_to_date": np_now, "Remaining": eur - np_now, "EUR": eur,
+    }, columns=FORECAST_COLUMNS)
+
+
+def field_profile(summary, q_limit=1.0, horizon_months=360, as_of=None, chunk=4096):
+    """Field monthly volume and average rate on a common calendar-month grid.
+
+    The grid starts at the first of the month holding the latest record (or
+    ``as_of``) and runs ``horizon_months`` months; every well is produced from
+    that date, as ``forecast_wells`` does with the same ``as_of``. Each cell's volume is the
+    difference of closed-form cumulatives at the month edges, clipped to the
+    well's own [forecast start, limit/horizon] window, so a well contributes
+    only between its last record and its economic limit. Wells are processed
+    ``chunk`` at a time to bound the (wells × months) grid in memory.
+    """
+    ok, qi_date, last_date = _fitted(summary)
+    horizon_months = int(horizon_months)
+    if as_of is None:
+        as_of = last_date.max() if len(last_date) else np.datetime64("today", "D")
+    first = pd.Timestamp(as_of).to_period("M").to_timestamp()
+    edges = pd.date_range(first, periods=horizon_months + 1, freq="MS").to_numpy("datetime64[D]")
+
+    start = np.maximum(last_date, np.datetime64(pd.Timestamp(as_of).date(), "D"))
+    qi = ok["Qi_detected"].to_numpy(float)
+    di = ok["Di_per_month"].to_numpy(float)
+    b = ok["b_factor"].to_numpy(float)
+    t_now = _month_offsets(start, qi_date)
+    t_end = np.maximum(np.minimum(time_to_rate(qi, di, b, q_limit),
+                                  _month_offsets(edges[-1], qi_date)), t_now)
+
+    volume = np.zeros(horizon_months)
+    active = np.zeros(horizon_months, dtype=np.int64)
+    for lo in range(0, len(qi), chunk):
+        sl = slice(lo, lo + chunk)
+        t_edges = _month_offsets(edges[None, :], qi_date[sl, None])
+        t_edges = np.clip(t_edges, t_now[sl, None], t_end[sl, None])
+        cum = arps_cum(qi[sl, None], di[sl, None], b[sl, None], t_edges)
+        vol = np.diff(cum, axis=1)
+        volume += vol.sum(axis=0)
+        active += (vol > 0).sum(axis=0)
+
+    days = np.diff(edges).astype("timedelta64[D]").astype(float)
+    return pd.DataFrame({"month": pd.to_datetime(edges[:-1]), "volume": volume,
+                         "rate": volume / days, "active_wells": active,
+                         "cum_volume": volume.cumsum()})
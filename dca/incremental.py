@@ -0,0 +1,105 @@
+"""Incremental all-wells refits: only wells that gained data are refitted.
+
+The previous run's summary is the prior state. A well whose Qi date, last
+record date and post-Qi point count are unchanged keeps its row, with
+``nfev`` set to 0 since no solver ran for it; every other well is refitted
+warm-started from its previous (Di, b). The summary is in partition order. The prior must
+come from a run with the same b-bounds and solver settings.
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import engine
+from .partition import WellPartition
+
+CHANGELOG_COLUMNS = [
+    "well", "change", "Di_prev", "Di_new", "Di_change_%", "b_prev", "b_new", "b_change",
+    "status_prev", "status_new",
+]
+
+
+def _as_date(values):
+    return pd.to_datetime(pd.Series(values), errors="coerce").dt.date.to_numpy()
+
+
+def well_fingerprints(part):
+    """Per-well (qi_date, last_date, n_points) straight from the partition arrays."""
+    last = part.date_at(part.stops - 1)
+    qi = part.qi_dates
+    return pd.DataFrame({
+        "well": part.wells,
+        "qi_date": _as_date(qi),
+        "last_date": _as_date(last),
+        "n_points": part.stops - part.post_start,
+    })
+
+
+def plan_refit(part, prior):
+    """Split wells into (changed, unchanged, new, removed) lists against a prior summary."""
+    cur = well_fingerprints(part)
+    prev = prior.reindex(columns=["well", "qi_date", "last_date", "n_points"])  # old summaries lack some
+    prev["qi_date"] = _as_date(prev["qi_date"])
+    prev["last_date"] = _as_date(prev["last_date"])
+    m = cur.merge(prev, on="well", how="outer", suffixes=("", "_prev"), indicator=True)
+
+    new = m.loc[m["_merge"] == "left_only", "well"].tolist()
+    removed = m.loc[m["_merge"] == "right_only", "well"].tolist()
+    both = m[m["_merge"] == "both"]
+    same = ((both["qi_date"] == both["qi_date_prev"])
+            & (both["last_date"] == both["last_date_prev"])
+            & (both["n_points"] == both["n_points_prev"]))
+    return both.loc[~same, "well"].tolist(), both.loc[same, "well"].tolist(), new, removed
+
+
+def build_changelog(prior, refit, new, removed, tol_di=0.05, tol_b=0.05):
+    """Rows for new/removed wells and refitted wells whose Di or b moved past tolerance."""
+    prev = prior.set_index("well")
+    rows = []
+    for _, r in refit.iterrows():
+        w = r["well"]
+        if w in new:
+            change = "new"
+            di_prev = b_prev = np.nan
+            status_prev = None
+        else:
+            p = prev.loc[w]
+            di_prev, b_prev, status_prev = p["Di_per_month"], p["b_factor"], p["status"]
+            change = "refit"
+        di_pct = (r["Di_per_month"] - di_prev) / di_prev * 100 if di_prev else np.nan
+        db = r["b_factor"] - b_prev
+        moved = (change == "new" or status_prev != r["status"]
+                 or (r["status"] == "ok" and (abs(di_pct) > tol_di * 100 or abs(db) > tol_b)))
+        if moved:
+            rows.append({"well": w, "change": change, "Di_prev": di_prev, "Di_new": r["Di_per_month"],
+                         "Di_change_%": di_pct, "b_prev": b_prev, "b_new": r["b_factor"],
+                         "b_change": db, "status_prev": status_prev, "status_new": r["status"]})
+    for w in removed:
+        p = prev.loc[w]
+        rows.append({"well": w, "change": "removed", "Di_prev": p["Di_per_month"], "Di_new": np.nan,
+                     "Di_change_%": np.nan, "b_prev": p["b_factor"], "b_new": np.nan,
+                     "b_change": np.nan, "status_prev": p["status"], "status_new": None})
+    return pd.DataFrame(rows, columns=CHANGELOG_COLUMNS)
+
+
+def incremental_fit(data, prior, rate_col, b_min, b_max, tol_di=0.05, tol_b=0.05, **fit_kw):
+    """Refit only wells whose data changed since ``prior``; returns (summary, changelog).
+
+    ``tol_di`` is a relative tolerance on Di and ``tol_b`` an absolute one on b.
+    Extra keyword arguments go to ``engine.fit_all_wells``.
+    """
+    part = data if isinstance(data, WellPartition) else WellPartition(data, rate_col)
+    changed, unchanged, new, removed = plan_refit(part, prior)
+
+    prev = prior.drop_duplicates("well").set_index("well")
+    warm = {w: (prev.at[w, "Di_per_month"], prev.at[w, "b_factor"]) for w in changed
+            if np.isfinite(prev.at[w, "Di_per_month"]) and np.isfinite(prev.at[w, "b_factor"])}
+    refit = engine.fit_all_wells(part, rate_col, b_min, b_max, wells=changed + new,
+                                 warm_starts=warm, **fit_kw)
+
+    kept = prior[prior["well"].isin(unchanged)].assign(nfev=0)  # carried over, no solver ran
+    summary = pd.concat([kept, refit], ignore_index=True)
+    order = {w: i for i, w in enumerate(part.wells)}
+    summary = summary.sort_values("well", key=lambda s: s.map(order), kind="stable").reset_index(drop=True)
+    summary = summary.reindex(columns=engine.SUMMARY_COLUMNS)
+    return summary, build_changelog(prior, refit, set(new), removed, tol_di, tol_b)
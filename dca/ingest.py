@@ -0,0 +1,165 @@
+"""Chunked, typed CSV ingest with a Parquet cache of the cleaned result.
+
+Only the mapped columns (four, plus any gas/water volume streams) are read,
+in chunks, with explicit dtypes. Dates
+are parsed with one fixed format detected from a sample (day-first formats
+win ties, like the dashboard's ``dayfirst=True``); the rare value that does not
+match falls back to the flexible parser. The cleaned, sorted frame is written
+to ``<cache_dir>/ingest/<hash>.parquet`` keyed by file content + mapping, so a
+re-upload or rerun of the same file skips parsing entirely.
+"""
+
+import hashlib
+import os
+
+import pandas as pd
+
+from .engine import clean_production
+
+INGEST_VERSION = "2"
+CHUNKSIZE = 500_000
+DATE_FORMATS = (
+    "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y",
+    "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%d-%b-%Y", "%d-%b-%y",
+    "%b-%y", "%Y-%m",
+)
+
+
+def _rewind(src):
+    if hasattr(src, "seek"):
+        src.seek(0)
+    return src
+
+
+def header_map(src):
+    """Normalized column name -> raw CSV header, reading only the header line."""
+    cols = pd.read_csv(_rewind(src), nrows=0).columns
+    _rewind(src)
+    return {str(c).strip().lower().replace(" ", "_"): c for c in cols}
+
+
+def file_digest(src, block=1 << 23):
+    h = hashlib.sha1()
+    if isinstance(src, (str, os.PathLike)):
+        with open(src, "rb") as f:
+            for chunk in iter(lambda: f.read(block), b""):
+                h.update(chunk)
+    elif hasattr(src, "getbuffer"):
+        h.update(src.getbuffer())
+    else:
+        _rewind(src)
+        for chunk in iter(lambda: src.read(block), b""):
+            h.update(chunk)
+        _rewind(src)
+    return h.hexdigest()
+
+
+def ingest_key(src, well_col, date_col, oil_col, days_col, rate_col="oil_rate", streams=None):
+    """Cache key of a cleaned dataset: file content + column mapping + ingest version."""
+    mapping = (well_col, date_col, oil_col, days_col, rate_col)
+    if streams:
+        mapping += (tuple(streams.items()),)
+    return hashlib.sha1(repr((file_digest(src), *mapping, INGEST_VERSION)).encode()).hexdigest()
+
+
+def detect_date_format(values):
+    """First format in ``DATE_FORMATS`` that parses every sample value, else None."""
+    sample = pd.Series(values).dropna().astype(str).str.strip()
+    sample = sample[sample != ""]
+    if sample.empty:
+        return None
+    for fmt in DATE_FORMATS:
+        if pd.to_datetime(sample, format=fmt, errors="coerce").notna().all():
+            return fmt
+    return None
+
+
+def _parse_dates(raw, fmt):
+    if fmt is None:
+        return pd.to_datetime(raw, dayfirst=True, errors="coerce")
+    out = pd.to_datetime(raw, format=fmt, errors="coerce")
+    miss = out.isna() & raw.notna()
+    if miss.any():
+        out[miss] = pd.to_datetime(raw[miss], dayfirst=True, errors="coerce")
+    return out
+
+
+def _well_ids(wells):
+    """Numeric well IDs as ``read_csv`` would infer them over the whole file.
+
+    The well column is read as text so every chunk agrees on its type; when
+    every ID is a number it is converted back (int64, or float64 if any ID is
+    written with a decimal point), so "1001" and "1001.0" are one well and
+    IDs sort numerically, as they did when the file was read in one piece.
+    """
+    try:
+        return pd.to_numeric(wells)
+    except (ValueError, TypeError):
+        return wells
+
+
+def _clean_chunks(src, raw, cols, rate_col, chunksize, numeric="float64", streams=None):
+    well_col, date_col, oil_col, days_col = (raw[c] for c in cols)
+    stream_cols = {name: raw[c] for name, c in (streams or {}).items()}
+    usecols = list(dict.fromkeys([well_col, date_col, oil_col, days_col, *stream_cols.values()]))
+    dtypes = {oil_col: numeric, days_col: numeric, well_col: "str", date_col: "str",
+              **dict.fromkeys(stream_cols.values(), numeric)}
+    reader = pd.read_csv(_rewind(src), usecols=usecols, dtype=dtypes, chunksize=chunksize)
+    fmt = None
+    parts = []
+    for i, c in enumerate(reader):
+        if i == 0:
+            fmt = detect_date_format(c[date_col].head(1000))
+        df = pd.DataFrame({
+            "well": c[well_col],
+            "date": _parse_dates(c[date_col], fmt),
+            "oil": pd.to_numeric(c[oil_col], errors="coerce"),
+            "days": pd.to_numeric(c[days_col], errors="coerce"),
+            **{name: c[col] for name, col in stream_cols.items()},
+        })
+        # dates are already parsed, so this only derives the rates and filters
+        parts.append(clean_production(df, "well", "date", "oil", "days", rate_col,
+                                      {name: name for name in stream_cols}))
+    return parts
+
+
+def ingest_csv(src, well_col, date_col, oil_col, days_col, rate_col="oil_rate",
+               cache_dir=None, chunksize=CHUNKSIZE, streams=None):
+    """Read, clean and sort a production CSV; same result as ``clean_production``.
+
+    ``src`` is a path or a binary file object (e.g. a Streamlit upload); the
+    column names are the normalized ones shown in the mapping widgets.
+    ``streams`` maps extra stream names to volume columns, as in
+    ``clean_production``; all rates come out of the same read.
+    """
+    path = None
+    if cache_dir:
+        key = ingest_key(src, well_col, date_col, oil_col, days_col, rate_col, streams)
+        path = os.path.join(cache_dir, "ingest", key + ".parquet")
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+
+    raw = header_map(src)
+    cols = (well_col, date_col, oil_col, days_col)
+    try:
+        parts = _clean_chunks(src, raw, cols, rate_col, chunksize, streams=streams)
+    except ValueError:  # non-numeric junk in oil/days: read as text, coerce per chunk
+        parts = _clean_chunks(src, raw, cols, rate_col, chunksize, numeric="str", streams=streams)
+
+    if parts:
+        df = pd.concat(parts, ignore_index=True)
+        df["well"] = _well_ids(df["well"])
+        df = df.sort_values(["well", "date"], kind="mergesort")
+    else:
+        empty = pd.DataFrame(columns=["well", "date", "oil", "days", *(streams or {})])
+        df = clean_production(empty, "well", "date", "oil", "days", rate_col,
+                              {name: name for name in streams or {}})
+    df = df.reset_index(drop=True)
+
+    if path:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            df.to_parquet(path, index=False)
+        except ImportError:  # no Parquet engine installed; just skip the cache
+            pass
+    return df
@@ -0,0 +1,323 @@
+"""Background all-wells fits that outlive the page that started them.
+
+A job is a row in a SQLite table next to the fit cache plus a directory with
+its inputs and results. Submitting a job reuses the partition's store, or
+writes an in-memory partition once as a memory-mapped store shared by every
+job on the same data (see ``job_store``), and starts a detached worker,
+``python -m dca.jobs <db> <job_id>``, in its own session. A browser refresh,
+a dropped websocket or a closed tab leaves it running. The worker writes
+progress to the table a few times a second. Any session can poll it by ID,
+request cancellation or load the finished summary from the job directory.
+
+Cancellation is cooperative. ``cancel`` marks the row, and the worker's
+progress callback raises ``JobCancelled`` at the next well, which also drops
+any queued pool work. A worker that died without finishing is detected
+through its PID and reported as failed. Full fits are checkpointed in the
+job directory (see ``checkpoint``), so ``resume_job`` picks a failed or
+cancelled job up where it stopped.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+
+import pandas as pd
+
+from .cache import DEFAULT_CACHE_DIR, FitCache
+
+STATUSES = ("queued", "running", "cancelling", "done", "failed", "cancelled")
+ACTIVE = ("queued", "running", "cancelling")
+PROGRESS_INTERVAL = 0.25  # seconds between progress writes
+STORE_KEEP = 2  # idle shared stores kept for resubmits of the same data
+JOB_COLUMNS = ["id", "kind", "status", "done", "total", "message", "created", "started", "finished",
+               "pid", "error"]
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobTable:
+    """SQLite-backed table of background jobs; safe to share across threads and processes."""
+
+    def __init__(self, root=None):
+        self.root = root if root is not None else os.path.join(DEFAULT_CACHE_DIR, "jobs")
+        self.path = os.path.join(self.root, "jobs.sqlite")
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def __getstate__(self):
+        return {"root": self.root, "path": self.path}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                         isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, status TEXT, "
+                "done INTEGER, total INTEGER, message TEXT, created REAL, started REAL, "
+                "finished REAL, pid INTEGER, error TEXT, params TEXT)")
+        return self._conn
+
+    def _exec(self, sql, args=()):
+        with self._lock:
+            return self._db().execute(sql, args).fetchall()
+
+    def job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def create(self, kind, params):
+        job_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        os.makedirs(self.job_dir(job_id), exist_ok=True)
+        self._exec("INSERT INTO jobs (id, kind, status, done, total, message, created, params) "
+                   "VALUES (?, ?, 'queued', 0, 0, '', ?, ?)",
+                   (job_id, kind, time.time(), json.dumps(params)))
+        return job_id
+
+    def update(self, job_id, **fields):
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        self._exec(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        """The job's row as a dict (``None`` if unknown); dead workers are marked failed."""
+        rows = self._exec(f"SELECT {', '.join(JOB_COLUMNS)}, params FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(zip(JOB_COLUMNS + ["params"], rows[0]))
+        job["params"] = json.loads(job["params"] or "{}")
+        if job["status"] in ACTIVE and job["pid"] and not _alive(job["pid"]):
+            self.update(job_id, status="failed", finished=time.time(),
+                        error=job["error"] or "worker exited unexpectedly")
+            return self.get(job_id)
+        return job
+
+    def status(self, job_id):
+        job = self.get(job_id)
+        return None if job is None else job["status"]
+
+    def list(self, limit=20):
+        rows = self._exec(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs ORDER BY created DESC LIMIT ?",
+                          (limit,))
+        return pd.DataFrame(rows, columns=JOB_COLUMNS)
+
+    def cancel(self, job_id):
+        """Ask a queued or running job to stop; it ends as ``cancelled``."""
+        self._exec("UPDATE jobs SET status = 'cancelling' WHERE id = ? AND status IN ('queued', 'running')",
+                   (job_id,))
+
+    def result(self, job_id):
+        """(summary, changelog or None) of a finished job."""
+        d = self.job_dir(job_id)
+        summary = pd.read_parquet(os.path.join(d, "summary.parquet"))
+        changelog_path = os.path.join(d, "changelog.parquet")
+        changelog = pd.read_parquet(changelog_path) if os.path.exists(changelog_path) else None
+        return summary, changelog
+
+    def comparison(self, job_id):
+        """Ranked model comparison of a finished job, or ``None`` if it did not compare models."""
+        path = os.path.join(self.job_dir(job_id), "models.parquet")
+        return pd.read_parquet(path) if os.path.exists(path) else None
+
+    def delete(self, job_id):
+        self._exec("DELETE FROM jobs WHERE id = ?", (job_id,))
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def prune_stores(self, keep=STORE_KEEP):
+        """Delete the shared stores that no queued, running or resumable job reads.
+
+        The ``keep`` most recently used ones stay for resubmits.
+        """
+        root = os.path.join(self.root, "stores")
+        if not os.path.isdir(root):
+            return
+        in_use = {json.loads(p or "{}").get("store") for (p,) in self._exec(
+            "SELECT params FROM jobs WHERE status IN ('queued', 'running', 'cancelling', 'failed', 'cancelled')")}
+        idle = [os.path.join(root, name) for name in os.listdir(root) if ".tmp-" not in name]
+        idle = sorted((p for p in idle if os.path.abspath(p) not in in_use), key=os.path.getmtime, reverse=True)
+        for path in idle[keep:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # a finished child we started stays a zombie until reaped
+    try:
+        done, _ = os.waitpid(pid, os.WNOHANG)
+        return done == 0
+    except ChildProcessError:
+        return True
+
+
+def job_store(table, part):
+    """Path of ``part`` as a store under ``<root>/stores``, named by its data digest.
+
+    The store is written on the first submit of that data; later jobs on the
+    same data, under any settings, reuse it.
+    """
+    from .storage import is_store, write_store
+
+    path = os.path.join(table.root, "stores",
+                        part.digest(streams=tuple(part.streams), columns=tuple(part.columns)))
+    if is_store(path):
+        os.utime(path)  # most recently used, for prune_stores
+        return path
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    write_store(part, tmp)
+    try:
+        os.rename(tmp, path)
+    except OSError:  # another submit wrote the same data meanwhile
+        shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+
+def submit_fit(table, part, rate_col, b_min, b_max, solver="de", workers=1, vectorized=True,
+               cache_path=None, prior=None, tol_di=0.05, tol_b=0.05, bootstrap=None, models=None,
+               criterion="aic", streams=None):
+    """Queue an all-wells fit of ``part`` and start its worker; returns the job ID.
+
+    A ``ColumnStore`` is used in place; an in-memory partition goes through
+    ``job_store``, so resubmitting the same data does not copy it again. ``prior`` (a previous summary) makes it
+    an incremental run. ``bootstrap`` holds ``uncertainty.bootstrap_wells``
+    keywords plus ``q_limit``/``horizon_months`` for the P10/P50/P90 columns.
+    ``models`` (registry names, full runs only) adds a model comparison ranked
+    by ``criterion``, fitted in the same pass; see ``JobTable.comparison``.
+    ``streams`` (names of ``part.streams``, full runs only) widens the summary
+    with per-stream fits and GOR/WOR trends.
+    """
+    if (models or streams) and prior is not None:
+        raise ValueError("model comparison and stream fits need a full run, not an incremental one")
+    params = dict(rate_col=rate_col, b_min=b_min, b_max=b_max, solver=solver, workers=int(workers),
+                  vectorized=vectorized, cache_path=cache_path, tol_di=tol_di, tol_b=tol_b,
+                  bootstrap=bootstrap, incremental=prior is not None,
+                  models=list(models) if models else None, criterion=criterion,
+                  streams=list(streams) if streams else None)
+    job_id = table.create("fit", params)
+    d = table.job_dir(job_id)
+    store_path = getattr(part, "path", None)
+    if store_path is None:
+        store_path = job_store(table, part)
+    if prior is not None:
+        prior.to_parquet(os.path.join(d, "prior.parquet"), index=False)
+    table.update(job_id, params=json.dumps({**params, "store": os.path.abspath(store_path)}))
+    table.prune_stores()
+    _launch(table, job_id)
+    return job_id
+
+
+def resume_job(table, job_id):
+    """Restart a failed or cancelled fit job; wells already in its checkpoint are not refitted."""
+    job = table.get(job_id)
+    if job is None or job["status"] not in ("failed", "cancelled"):
+        raise ValueError(f"job {job_id} is not failed or cancelled")
+    if not os.path.exists(job["params"]["store"]):
+        raise ValueError(f"job {job_id} no longer has its input store")
+    table.update(job_id, status="queued", error=None, finished=None, message="resuming")
+    _launch(table, job_id)
+
+
+def _launch(table, job_id):
+    log = open(os.path.join(table.job_dir(job_id), "worker.log"), "ab")
+    proc = subprocess.Popen([sys.executable, "-m", "dca.jobs", table.root, job_id],
+                            stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True,
+                            cwd=os.getcwd(), env={**os.environ, "PYTHONPATH": _pythonpath()})
+    log.close()
+    table.update(job_id, pid=proc.pid)
+
+
+def _pythonpath():
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.pathsep.join(p for p in (here, os.environ.get("PYTHONPATH")) if p)
+
+
+def run_job(table, job_id):
+    """Worker body: run one queued fit job to completion, failure or cancellation."""
+    from .checkpoint import CheckpointSink, checkpointed_fit
+    from .incremental import incremental_fit
+    from .storage import open_store
+
+    job = table.get(job_id)
+    p = job["params"]
+    last = [0.0]
+
+    def report(done, total, label):
+        now = time.time()
+        if now - last[0] >= PROGRESS_INTERVAL or done == total:
+            last[0] = now
+            if table.status(job_id) == "cancelling":
+                raise JobCancelled()
+            table.update(job_id, done=done, total=total, message=label)
+
+    try:
+        if job["status"] != "queued":  # cancelled before the worker got going
+            raise JobCancelled()
+        table.update(job_id, status="running", started=time.time(), pid=os.getpid(), message="starting")
+        part = open_store(p["store"])
+        cache = FitCache(p["cache_path"]) if p.get("cache_path") else None
+        fit_kw = dict(progress=lambda i, n, w: report(i, n, f"fitting {w}"), workers=p["workers"],
+                      solver=p["solver"], vectorized=p["vectorized"], cache=cache)
+        d = table.job_dir(job_id)
+        changelog = comparison = None
+        if p["incremental"]:
+            prior = pd.read_parquet(os.path.join(d, "prior.parquet"))
+            summary, changelog = incremental_fit(part, prior, p["rate_col"], p["b_min"], p["b_max"],
+                                                 tol_di=p["tol_di"], tol_b=p["tol_b"], **fit_kw)
+        else:
+            ckpt = os.path.join(d, "checkpoint.sqlite")
+            summary = checkpointed_fit(part, ckpt, p["b_min"], p["b_max"], models=p.get("models"),
+                                       streams=p.get("streams"), **fit_kw)
+            if p.get("models") or p.get("streams"):
+                from .models import rank_models
+                from .streams import widen
+                sink = CheckpointSink(ckpt)
+                try:
+                    if p.get("models"):
+                        comparison = rank_models(sink.comparison(order=part.wells), p["criterion"])
+                    if p.get("streams"):
+                        summary = widen(summary, sink.stream_rows(order=part.wells), part, p["streams"])
+                finally:
+                    sink.close()
+
+        if p.get("bootstrap"):
+            from .uncertainty import bootstrap_wells, uncertainty_table, with_uncertainty
+            boot = dict(p["bootstrap"])
+            q_limit, horizon = boot.pop("q_limit", 1.0), boot.pop("horizon_months", 360.0)
+            draws = bootstrap_wells(part, summary, p["b_min"], p["b_max"],
+                                    progress=lambda i, n: report(i, n, "bootstrapping"), **boot)
+            summary = with_uncertainty(summary, uncertainty_table(summary, draws, q_limit, horizon))
+
+        summary.to_parquet(os.path.join(d, "summary.parquet"), index=False)
+        if changelog is not None:
+            changelog.to_parquet(os.path.join(d, "changelog.parquet"), index=False)
+        if comparison is not None:
+            comparison.to_parquet(os.path.join(d, "models.parquet"), index=False)
+        n_ok = int((summary["status"] == "ok").sum())
+        table.update(job_id, status="done", finished=time.time(), message=f"{n_ok}/{len(summary)} wells fitted")
+    except JobCancelled:
+        table.update(job_id, status="cancelled", finished=time.time(), message="cancelled")
+    except BaseException as e:
+        table.update(job_id, status="failed", finished=time.time(), error=f"{type(e).__name__}: {e}",
+                     message=traceback.format_exc(limit=3)[-500:])
+        raise
+
+
+if __name__ == "__main__":
+    raise SystemExit(run_job(JobTable(sys.argv[1]), sys.argv[2]))
@@ -0,0 +1,433 @@
+"""Decline-model registry and all-wells model comparison.
+
+Every model maps Qi and a few parameters to a rate over months since Qi. It
+has a rate and a closed-form cumulative, both broadcast over wells and
+times, plus an analytic Jacobian for one parameter vector. ``MODELS`` holds
+the built-in ones:
+
+- exponential, harmonic and hyperbolic Arps;
+- modified hyperbolic, which turns exponential once its decline falls to
+  ``D_TERMINAL``;
+- the stretched exponential (SEPD), q = Qi·exp(-(t/τ)^n);
+- Duong, q = Qi·s^-m·exp(a/(1-m)·(s^(1-m) - 1)) with s = t + 1, so q(0) = Qi.
+
+``register_model`` adds more. A model is fitted with the objective the
+hyperbolic fit uses: weighted log rates plus the Qe anchor, solved by
+multi-start trust-region least squares.
+
+``fit_and_compare`` is the comparison mode. Each well is sliced once, and
+the task that fits its usual Arps row also fits every requested model. The
+hyperbolic row reuses that Arps fit. Models are then ranked per well by AIC
+or BIC on the log-rate residuals.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .engine import (DAYS_PER_MONTH, DI_BOUNDS, LSQ_STARTS, SUMMARY_COLUMNS, arps_jacobian,
+                     collect_rows, iter_fit_rows)
+from .forecast import B_EXP, arps_cum, arps_rate_v
+from .partition import WellPartition
+
+D_TERMINAL = -np.log1p(-0.06) / 12  # 6 %/yr effective, as a nominal monthly decline
+CRITERIA = ("aic", "bic")
+PARAM_COLUMNS = ["Di_per_month", "b_factor", "tau_months", "n_sepd", "a_duong", "m_duong"]
+COMPARE_COLUMNS = ["well", "model", "n_points", "n_params", "rss_log", "AIC", "BIC", "Qe_fit",
+                   "Np_fit_to_date", "nfev", "status"] + PARAM_COLUMNS
+RANK_COLUMNS = ["delta", "rank", "best"]
+MODEL_COLUMNS = COMPARE_COLUMNS[:7] + RANK_COLUMNS + COMPARE_COLUMNS[7:]
+
+
+def _broadcast(qi, params, t):
+    return np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (qi, *params, t)))
+
+
+class DeclineModel:
+    """Base class: ``params`` names the parameters (summary-style column names)."""
+
+    name = ""
+    label = ""
+    params = ()
+
+    def bounds(self, b_min, b_max):
+        """(lower, upper) parameter bounds; equal bounds hold a parameter fixed."""
+        raise NotImplementedError
+
+    def starts(self, b_min, b_max):
+        """Initial guesses tried in order by ``fit_model``."""
+        raise NotImplementedError
+
+    def rate(self, qi, params, t):
+        """Rate at ``t`` months after Qi, broadcast over ``qi``, ``params`` and ``t``."""
+        raise NotImplementedError
+
+    def jacobian(self, qi, params, t):
+        """(q, dq/dparams as a len(t) × len(params) array) for one parameter vector."""
+        raise NotImplementedError
+
+    def cum(self, qi, params, t):
+        """Cumulative volume (STB) from Qi to ``t`` months, closed form and broadcast."""
+        raise NotImplementedError
+
+
+class Exponential(DeclineModel):
+    name, label, params = "exponential", "Exponential", ("Di_per_month",)
+
+    def bounds(self, b_min, b_max):
+        return (DI_BOUNDS[0],), (DI_BOUNDS[1],)
+
+    def starts(self, b_min, b_max):
+        return [(di,) for di, _ in LSQ_STARTS]
+
+    def rate(self, qi, params, t):
+        qi, di, t = _broadcast(qi, params, t)
+        return qi * np.exp(-di * t)
+
+    def jacobian(self, qi, params, t):
+        t = np.asarray(t, dtype=float)
+        q = self.rate(qi, params, t)
+        return q, (-t * q)[:, None]
+
+    def cum(self, qi, params, t):
+        qi, di, t = _broadcast(qi, params, t)
+        return qi / di * -np.expm1(-di * t) * DAYS_PER_MONTH
+
+
+class Harmonic(Exponential):
+    name, label = "harmonic", "Harmonic (b = 1)"
+
+    def rate(self, qi, params, t):
+        qi, di, t = _broadcast(qi, params, t)
+        return qi / (1 + di * t)
+
+    def jacobian(self, qi, params, t):
+        t = np.asarray(t, dtype=float)
+        q = self.rate(qi, params, t)
+        return q, (-q * t / (1 + params[0] * t))[:, None]
+
+    def cum(self, qi, params, t):
+        qi, di, t = _broadcast(qi, params, t)
+        return qi / di * np.log1p(di * t) * DAYS_PER_MONTH
+
+
+class Hyperbolic(DeclineModel):
+    name, label, params = "hyperbolic", "Hyperbolic Arps", ("Di_per_month", "b_factor")
+
+    def bounds(self, b_min, b_max):
+        return (DI_BOUNDS[0], b_min), (DI_BOUNDS[1], b_max)
+
+    def starts(self, b_min, b_max):
+        return [(di, b_min + f * (b_max - b_min)) for di, f in LSQ_STARTS]
+
+    def rate(self, qi, params, t):
+        return arps_rate_v(qi, params[0], params[1], t)
+
+    def jacobian(self, qi, params, t):
+        q, dq_ddi, dq_db = arps_jacobian(qi, params[0], params[1], t)
+        return q, np.column_stack([dq_ddi, dq_db])
+
+    def cum(self, qi, params, t):
+        return arps_cum(qi, params[0], params[1], t)
+
+
+class ModifiedHyperbolic(Hyperbolic):
+    """Hyperbolic until its decline Di/(1 + b·Di·t) falls to ``d_terminal``, exponential after."""
+
+    name, label = "modified_hyperbolic", "Modified hyperbolic"
+
+    def __init__(self, d_terminal=D_TERMINAL):
+        self.d_terminal = d_terminal
+
+    def switch_time(self, di, b):
+        """Months to the switch: 0 when Di starts below the terminal decline, inf if never."""
+        di, b = np.broadcast_arrays(np.asarray(di, dtype=float), np.asarray(b, dtype=float))
+        exp = b <= B_EXP
+        b_safe = np.where(exp, 1.0, b)
+        t_sw = np.where(exp, np.where(di > self.d_terminal, np.inf, 0.0),
+                        (di / self.d_terminal - 1) / (b_safe * di))
+        return np.maximum(t_sw, 0.0)
+
+    def rate(self, qi, params, t):
+        qi, di, b, t = _broadcast(qi, params, t)
+        t_sw = self.switch_time(di, b)
+        excess = np.maximum(t - t_sw, 0.0)
+        return arps_rate_v(qi, di, b, np.minimum(t, t_sw)) * np.exp(-self.d_terminal * excess)
+
+    def jacobian(self, qi, params, t):
+        di, b = params
+        t = np.asarray(t, dtype=float)
+        t_sw = float(self.switch_time(di, b))
+        q, dq_ddi, dq_db = arps_jacobian(qi, di, b, np.minimum(t, t_sw))
+        after = t > t_sw
+        if after.any():
+            q = q * np.exp(-self.d_terminal * np.maximum(t - t_sw, 0.0))
+            if t_sw > 0:
+                dl = self.d_terminal
+                dq_ddi = np.where(after, q * -(di - dl) / (b * di**2), dq_ddi)
+                dq_db = np.where(after, q * (np.log(di / dl) / b**2 - dl * t_sw / b), dq_db)
+            else:  # terminal decline from the start: the rate no longer depends on Di or b
+                dq_ddi = np.where(after, 0.0, dq_ddi)
+                dq_db = np.where(after, 0.0, dq_db)
+        return q, np.column_stack([dq_ddi, dq_db])
+
+    def cum(self, qi, params, t):
+        qi, di, b, t = _broadcast(qi, params, t)
+        t_sw = self.switch_time(di, b)
+        t_hyp = np.minimum(t, t_sw)
+        excess = np.maximum(t - t_sw, 0.0)
+        with np.errstate(invalid="ignore"):
+            tail = arps_rate_v(qi, di, b, t_hyp) / self.d_terminal * -np.expm1(-self.d_terminal * excess)
+        return arps_cum(qi, di, b, t_hyp) + np.where(excess > 0, tail, 0.0) * DAYS_PER_MONTH
+
+
+class StretchedExponential(DeclineModel):
+    name, label, params = "sepd", "Stretched exponential (SEPD)", ("tau_months", "n_sepd")
+
+    def bounds(self, b_min, b_max):
+        return (0.1, 0.05), (1000.0, 1.0)
+
+    def starts(self, b_min, b_max):
+        return [(12.0, 0.5), (3.0, 0.3), (60.0, 0.8), (1.0, 0.2)]
+
+    def rate(self, qi, params, t):
+        qi, tau, n, t = _broadcast(qi, params, t)
+        return qi * np.exp(-(t / tau) ** n)
+
+    def jacobian(self, qi, params, t):
+        tau, n = params
+        t = np.asarray(t, dtype=float)
+        u = (t / tau) ** n
+        q = qi * np.exp(-u)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dq_dn = np.where(t > 0, -q * u * np.log(t / tau), 0.0)
+        return q, np.column_stack([q * u * n / tau, dq_dn])
+
+    def cum(self, qi, params, t):
+        from scipy.special import gamma, gammainc  # deferred like the solvers
+
+        qi, tau, n, t = _broadcast(qi, params, t)
+        a = 1.0 / n
+        return qi * tau / n * gamma(a) * gammainc(a, (t / tau) ** n) * DAYS_PER_MONTH
+
+
+class Duong(DeclineModel):
+    name, label, params = "duong", "Duong", ("a_duong", "m_duong")
+
+    def bounds(self, b_min, b_max):
+        return (1e-3, 0.5), (5.0, 2.5)
+
+    def starts(self, b_min, b_max):
+        return [(1.0, 1.2), (0.3, 1.05), (2.0, 1.6), (0.1, 0.8)]
+
+    @staticmethod
+    def _g(log_s, c):
+        """(s^c - 1) / c with c = 1 - m, continuous through m = 1 (where it is ln s)."""
+        small = np.abs(c) < 1e-8
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(small, log_s, np.expm1(c * log_s) / np.where(small, 1.0, c))
+
+    def rate(self, qi, params, t):
+        qi, a, m, t = _broadcast(qi, params, t)
+        log_s = np.log1p(t)
+        with np.errstate(over="ignore"):
+            return qi * np.exp(-m * log_s + a * self._g(log_s, 1 - m))
+
+    def jacobian(self, qi, params, t):
+        a, m = params
+        log_s = np.log1p(np.asarray(t, dtype=float))
+        c = 1 - m
+        g = self._g(log_s, c)
+        with np.errstate(over="ignore"):
+            q = qi * np.exp(-m * log_s + a * g)
+        if abs(c) < 1e-6:
+            dg_dc = log_s**2 / 2 + c * log_s**3 / 3
+        else:
+            dg_dc = (c * log_s * np.exp(c * log_s) - np.expm1(c * log_s)) / c**2
+        return q, np.column_stack([q * g, q * (-log_s - a * dg_dc)])
+
+    def cum(self, qi, params, t):
+        qi, a, m, t = _broadcast(qi, params, t)
+        with np.errstate(over="ignore"):
+            return qi / a * np.expm1(a * self._g(np.log1p(t), 1 - m)) * DAYS_PER_MONTH
+
+
+MODELS = {}
+
+
+def register_model(model):
+    """Add a ``DeclineModel`` instance to ``MODELS`` under its ``name``; returns it.
+
+    Parameter names not seen before become new comparison columns.
+    """
+    for p in model.params:
+        if p not in PARAM_COLUMNS:
+            for columns in (PARAM_COLUMNS, COMPARE_COLUMNS, MODEL_COLUMNS):
+                columns.append(p)
+    MODELS[model.name] = model
+    return model
+
+
+for _m in (Exponential(), Harmonic(), Hyperbolic(), ModifiedHyperbolic(), StretchedExponential(), Duong()):
+    register_model(_m)
+DEFAULT_MODELS = tuple(MODELS)
+
+
+# ============================ FITTING ============================
+def make_model_residuals(model, t, q, qi):
+    """``engine.make_residuals`` for any model: weighted log rates, Qe anchor, b > 1 penalty."""
+    qe = q[-1]
+    n = len(q)
+    sw = np.sqrt(np.linspace(1, 3, n) / n)
+    log_q = np.log1p(q)
+    qe_scale = 10.0 / max(qe, 1)
+    i_b = model.params.index("b_factor") if "b_factor" in model.params else None
+    k = len(model.params)
+
+    def residuals(p):
+        q_pred = model.rate(qi, p, t)
+        extra = [qe_scale * (q_pred[-1] - qe)]
+        if i_b is not None:
+            extra.append(np.sqrt(5) * max(p[i_b] - 1, 0))
+        return np.concatenate([sw * (np.log1p(q_pred) - log_q), extra])
+
+    def jacobian(p):
+        q_pred, dq = model.jacobian(qi, p, t)
+        J = np.zeros((n + 1 + (i_b is not None), k))
+        J[:n] = sw[:, None] * dq / (1 + q_pred[:, None])
+        J[n] = qe_scale * dq[-1]
+        if i_b is not None and p[i_b] > 1:
+            J[n + 1, i_b] = np.sqrt(5)
+        return J
+
+    return residuals, jacobian
+
+
+def fit_model(model, t, q, qi, b_min=0.0, b_max=1.0, x0=None):
+    """Fit ``model`` to a post-Qi series. Returns (params, nfev), or None if no start converges.
+
+    Like the hyperbolic ``lsq`` path: bounded trust-region solves from each of
+    ``model.starts`` (``x0`` first when given), stopping once two starts agree.
+    Parameters with equal bounds stay fixed.
+    """
+    from scipy.optimize import least_squares
+
+    lb, ub = (np.asarray(x, dtype=float) for x in model.bounds(b_min, b_max))
+    free = ub > lb
+    if not free.any():
+        return lb, 0
+    residuals, jacobian = make_model_residuals(model, t, q, qi)
+
+    def full(x):
+        p = lb.copy()
+        p[free] = x
+        return p
+
+    eps = 1e-9 * (ub[free] - lb[free])
+    starts = model.starts(b_min, b_max)
+    if x0 is not None and np.all(np.isfinite(x0)):
+        starts = [x0, *starts]
+    best, nfev = None, 0
+    for x0 in starts:
+        x0 = np.clip(np.asarray(x0, dtype=float)[free], lb[free] + eps, ub[free] - eps)
+        try:
+            with np.errstate(all="ignore"):
+                res = least_squares(lambda x: residuals(full(x)), x0, jac=lambda x: jacobian(full(x))[:, free],
+                                    bounds=(lb[free], ub[free]), method="trf")
+        except (ValueError, FloatingPointError):
+            continue
+        nfev += res.nfev
+        if res.status <= 0 or not (np.all(np.isfinite(res.x)) and np.isfinite(res.cost)):
+            continue
+        if best is not None and abs(res.cost - best[1]) <= 1e-9 * max(1.0, best[1]):
+            break
+        if best is None or res.cost < best[1]:
+            best = (full(res.x), res.cost)
+    return None if best is None else (best[0], nfev)
+
+
+def information_criteria(rss, n, k):
+    """(AIC, BIC) of a fit with ``k`` parameters and log-rate residual sum of squares ``rss``."""
+    fit = n * np.log(max(rss, 1e-12) / n)
+    return fit + 2 * k, fit + k * np.log(n)
+
+
+def compare_series(t, q, qi, models=DEFAULT_MODELS, b_min=0.0, b_max=1.0, arps=None):
+    """One comparison row (a dict without ``well``) per model for a post-Qi series.
+
+    ``arps`` is an existing hyperbolic (Di, b) fit with the same bounds; the
+    hyperbolic row then reuses it instead of fitting again, and models with
+    only Arps parameters are warm-started from it.
+    """
+    rows = []
+    log_q = np.log(q)
+    hint = {} if arps is None else dict(zip(Hyperbolic.params, arps))
+    for name in models:
+        model = MODELS[name]
+        lb, ub = model.bounds(b_min, b_max)
+        k = int(np.sum(np.asarray(ub) > np.asarray(lb)))
+        row = {"model": name, "n_points": len(q), "n_params": k, "nfev": 0}
+        x0 = [hint[p] for p in model.params] if hint and set(model.params) <= set(hint) else None
+        fit = (np.asarray(arps, dtype=float), 0) if name == "hyperbolic" and arps is not None \
+            else fit_model(model, t, q, qi, b_min, b_max, x0)
+        if fit is None:
+            rows.append({**row, "status": "no convergence"})
+            continue
+        p, row["nfev"] = fit
+        with np.errstate(all="ignore"):
+            q_fit = model.rate(qi, p, t)
+            rss = float(np.sum((np.log(q_fit) - log_q) ** 2))
+        if not np.isfinite(rss):
+            rows.append({**row, "status": "invalid fit"})
+            continue
+        row["rss_log"] = rss
+        row["AIC"], row["BIC"] = information_criteria(rss, len(q), k)
+        row["Qe_fit"] = float(q_fit[-1])
+        row["Np_fit_to_date"] = float(model.cum(qi, p, t[-1]))
+        row.update(zip(model.params, map(float, p)))
+        rows.append({**row, "status": "ok"})
+    return rows
+
+
+def rank_models(comparison, criterion="aic"):
+    """``comparison`` with each well's models ranked by ``criterion`` (1 = best).
+
+    ``delta`` is the gap to the well's best model, so a few units or less
+    means the data cannot really tell the two apart.
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion must be one of {CRITERIA}")
+    df = comparison.reindex(columns=COMPARE_COLUMNS)
+    score = df[criterion.upper()].astype(float)
+    by_well = score.groupby(df["well"], sort=False)
+    df["delta"] = score - by_well.transform("min")
+    df["rank"] = by_well.rank(method="first").astype("Int64")
+    df["best"] = (df["rank"] == 1).fillna(False).astype(bool)
+    return df[MODEL_COLUMNS]
+
+
+def fit_and_compare(data, rate_col, b_min, b_max, models=DEFAULT_MODELS, criterion="aic", progress=None,
+                    workers=1, solver="de", vectorized=True, cache=None, streams=()):
+    """(summary, comparison) of one pass over every well.
+
+    The summary is what ``fit_all_wells`` returns, widened with ``streams``
+    (see ``streams.fit_streams``) when given; models are compared on the
+    primary stream. The comparison has one row
+    per (well, model) in ``MODEL_COLUMNS``, ranked by ``criterion``. Each well
+    goes to a single task that fits its Arps row and then the other models on
+    the same slice, so comparing six models costs one batch, not six.
+    """
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        raise ValueError(f"unknown models: {', '.join(sorted(unknown))}")
+    part = data if isinstance(data, WellPartition) else WellPartition(data, rate_col)
+    rows = iter_fit_rows(part, b_min, b_max, workers=workers, solver=solver, vectorized=vectorized,
+                         cache=cache, models=tuple(models), streams=tuple(streams))
+    by_well = collect_rows(rows, len(part), progress)
+    ordered = [by_well[w] for w in part.wells]
+    summary = pd.DataFrame(ordered, columns=SUMMARY_COLUMNS)
+    if streams:
+        from .streams import stream_frame, widen
+        summary = widen(summary, stream_frame(ordered), part, streams)
+    comparison = pd.DataFrame([{"well": r["well"], **m} for r in ordered for m in r.get("models", ())],
+                              columns=COMPARE_COLUMNS)
+    return summary, rank_models(comparison, criterion)
@@ -0,0 +1,295 @@
+"""Single-pass well partition index over a cleaned production frame."""
+
+import hashlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+class WellPartition:
+    """Rows sorted by (well, date) as contiguous, compactly typed columns.
+
+    Built once at Apply time from the cleaned frame, which is not kept:
+    wells live only in the ``starts``/``stops`` offset table (one name per
+    well, not per row), dates are ``int32`` day numbers (``day``, days since
+    1970-01-01), and the oil, days and stream volume columns in ``columns``
+    are ``float32`` wherever that loses nothing. Rates and ``t_months`` stay
+    ``float64``: they feed the fits, and rounding them would move Qi picks
+    and fitted parameters.
+
+    ``view(well)``, ``arrays(well)`` and ``frame_slice(well)`` are positional
+    slices of the sorted columns, so looking up a well never scans the table.
+    ``qi_pos`` is the row of each well's first max-rate record and
+    ``post_start`` the first row on Qi's date (what ``date >= qi_date``
+    keeps). ``t_months`` holds every row's months since its well's post-Qi
+    start (negative before Qi), computed for the whole field in one pass, so
+    fits and charts slice it instead of recomputing ``.dt.days / 30.4375``.
+
+    ``streams`` names extra rate streams (``"gas"`` reads ``gas_rate``). They
+    share the row index and dates; each gets its own Qi, post-Qi start and
+    time axis from the same vectorized pass (see ``stream_arrays``).
+    """
+
+    def __init__(self, df, rate_col, streams=()):
+        df = df.sort_values(["well", "date"], kind="mergesort")
+        self.rate_col = rate_col
+        self.n_rows = n = len(df)
+        self.day = day_numbers(df["date"].to_numpy())
+        self.rates = df[rate_col].to_numpy(dtype=float)
+        self.columns = {c: compact_float(df[c].to_numpy()) for c in ("oil", "days", *streams) if c in df}
+
+        codes, names = pd.factorize(df["well"], sort=False)
+        new_well = np.ones(n, dtype=bool)
+        if n:
+            new_well[1:] = codes[1:] != codes[:-1]
+        self.starts = np.flatnonzero(new_well)
+        self.stops = np.append(self.starts[1:], n)
+        self.wells = np.asarray(names, dtype=object)
+        self._row = {w: i for i, w in enumerate(self.wells)}
+
+        lengths = self.stops - self.starts
+        group = np.repeat(np.arange(len(self.starts)), lengths)
+        # first row of each (well, date) run, so duplicate Qi dates stay post-Qi
+        new_run = new_well.copy()
+        if n:
+            new_run[1:] |= self.day[1:] != self.day[:-1]
+        run_start = np.maximum.accumulate(np.where(new_run, np.arange(n), 0))
+
+        self.qi_pos, self.post_start, self.t_months = qi_offsets(
+            self.rates, self.day, self.starts, group, run_start)
+        self.streams = {}
+        for name in streams:
+            rates = df[stream_rate_col(name)].to_numpy(dtype=float)
+            self.streams[name] = (rates, *qi_offsets(rates, self.day, self.starts, group, run_start))
+
+    def __len__(self):
+        return len(self.wells)
+
+    def __contains__(self, well):
+        return well in self._row
+
+    def rows(self, wells):
+        """Positions of ``wells`` in the partition's well order."""
+        return np.fromiter((self._row[w] for w in wells), dtype=np.int64, count=len(wells))
+
+    def lengths(self):
+        return self.stops - self.starts
+
+    def digest(self, wells=None, streams=(), columns=()):
+        """Fingerprint of what a fit of ``wells`` (default: all) reads: names, dates and rates.
+
+        Independent of the order of ``wells``; ``streams`` adds those streams'
+        rates and ``columns`` those of ``self.columns``.
+        """
+        wells = sorted(self.wells if wells is None else wells, key=str)
+        rows = self.rows(wells)
+        lengths = self.lengths()[rows]
+        offsets = np.cumsum(lengths) - lengths
+        idx = np.repeat(self.starts[rows] - offsets, lengths) + np.arange(lengths.sum())
+        h = hashlib.blake2b(digest_size=8)
+        h.update("\n".join([self.rate_col, *map(str, wells)]).encode("utf-8"))
+        h.update(lengths.astype(np.int64).tobytes())
+        for a in (self.day, self.rates, *(self.streams[s][0] for s in streams),
+                  *(self.columns[c] for c in columns)):
+            h.update(np.ascontiguousarray(a[idx]).tobytes())
+        return h.hexdigest()
+
+    @property
+    def dates(self):
+        """Every row's date as ``datetime64[D]``; a full copy, so prefer ``date_at``."""
+        return as_dates(self.day)
+
+    def date_at(self, rows):
+        """``datetime64[D]`` dates of the given row positions."""
+        return as_dates(self.day[rows])
+
+    @property
+    def qi_dates(self):
+        return self.date_at(self.qi_pos)
+
+    @property
+    def qi_rates(self):
+        return self.rates[self.qi_pos]
+
+    @property
+    def qe(self):
+        """Last recorded rate of each well."""
+        return self.rates[self.stops - 1]
+
+    @property
+    def nbytes(self):
+        """Measured bytes behind the partition (mapped bytes for a ``ColumnStore``)."""
+        arrays = [self.day, self.rates, self.t_months, self.starts, self.stops, self.qi_pos, self.post_start,
+                  self.wells, *self.columns.values(), *(a for s in self.streams.values() for a in s)]
+        return (sum(a.nbytes for a in arrays if a is not None)
+                + sum(sys.getsizeof(w) for w in self.wells))
+
+    def view(self, well):
+        """``WellView`` of one well: array views, no frame or copy of the columns."""
+        i = self._row[well]
+        return WellView(self, well, self.starts[i], self.stops[i], self.qi_pos[i], self.post_start[i])
+
+    def times(self, well):
+        """View of one well's precomputed ``t_months`` (None if the partition has none)."""
+        if self.t_months is None:
+            return None
+        i = self._row[well]
+        return self.t_months[self.starts[i]:self.stops[i]]
+
+    def stream_arrays(self, well, name):
+        """(rates, Qi offset, post-Qi offset, t_months) of one well's ``name`` stream.
+
+        Views like ``arrays``; the dates are the well's ``arrays`` dates. The
+        rates may hold zeros or NaN where the stream was not reported.
+        """
+        i = self._row[well]
+        start, stop = self.starts[i], self.stops[i]
+        rates, qi_pos, post_start, t_months = self.streams[name]
+        return (rates[start:stop], qi_pos[i] - start, post_start[i] - start,
+                None if t_months is None else t_months[start:stop])
+
+    def bounds(self, well):
+        """(start, post_start, stop) row offsets of one well."""
+        i = self._row[well]
+        return self.starts[i], self.post_start[i], self.stops[i]
+
+    def arrays(self, well):
+        """(dates, rates) of one well plus its Qi and post-Qi offsets.
+
+        The rates are a view; the dates are the well's day numbers as
+        ``datetime64[D]`` (a copy of one well's rows).
+        """
+        v = self.view(well)
+        return v.dates, v.rates, v.qi, v.post
+
+    @property
+    def frame(self):
+        """Fully materialized frame (a copy of every column; avoid for large datasets)."""
+        return self._frame(0, self.n_rows)
+
+    def frame_slice(self, well):
+        """One well's rows as a small frame built from the column slices."""
+        start, _, stop = self.bounds(well)
+        return self._frame(start, stop)
+
+    def _frame(self, start, stop):
+        codes = np.searchsorted(self.stops, np.arange(start, stop), side="right")
+        data = {"well": pd.Categorical.from_codes(codes, categories=self.wells),
+                "date": as_dates(self.day[start:stop])}
+        data.update((c, np.asarray(a[start:stop])) for c, a in self.columns.items() if c not in self.streams)
+        data[self.rate_col] = np.asarray(self.rates[start:stop])
+        for s, (rates, *_) in self.streams.items():
+            if s in self.columns:
+                data[s] = np.asarray(self.columns[s][start:stop])
+            data[stream_rate_col(s)] = np.asarray(rates[start:stop])
+        return pd.DataFrame(data, index=pd.RangeIndex(start, stop))
+
+    def split(self, well):
+        """(qi_date, Qi, before_qi, after_qi with t_months) — like ``engine.split_at_qi``."""
+        from .engine import DAYS_PER_MONTH
+
+        v = self.view(well)
+        wd = self.frame_slice(well)
+        before_qi = wd.iloc[:v.post]
+        after_qi = wd.iloc[v.post:].copy()
+        t = v.t_months
+        if t is None:
+            after_qi["t_months"] = (after_qi["date"] - after_qi["date"].iloc[0]).dt.days / DAYS_PER_MONTH
+        else:
+            after_qi["t_months"] = t[v.post:]
+        return pd.Timestamp(v.qi_date), v.rates[v.qi], before_qi, after_qi
+
+
+class WellView:
+    """One well's rows as views of a partition's sorted columns.
+
+    ``qi`` and ``post`` are offsets into the well's own rows, as returned by
+    ``WellPartition.arrays``.
+    """
+
+    __slots__ = ("part", "well", "start", "stop", "qi", "post")
+
+    def __init__(self, part, well, start, stop, qi_pos, post_start):
+        self.part, self.well, self.start, self.stop = part, well, start, stop
+        self.qi, self.post = qi_pos - start, post_start - start
+
+    def __len__(self):
+        return self.stop - self.start
+
+    @property
+    def day(self):
+        return self.part.day[self.start:self.stop]
+
+    @property
+    def dates(self):
+        return as_dates(self.day)
+
+    @property
+    def rates(self):
+        return self.part.rates[self.start:self.stop]
+
+    @property
+    def t_months(self):
+        t = self.part.t_months
+        return None if t is None else t[self.start:self.stop]
+
+    @property
+    def qi_date(self):
+        return as_dates(self.part.day[self.start + self.qi])
+
+    def column(self, name):
+        """View of one of the partition's ``columns`` (``"oil"``, ``"days"``, a stream volume)."""
+        return self.part.columns[name][self.start:self.stop]
+
+
+def stream_rate_col(name):
+    """Rate column of an extra stream (``gas`` -> ``gas_rate``)."""
+    return f"{name}_rate"
+
+
+def day_numbers(dates):
+    """``int32`` days since 1970-01-01 of datetime values (times of day are dropped)."""
+    return np.asarray(dates).astype("datetime64[D]").astype(np.int64).astype(np.int32)
+
+
+def as_dates(day):
+    """``datetime64[D]`` dates of ``day_numbers`` values (a scalar for a scalar)."""
+    return np.asarray(day).astype("datetime64[D]")[()]
+
+
+def compact_float(values):
+    """``values`` as ``float32`` when that loses nothing, else as ``float64``."""
+    values = np.asarray(values, dtype=np.float64)
+    small = values.astype(np.float32)
+    return small if np.array_equal(small, values, equal_nan=True) else values
+
+
+def qi_offsets(rates, day, starts, group, run_start):
+    """(qi_pos, post_start, t_months) of every well for one rate column, in one pass.
+
+    ``qi_pos`` is each well's first max-rate row (NaN rates never win) and
+    ``post_start`` the first row on that date; ``run_start`` maps each row to
+    the first row of its (well, date) run. ``day`` holds ``day_numbers``.
+    """
+    if not len(rates):
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=float)
+    ranked = np.where(np.isnan(rates), -np.inf, rates)
+    gmax = np.maximum.reduceat(ranked, starts)
+    hit = np.flatnonzero(ranked == gmax[group])
+    _, first = np.unique(group[hit], return_index=True)
+    qi_pos = hit[first]
+    post_start = run_start[qi_pos]
+    lengths = np.diff(np.append(starts, len(rates)))
+    return qi_pos, post_start, months_since(day, post_start, lengths)
+
+
+def months_since(day, post_start, lengths):
+    """Months from each row's well post-Qi start date, for all wells at once."""
+    from .engine import DAYS_PER_MONTH
+
+    if not len(day):
+        return np.array([], dtype=float)
+    origin = np.repeat(np.asarray(day[post_start]), lengths)
+    return (np.asarray(day, dtype=np.int64) - origin).astype(float) / DAYS_PER_MONTH
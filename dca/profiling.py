@@ -0,0 +1,123 @@
+"""Per-run stage timers, call counters and an optional cProfile capture.
+
+One ``RunProfile`` is created per dashboard rerun, per fragment-only rerun
+(or per CLI/batch job) and
+the code paths wrap their work in ``with prof.stage("fit"):`` blocks. A stage
+costs two ``perf_counter`` calls and a dict update, so it is left on all the
+time; the cProfile capture is the expensive part and is opt-in per run.
+"""
+
+import cProfile
+import datetime as dt
+import io
+import json
+import pstats
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+STAGE_COLUMNS = ["stage", "calls", "seconds", "ms_per_call", "share_%"]
+
+
+class RunProfile:
+    """Accumulated wall time and call count per stage, plus free-form counters.
+
+    Nested stages are timed independently, so a parent's time includes its
+    children's; shares are relative to the time since the profile started.
+    """
+
+    def __init__(self, label="run"):
+        self.label = label
+        self.started = dt.datetime.now(dt.timezone.utc)
+        self._t0 = time.perf_counter()
+        self._t1 = None
+        self.stages = {}    # name -> [calls, seconds]
+        self.counters = {}  # name -> int
+        self.cprofile = None
+        self._open = {}
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def start(self, name):
+        """Open a stage without a ``with`` block; closed by ``stop(name)``."""
+        self._open[name] = time.perf_counter()
+
+    def stop(self, name):
+        self.add(name, time.perf_counter() - self._open.pop(name))
+
+    def add(self, name, seconds, calls=1):
+        entry = self.stages.setdefault(name, [0, 0.0])
+        entry[0] += calls
+        entry[1] += seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def finish(self):
+        """Stop the clock: ``elapsed`` and the shares no longer grow."""
+        if self._t1 is None:
+            self._t1 = time.perf_counter()
+
+    @property
+    def finished(self):
+        return self._t1 is not None
+
+    def elapsed(self):
+        return (self._t1 or time.perf_counter()) - self._t0
+
+    def table(self):
+        total = self.elapsed() or 1.0
+        rows = [{"stage": k, "calls": c, "seconds": s, "ms_per_call": s / c * 1e3 if c else 0.0,
+                 "share_%": s / total * 100} for k, (c, s) in self.stages.items()]
+        return pd.DataFrame(rows, columns=STAGE_COLUMNS)
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "started": self.started.isoformat(timespec="seconds"),
+            "total_seconds": self.elapsed(),
+            "stages": {k: {"calls": c, "seconds": s} for k, (c, s) in self.stages.items()},
+            "counters": dict(self.counters),
+            "cprofile": self.cprofile,
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, default=str)
+
+
+def count_fits(prof, summary):
+    """Add a batch summary's fit counts and objective evaluations to ``prof``.
+
+    ``fits_reused`` counts fitted wells that ran no solver (``nfev`` 0): fit
+    cache hits and rows an incremental run carried over from its prior.
+    """
+    prof.count("fits", int((summary["status"] == "ok").sum()))
+    if "nfev" in summary:
+        nfev = pd.to_numeric(summary["nfev"], errors="coerce").fillna(0)
+        prof.count("objective_evals", int(nfev.sum()))
+        prof.count("fits_reused", int(((summary["status"] == "ok") & (nfev == 0)).sum()))
+
+
+class Capture:
+    """Start/stop wrapper around ``cProfile`` that renders the top entries as text.
+
+    Streamlit runs the page top to bottom, so the dashboard starts a capture at
+    the top of a rerun and stops it at the end rather than wrapping a call.
+    """
+
+    def __init__(self):
+        self._prof = cProfile.Profile()
+        self._prof.enable()
+
+    def stop(self, sort="cumulative", limit=40):
+        self._prof.disable()
+        out = io.StringIO()
+        pstats.Stats(self._prof, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
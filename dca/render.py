@@ -0,0 +1,197 @@
+"""Chart rendering: PNG cache, LTTB downsampling and figures that never leak.
+
+Charts are drawn on bare ``matplotlib.figure.Figure`` objects (the Agg canvas,
+no pyplot registry), so nothing accumulates in a long-lived server process;
+each figure is serialized to PNG and dropped in the same call. matplotlib
+itself is imported on the first chart, so pages without one never load it. The PNGs sit
+in a small LRU keyed by what the picture depends on: the well, the fitted
+parameters, a digest of the plotted data and the theme. Re-selecting a well
+or any rerun that does not change the chart costs a dict lookup.
+
+Series longer than ``MAX_POINTS`` are thinned with Largest-Triangle-Three-
+Buckets, which keeps peaks, troughs and slope changes that plain striding
+would drop.
+"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .forecast import arps_rate_v
+
+MAX_POINTS = 1500
+DPI = 110
+TITLE_COLOR = "#243B6A"
+
+
+def lttb(x, y, n_out=MAX_POINTS):
+    """Indices of ``n_out`` points chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; each bucket in between keeps
+    the point forming the largest triangle with the previous pick and the
+    next bucket's mean. ``x`` may be datetime64.
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    xf = np.asarray(x).astype("datetime64[ns]").astype(np.int64).astype(float) \
+        if np.issubdtype(np.asarray(x).dtype, np.datetime64) else np.asarray(x, dtype=float)
+    yf = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # mean of every bucket up front, so the loop only picks
+    sums_x = np.add.reduceat(xf[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(yf[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, xf[-1])
+    mean_y = np.append(sums_y / counts, yf[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((xf[a] - mean_x[i + 1]) * (yf[lo:hi] - yf[a])
+                      - (xf[a] - xf[lo:hi]) * (mean_y[i + 1] - yf[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def thin(x, y, n_out=MAX_POINTS):
+    """``(x, y)`` downsampled with ``lttb`` (unchanged when already short)."""
+    idx = lttb(x, y, n_out)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
+
+
+def digest(*arrays):
+    """Short content hash of the arrays a chart is drawn from."""
+    h = hashlib.sha1()
+    for a in arrays:
+        h.update(np.ascontiguousarray(a).tobytes())
+        h.update(b"|")
+    return h.hexdigest()
+
+
+class PngCache:
+    """Thread-safe LRU of rendered charts: ``key -> PNG bytes``."""
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return self._mem[key]
+        png = render()
+        with self._lock:
+            self.misses += 1
+            self._mem[key] = png
+            while len(self._mem) > self.maxsize:
+                self._mem.popitem(last=False)
+        return png
+
+
+def new_figure(width=10.5, height=5.4):
+    from matplotlib.figure import Figure  # deferred: matplotlib loads on the first chart, not at startup
+
+    fig = Figure(figsize=(width, height), dpi=DPI)
+    fig.patch.set_facecolor("white")
+    ax = fig.add_subplot()
+    ax.set_facecolor("white")
+    ax.grid(True, linestyle="--", alpha=0.28)
+    return fig, ax
+
+
+def to_png(fig):
+    """Serialize and release a figure."""
+    buf = io.BytesIO()
+    try:
+        fig.savefig(buf, format="png", dpi=DPI, facecolor="white")
+    finally:
+        fig.clear()
+    return buf.getvalue()
+
+
+def decline_chart(well, before_dates, before_rates, after_dates, after_rates, q_fit, qi_date,
+                  accent="#2748d9", bands=None):
+    """The Single Well chart as PNG: pre/post-Qi points, fit, Qi marker and optional bands."""
+    fig, ax = new_figure()
+    ax.scatter(*thin(before_dates, before_rates), s=26, label="Pre-Qi")
+    ax.scatter(*thin(after_dates, after_rates), s=26, label="Post-Qi")
+    idx = lttb(after_dates, q_fit)
+    ax.plot(np.asarray(after_dates)[idx], np.asarray(q_fit)[idx], linewidth=2.2, color=accent,
+            label="Fitted Hyperbolic")
+    if bands is not None:
+        ax.fill_between(np.asarray(after_dates)[idx], bands["P90"][idx], bands["P10"][idx],
+                        color=accent, alpha=0.18, label="P10–P90 band")
+        ax.plot(np.asarray(after_dates)[idx], bands["P50"][idx], linestyle="--", linewidth=1.4,
+                color=accent, label="P50 (bootstrap)")
+    ax.axvline(qi_date, linestyle="--", color="k", alpha=0.45)
+    ax.text(qi_date, ax.get_ylim()[1] * 0.96, "Qi", rotation=90, va="top", ha="right")
+    ax.set_title(f"{well} – Fit from Qi", pad=10, loc="left", color=TITLE_COLOR, fontweight="bold")
+    ax.set_xlabel("Date"); ax.set_ylabel("Rate (STB/day)")
+    ax.legend(frameon=False, loc="upper right")
+    return to_png(fig)
+
+
+def overlay_chart(summary, months=120, max_wells=500, normalize=False, accent="#2748d9", highlight=None):
+    """Fitted curves of many wells on one time-since-Qi axis, from one broadcast evaluation.
+
+    ``summary`` rows with a fit are evaluated as a (wells × months) array and
+    drawn as a single ``LineCollection``; beyond ``max_wells`` an evenly spaced
+    subset is drawn. ``highlight`` names a well drawn on top in the accent.
+    """
+    ok = summary[(summary["status"] == "ok") & summary["Di_per_month"].notna()]
+    if len(ok) > max_wells:
+        ok = ok.iloc[np.linspace(0, len(ok) - 1, max_wells).astype(int)]
+    t = np.linspace(0, months, 241)
+    qi = ok["Qi_detected"].to_numpy(float)[:, None]
+    curves = arps_rate_v(1.0 if normalize else qi, ok["Di_per_month"].to_numpy(float)[:, None],
+                         ok["b_factor"].to_numpy(float)[:, None], t[None, :])
+
+    from matplotlib.collections import LineCollection
+
+    fig, ax = new_figure(height=5.0)
+    segs = np.stack([np.broadcast_to(t, curves.shape), curves], axis=-1)
+    ax.add_collection(LineCollection(segs, colors="#6b7a99", linewidths=0.8, alpha=0.35))
+    if highlight is not None and highlight in set(ok["well"]):
+        i = int(np.flatnonzero(ok["well"].to_numpy() == highlight)[0])
+        ax.plot(t, curves[i], color=accent, linewidth=2.4, label=str(highlight))
+        ax.legend(frameon=False, loc="upper right")
+    ax.set_xlim(0, months)
+    top = np.nanpercentile(curves[:, 0], 99) if len(curves) else 1.0
+    ax.set_ylim(0, top * 1.05 if np.isfinite(top) and top > 0 else 1.0)
+    ax.set_title(f"Fitted curves – {len(ok)} wells", pad=10, loc="left", color=TITLE_COLOR, fontweight="bold")
+    ax.set_xlabel("Months since Qi"); ax.set_ylabel("q / Qi" if normalize else "Rate (STB/day)")
+    return to_png(fig)
+
+
+def field_chart(months, rates, as_of, accent="#2748d9"):
+    """Field forecast rate profile as PNG."""
+    fig, ax = new_figure(height=3.8)
+    ax.plot(months, rates, linewidth=2.2, color=accent, label="Field rate")
+    ax.set_title(f"Field forecast from {as_of:%Y-%m-%d}", pad=10, loc="left", color=TITLE_COLOR, fontweight="bold")
+    ax.set_xlabel("Date"); ax.set_ylabel("Rate (STB/day)")
+    return to_png(fig)
+
+
+def type_curve_chart(curves, labels, n_wells, normalize=False):
+    """Percentile curves (points) and their fits (lines) as PNG."""
+    fig, ax = new_figure(height=5.0)
+    for label in labels:
+        dots = ax.scatter(curves["month"], curves[label], s=14, alpha=0.55, label=label)
+        ax.plot(curves["month"], curves[f"{label}_fit"], linewidth=2.2,
+                color=dots.get_facecolor()[0], label=f"{label} fit")
+    ax.set_title(f"Type curves – {n_wells} wells", pad=10, loc="left", color=TITLE_COLOR, fontweight="bold")
+    ax.set_xlabel("Months since Qi")
+    ax.set_ylabel("q / Qi" if normalize else "Rate (STB/day)")
+    ax.legend(frameon=False, loc="upper right", ncol=2)
+    return to_png(fig)
@@ -0,0 +1,70 @@
+"""Optional data-quality rules applied to a cleaned frame in one vectorized pass.
+
+Both rules work on the whole field at once. The frame must be sorted by
+(well, date), which is what ``clean_production`` and ``ingest_csv`` return.
+
+- ``min_days`` flags months with fewer producing days than the limit. Rates
+  from a few days on are dominated by start-up and shut-in noise.
+- ``outlier_k`` flags rates far from their neighbours. Each rate is compared
+  with the median of a centered ``window`` of its own well, in log space. A
+  deviation over ``outlier_k`` robust standard deviations (1.4826 × the well's
+  median absolute deviation) is flagged. A lone spike would otherwise be
+  picked as Qi.
+
+Both rules are off by default.
+"""
+
+import numpy as np
+import pandas as pd
+
+RULE_COLUMNS = ["low_days", "rate_outlier"]
+OUTLIER_WINDOW = 5
+MIN_SPREAD = 0.05  # floor on the robust spread (log units), so flat wells flag nothing
+
+
+def rules_tag(min_days=None, outlier_k=None):
+    """Short label of the active rules, for cache keys ("" when none are on)."""
+    parts = []
+    if min_days:
+        parts.append(f"d{min_days:g}")
+    if outlier_k:
+        parts.append(f"k{outlier_k:g}")
+    return "-".join(parts)
+
+
+def rolling_median(values, group, window=OUTLIER_WINDOW):
+    """Centered rolling median of ``values`` that never crosses a ``group`` boundary."""
+    n, half = len(values), window // 2
+    if not n:
+        return np.array([], dtype=float)
+    stack = np.full((n, 2 * half + 1), np.nan)
+    for j, shift in enumerate(range(-half, half + 1)):
+        src = np.arange(n) + shift
+        ok = (src >= 0) & (src < n)
+        ok[ok] &= group[src[ok]] == group[ok]
+        stack[ok, j] = values[src[ok]]
+    return np.nanmedian(stack, axis=1)
+
+
+def flag_rows(df, rate_col, min_days=None, outlier_k=None, window=OUTLIER_WINDOW):
+    """Boolean ``RULE_COLUMNS`` for every row of a (well, date)-sorted frame."""
+    flags = pd.DataFrame(False, index=df.index, columns=RULE_COLUMNS)
+    if min_days:
+        flags["low_days"] = (df["days"] < min_days).to_numpy()
+    if outlier_k and len(df):
+        wells = df["well"].to_numpy()
+        group = np.cumsum(np.r_[True, wells[1:] != wells[:-1]])
+        log_q = np.log(df[rate_col].to_numpy(dtype=float))
+        resid = np.abs(log_q - rolling_median(log_q, group, window))
+        mad = pd.Series(resid).groupby(group).transform("median").to_numpy()
+        flags["rate_outlier"] = resid > outlier_k * np.maximum(1.4826 * mad, MIN_SPREAD)
+    return flags
+
+
+def apply_rules(df, rate_col, min_days=None, outlier_k=None):
+    """(kept rows, count of rows dropped per rule) after the active rules."""
+    if not (min_days or outlier_k):
+        return df, dict.fromkeys(RULE_COLUMNS, 0)
+    flags = flag_rows(df, rate_col, min_days, outlier_k)
+    counts = {c: int(flags[c].sum()) for c in RULE_COLUMNS}
+    return df[~flags.any(axis=1).to_numpy()], counts
@@ -0,0 +1,339 @@
+"""Sharded all-wells fits for several hosts, coordinated through a shared directory.
+
+The wells are split into ``n`` shards by the CRC-32 of each well name. Every
+host derives the same split from the same input without talking to the
+others. Each worker (``python -m dca shard``) fits its shards independently
+and leaves everything in one shared directory:
+
+    <root>/plan.json                    shard count, fit settings, input fingerprints
+    <root>/shard-0003/status.json       running / done / failed, progress, host, pid, heartbeat
+    <root>/shard-0003/summary.parquet   the shard's partial summary, once done
+    <root>/shard-0003/models.parquet    its ranked model comparison, with --compare-models
+    <root>/shard-0003/checkpoint.sqlite resumable per-well progress (see ``checkpoint``)
+
+The first worker writes the plan. Later workers check their settings and
+input against it (the well list and a digest of the wells' dates and rates),
+so a shard fitted under other bounds or on other data is refused. A worker with no fixed shard claims the next free one by creating
+its directory. ``mkdir`` is atomic on local and network filesystems, so any
+number of processes on any number of hosts can drain the same queue with no
+broker. Rerunning a shard by index resumes it from its checkpoint.
+
+A running worker rewrites its status every ``HEARTBEAT_INTERVAL`` seconds.
+A claimed or running shard silent for ``STALE_SECONDS`` is taken to be
+abandoned by a dead worker: once no unclaimed shard is left, the next worker
+takes it over (again through an atomic ``mkdir``, so only one does) and
+resumes it. Failed shards are not taken over; rerun them by index.
+``collect`` (``python -m dca merge``) concatenates the finished shards and
+reports the missing, failed and unfinished ones.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .checkpoint import DEFAULT_MEMORY_MB, CheckpointSink, checkpointed_fit
+from .engine import SUMMARY_COLUMNS
+
+PLAN_VERSION = 1
+PROGRESS_INTERVAL = 5.0  # seconds between status.json progress writes
+HEARTBEAT_INTERVAL = 30.0  # seconds between status.json rewrites of a running shard, even mid-well
+STALE_SECONDS = 300.0  # a claimed or running shard silent this long is taken over
+STATUS_COLUMNS = ["shard", "status", "done", "total", "host", "pid", "updated", "stale", "error"]
+
+
+def shard_of(wells, n_shards):
+    """Shard number of each well: CRC-32 of its name modulo ``n_shards``.
+
+    Unlike ``hash`` this is the same in every process and on every host.
+    """
+    return np.fromiter((zlib.crc32(str(w).encode("utf-8")) % n_shards for w in wells),
+                       dtype=np.int64, count=len(wells))
+
+
+def shard_wells(wells, index, n_shards):
+    """The wells of shard ``index``, in their original order."""
+    wells = np.asarray(wells, dtype=object)
+    return list(wells[shard_of(wells, n_shards) == index])
+
+
+def well_digest(wells):
+    """Order-independent fingerprint of a well list, to tell two inputs apart."""
+    crc = 0
+    for w in sorted(str(w) for w in wells):
+        crc = zlib.crc32(w.encode("utf-8") + b"\n", crc)
+    return f"{crc:08x}"
+
+
+def _write_json(path, data):
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _create_json(path, data):
+    """Write ``data`` to ``path`` unless it exists; True if this call created it.
+
+    A hard link publishes the complete file atomically. Where the
+    filesystem has no hard links (some network and FUSE mounts), an
+    exclusively created ``.lock`` file picks the one writer, which renames
+    its copy into place; the others wait for it in ``_wait_for``.
+    """
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    _write_json(tmp, data)
+    try:
+        os.link(tmp, path)
+        return True
+    except FileExistsError:
+        return False
+    except OSError:
+        try:
+            os.close(os.open(f"{path}.lock", os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        os.replace(tmp, path)
+        return True
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _wait_for(path, timeout=30.0):
+    deadline = time.time() + timeout
+    while not os.path.exists(path) and time.time() < deadline:
+        time.sleep(0.1)
+
+
+def _write_parquet(df, path):
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+class ShardQueue:
+    """Plan, claims, statuses and partial results of one sharded run under ``root``.
+
+    ``stale_seconds`` is how long a claimed or running shard may go without a
+    status write before ``claim`` takes it over.
+    """
+
+    def __init__(self, root, stale_seconds=STALE_SECONDS):
+        self.root = os.fspath(root)
+        self.plan_path = os.path.join(self.root, "plan.json")
+        self.stale_seconds = stale_seconds
+
+    def shard_dir(self, index):
+        return os.path.join(self.root, f"shard-{index:04d}")
+
+    def plan(self, settings, part, n_shards=None):
+        """Write the run's plan, or check ``settings`` and ``part``'s data against the existing one.
+
+        ``n_shards`` is required for a new plan; a worker joining an existing
+        run may leave it out. Raises ``ValueError`` on any mismatch.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        mine = {"version": PLAN_VERSION, "shards": n_shards, "settings": settings,
+                "wells": len(part), "well_digest": well_digest(part.wells),
+                "data_digest": part.digest(streams=settings.get("streams") or ())}
+        if n_shards is not None and not os.path.exists(self.plan_path):
+            if n_shards < 1:
+                raise ValueError("--shards must be at least 1")
+            if not _create_json(self.plan_path, mine):  # another worker got there first
+                _wait_for(self.plan_path)
+        plan = self.read_plan()
+        mine["shards"] = n_shards or plan["shards"]
+        for key, label in (("shards", "shard count"), ("settings", "fit settings"),
+                           ("well_digest", "input wells"), ("data_digest", "input data")):
+            if plan.get(key) != mine[key]:
+                raise ValueError(f"{self.root} was planned with other {label} "
+                                 f"({plan.get(key)!r}, not {mine[key]!r}); use a new directory")
+        return plan
+
+    def read_plan(self):
+        try:
+            with open(self.plan_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"no shard plan in {self.root}; start the first worker with --shards N") from None
+
+    def claim(self, index=None):
+        """Claim shard ``index``, or the next shard nobody has claimed (``None`` when none is left).
+
+        A given ``index`` is always granted, so a failed or abandoned shard
+        can be rerun; it resumes from its checkpoint. With no unclaimed shard
+        left, a stale one (see ``is_stale``) is taken over instead.
+        """
+        n_shards = self.read_plan()["shards"]
+        if index is not None:
+            if not 0 <= index < n_shards:
+                raise ValueError(f"shard {index} out of range for {n_shards} shards")
+            os.makedirs(self.shard_dir(index), exist_ok=True)
+            return index
+        for i in range(n_shards):
+            try:
+                os.mkdir(self.shard_dir(i))
+            except FileExistsError:
+                continue
+            return i
+        for i in range(n_shards):
+            if self._take_over(i):
+                return i
+        return None
+
+    def is_stale(self, status):
+        """Whether a ``read_status`` dict is a claimed or running shard whose worker went silent."""
+        return (status["status"] in ("claimed", "running")
+                and time.time() - status["updated"] > self.stale_seconds)
+
+    def _take_over(self, index):
+        """Claim a stale shard; of several workers seeing the same silence, only one wins."""
+        status = self.read_status(index)
+        if not self.is_stale(status):
+            return False
+        try:  # named after the silence it ends, so a later stall can be taken over again
+            os.mkdir(os.path.join(self.shard_dir(index), f"takeover-{status['updated']:.6f}"))
+        except FileExistsError:
+            return False
+        self.write_status(index, status="claimed")
+        return True
+
+    def write_status(self, index, **fields):
+        _write_json(os.path.join(self.shard_dir(index), "status.json"),
+                    {"shard": index, "updated": time.time(), **fields})
+
+    def read_status(self, index):
+        """The shard's status dict: ``missing`` if unclaimed, ``claimed`` before its worker reports.
+
+        A claim without a status counts as updated when its directory was made.
+        """
+        d = self.shard_dir(index)
+        try:
+            with open(os.path.join(d, "status.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            try:
+                return {"shard": index, "status": "claimed", "updated": os.path.getmtime(d)}
+            except FileNotFoundError:
+                return {"shard": index, "status": "missing"}
+
+    def status(self):
+        """One ``STATUS_COLUMNS`` row per planned shard; ``stale`` flags abandoned claims."""
+        n_shards = self.read_plan()["shards"]
+        rows = [self.read_status(i) for i in range(n_shards)]
+        for row in rows:
+            row["stale"] = self.is_stale(row)
+        return pd.DataFrame(rows).reindex(columns=STATUS_COLUMNS)
+
+    def collect(self):
+        """(summary, comparison or None, unfinished shards) over every shard that is done.
+
+        The summary lists the wells in the same order as a single-host run.
+        ``unfinished`` holds the ``status`` rows of the shards that are
+        missing, claimed, running or failed.
+        """
+        status = self.status()
+        done = status.loc[status["status"] == "done", "shard"].astype(int).tolist()
+        parts = [pd.read_parquet(os.path.join(self.shard_dir(i), "summary.parquet")) for i in done]
+        summary = (pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=SUMMARY_COLUMNS))
+        summary = summary.sort_values("well", kind="mergesort").reset_index(drop=True)
+        comparison = None
+        if self.read_plan()["settings"].get("models"):
+            frames = [pd.read_parquet(os.path.join(self.shard_dir(i), "models.parquet")) for i in done]
+            if frames:
+                comparison = (pd.concat(frames, ignore_index=True)
+                              .sort_values("well", kind="mergesort").reset_index(drop=True))
+        return summary, comparison, status[status["status"] != "done"].reset_index(drop=True)
+
+
+def run_settings(part, b_min, b_max, solver="de", vectorized=True, models=None, criterion="aic", streams=()):
+    """The plan's settings for a run; every shard must fit under the same ones."""
+    settings = {"rate_col": part.rate_col, "b_min": float(b_min), "b_max": float(b_max), "solver": solver,
+                "vectorized": bool(vectorized), "models": list(models) if models else None,
+                "streams": list(streams)}
+    if models:
+        settings["criterion"] = criterion
+    return settings
+
+
+@contextmanager
+def _heartbeat(queue, index, fields):
+    """Rewrite the shard's status from ``fields()`` every ``HEARTBEAT_INTERVAL`` while the block runs."""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            queue.write_status(index, **fields())
+
+    thread = threading.Thread(target=beat, name=f"shard-{index}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_shard(queue, index, part, b_min, b_max, solver="de", workers=1, vectorized=True, cache=None,
+              memory_mb=DEFAULT_MEMORY_MB, models=None, criterion="aic", streams=(), scratch=None,
+              progress=None):
+    """Fit shard ``index`` of ``part`` and publish its partial results; returns its summary.
+
+    ``status.json`` is kept current while the shard runs, with a heartbeat
+    so a slow well does not look abandoned, and ends as ``done`` or
+    ``failed``. The checkpoint sits in the shard directory, or
+    under ``scratch`` for filesystems where SQLite locking is unreliable
+    (most network mounts); there it only resumes on the same host.
+    """
+    from .models import rank_models
+    from .streams import widen
+
+    wells = shard_wells(part.wells, index, queue.read_plan()["shards"])
+    d = queue.shard_dir(index)
+    ckpt = os.path.join(d, "checkpoint.sqlite")
+    if scratch:
+        os.makedirs(scratch, exist_ok=True)
+        ckpt = os.path.join(scratch, f"{os.path.basename(queue.root)}-shard-{index:04d}.sqlite")
+    who = {"host": socket.gethostname(), "pid": os.getpid(), "total": len(wells)}
+    done, last = [0], [0.0]
+
+    def report(i, n, well):
+        done[0], now = i, time.time()
+        if now - last[0] >= PROGRESS_INTERVAL:
+            last[0] = now
+            queue.write_status(index, status="running", done=i, **who)
+        if progress is not None:
+            progress(i, n, well)
+
+    queue.write_status(index, status="running", done=0, **who)
+    try:
+        with _heartbeat(queue, index, lambda: dict(status="running", done=done[0], **who)):
+            summary = checkpointed_fit(part, ckpt, b_min, b_max, progress=report, solver=solver,
+                                       workers=workers, vectorized=vectorized, cache=cache, memory_mb=memory_mb,
+                                       models=models, streams=streams, wells=wells)
+            comparison = None
+            if models or streams:
+                sink = CheckpointSink(ckpt)
+                try:
+                    if models:
+                        comparison = rank_models(sink.comparison(order=wells), criterion)
+                    if streams:
+                        summary = widen(summary, sink.stream_rows(order=wells), part, streams)
+                finally:
+                    sink.close()
+            if comparison is not None:
+                _write_parquet(comparison, os.path.join(d, "models.parquet"))
+            _write_parquet(summary, os.path.join(d, "summary.parquet"))
+    except BaseException as e:
+        queue.write_status(index, status="failed", done=done[0], error=f"{type(e).__name__}: {e}".rstrip(": "), **who)
+        raise
+    n_ok = int((summary["status"] == "ok").sum())
+    queue.write_status(index, status="done", done=len(wells), ok=n_ok, **who)
+    return summary
@@ -0,0 +1,106 @@
+"""Memory-mapped columnar storage for cleaned well datasets.
+
+A store is a directory of ``.npy`` columns (day number, rate, months since
+Qi, and the oil, days and stream volume columns in their compact dtypes),
+the per-well offset table of a ``WellPartition`` and a small ``meta.json``.
+Each extra stream adds its rate column, offsets and time axis, suffixed with
+the stream name.
+Columns are opened with ``mmap_mode="r"``, so a session or a batch worker only
+pages in the rows it touches, and worker processes opening the same store
+share the OS page cache instead of receiving pickled copies.
+"""
+
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+from .partition import WellPartition, stream_rate_col
+
+STORE_VERSION = 2
+_OFFSETS = ("starts", "stops", "qi_pos", "post_start")
+
+
+def write_store(part, path):
+    """Write a ``WellPartition`` to ``path`` (atomically replaced) and return it opened."""
+    path = os.fspath(path)
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(tmp)
+    cols = {"day": part.day, "rate": part.rates, "t_months": part.t_months, **part.columns}
+    for name in _OFFSETS:
+        cols[name] = getattr(part, name).astype(np.int64)
+    for s, (rates, qi_pos, post_start, t_months) in part.streams.items():
+        cols.update({stream_rate_col(s): rates, f"qi_pos_{s}": qi_pos.astype(np.int64),
+                     f"post_start_{s}": post_start.astype(np.int64), f"t_months_{s}": t_months})
+    for name, arr in cols.items():
+        np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(arr))
+    wells = [w.item() if hasattr(w, "item") else w for w in part.wells]
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": STORE_VERSION, "rate_col": part.rate_col, "n_rows": int(part.n_rows),
+                   "wells": wells, "columns": list(part.columns), "streams": list(part.streams)}, f)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp, path)
+    return ColumnStore(path)
+
+
+_open_stores = {}  # path -> (manifest stamp, ColumnStore)
+
+
+def _manifest_stamp(path):
+    st = os.stat(os.path.join(path, "meta.json"))
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def open_store(path):
+    """Open a store once per process (batch workers reuse the same mapping).
+
+    The cache is keyed on the path and its ``meta.json``, so a store rewritten
+    in place by ``write_store`` is reopened instead of served from old maps.
+    """
+    path = os.fspath(path)
+    stamp = _manifest_stamp(path)
+    cached = _open_stores.get(path)
+    if cached is None or cached[0] != stamp:
+        cached = _open_stores[path] = (stamp, ColumnStore(path))
+    return cached[1]
+
+
+def is_store(path):
+    return os.path.isfile(os.path.join(os.fspath(path), "meta.json"))
+
+
+class ColumnStore(WellPartition):
+    """Read-only, memory-mapped ``WellPartition`` backed by a store directory."""
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"unsupported store version {meta.get('version')!r} in {self.path}")
+
+        def load(name, mmap=None):
+            return np.load(os.path.join(self.path, name + ".npy"), mmap_mode=mmap)
+
+        self.rate_col = meta["rate_col"]
+        self.n_rows = meta["n_rows"]
+        self.wells = np.array(meta["wells"], dtype=object)
+        self._row = {w: i for i, w in enumerate(self.wells)}
+        self.day = load("day", "r")
+        self.rates = load("rate", "r")
+        t_path = os.path.join(self.path, "t_months.npy")  # absent in stores written before it existed
+        self.t_months = np.load(t_path, mmap_mode="r") if os.path.exists(t_path) else None
+        for name in _OFFSETS:
+            setattr(self, name, load(name))
+        streams = meta.get("streams", [])
+        self.columns = {c: load(c, "r") for c in meta.get("columns", ["oil", "days", *streams])}
+        self.streams = {s: (load(stream_rate_col(s), "r"), load(f"qi_pos_{s}"), load(f"post_start_{s}"),
+                            load(f"t_months_{s}", "r"))
+                        for s in streams}
+
+    def __reduce__(self):
+        # workers reopen the mapping instead of receiving pickled columns
+        return open_store, (self.path,)
@@ -0,0 +1,103 @@
+"""Oil, gas and water in one all-wells pass, with GOR/WOR trends.
+
+Gas and water are extra streams of a ``WellPartition``. Each is a volume
+column over the same producing days. Each stream gets its own Qi and time
+axis from the partition's single pass, and each well's streams are fitted
+in the task that fits its oil row (``fit_well_row(streams=...)``). The wide
+summary is the usual oil summary plus ``<stream>_<field>`` columns per
+stream. The ratio trends come from the recorded rates over each well's
+post-Qi oil window: GOR is gas/oil and WOR water/oil, in the input units. They
+are computed for the whole field with a few ``bincount`` sums.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .engine import SUMMARY_COLUMNS, collect_rows, iter_fit_rows
+from .partition import WellPartition
+
+STREAMS = ("gas", "water")
+RATIOS = {"gas": "GOR", "water": "WOR"}
+STREAM_FIELDS = ["qi_date", "Qi_detected", "Qe_actual_last", "Qe_fit", "Mismatch_%", "Di_per_month",
+                 "b_factor", "Cum_Fitted", "status"]
+STREAM_ROW_COLUMNS = ["well", "stream"] + STREAM_FIELDS
+RATIO_FIELDS = ["start", "end", "trend_per_yr"]
+
+
+def stream_columns(streams):
+    """Columns the wide summary adds for ``streams``, after ``SUMMARY_COLUMNS``."""
+    return ([f"{s}_{c}" for s in streams for c in STREAM_FIELDS]
+            + [f"{ratio_label(s)}_{f}" for s in streams for f in RATIO_FIELDS])
+
+
+def ratio_label(name):
+    """``GOR``/``WOR`` for gas/water, ``<name>_ratio`` for any other stream."""
+    return RATIOS.get(name, f"{name}_ratio")
+
+
+def stream_frame(rows):
+    """Long (well, stream) frame of the ``"streams"`` entries of fitted rows."""
+    return pd.DataFrame([{"well": r["well"], "stream": s, **sr}
+                         for r in rows for s, sr in r.get("streams", {}).items()],
+                        columns=STREAM_ROW_COLUMNS)
+
+
+def ratio_trends(part, name):
+    """Per-well ``<label>_start``, ``_end`` and ``_trend_per_yr`` of stream ``name`` over oil.
+
+    Start and end are the first and last finite ratios on or after the oil
+    Qi date. The trend is their least-squares slope against time, per year.
+    """
+    label = ratio_label(name)
+    n_wells = len(part)
+    lengths = part.lengths()
+    group = np.repeat(np.arange(n_wells), lengths)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.asarray(part.streams[name][0]) / np.asarray(part.rates)
+    post = np.arange(len(ratio)) >= np.repeat(part.post_start, lengths)
+    valid = post & np.isfinite(ratio)
+    g, y, t = group[valid], ratio[valid], np.asarray(part.t_months)[valid]
+
+    cnt = np.bincount(g, minlength=n_wells).astype(float)
+    s_t, s_y = np.bincount(g, t, n_wells), np.bincount(g, y, n_wells)
+    s_tt, s_ty = np.bincount(g, t * t, n_wells), np.bincount(g, t * y, n_wells)
+    denom = cnt * s_tt - s_t**2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(denom > 1e-12 * np.maximum(cnt * s_tt, 1), (cnt * s_ty - s_t * s_y) / denom, np.nan)
+
+    start, end = np.full(n_wells, np.nan), np.full(n_wells, np.nan)
+    wells_hit, first = np.unique(g, return_index=True)
+    start[wells_hit] = y[first]
+    wells_hit, last = np.unique(g[::-1], return_index=True)
+    end[wells_hit] = y[len(y) - 1 - last]
+    return pd.DataFrame({"well": part.wells, f"{label}_start": start, f"{label}_end": end,
+                         f"{label}_trend_per_yr": slope * 12})
+
+
+def widen(summary, streams_long, part, streams=None):
+    """``summary`` with per-stream fit columns and ratio trends merged on by well."""
+    streams = tuple(part.streams) if streams is None else tuple(streams)
+    wide = summary
+    for s in streams:
+        cols = streams_long.loc[streams_long["stream"] == s, ["well"] + STREAM_FIELDS]
+        wide = wide.merge(cols.rename(columns={c: f"{s}_{c}" for c in STREAM_FIELDS}), on="well", how="left")
+        wide = wide.merge(ratio_trends(part, s), on="well", how="left")
+    return wide.reindex(columns=[*summary.columns, *stream_columns(streams)])
+
+
+def fit_streams(data, rate_col, b_min, b_max, streams=None, progress=None, workers=1, solver="de",
+                vectorized=True, cache=None):
+    """Wide all-wells summary: oil plus every stream, fitted in one pass over the wells.
+
+    ``data`` is a ``WellPartition`` with streams (or a frame with
+    ``<stream>_rate`` columns when ``streams`` is given); ``streams``
+    defaults to all of the partition's.
+    """
+    part = data if isinstance(data, WellPartition) else WellPartition(data, rate_col, streams or ())
+    streams = tuple(part.streams) if streams is None else tuple(streams)
+    rows = iter_fit_rows(part, b_min, b_max, workers=workers, solver=solver, vectorized=vectorized,
+                         cache=cache, streams=streams)
+    by_well = collect_rows(rows, len(part), progress)
+    ordered = [by_well[w] for w in part.wells]
+    summary = pd.DataFrame(ordered, columns=SUMMARY_COLUMNS)
+    return widen(summary, stream_frame(ordered), part, streams)
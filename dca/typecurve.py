@@ -0,0 +1,157 @@
+"""Type curves: wells aligned on time since Qi, percentile curves and their fits.
+
+Built on an existing all-wells summary. The summary selects the wells and
+their cohorts and supplies ``Qi_detected``, ``Di_per_month`` and ``b_factor``,
+so no well is refitted. The rates come straight from the partition arrays.
+Every post-Qi record lands in a (well × month) grid in one scatter, and the
+percentiles are ``nanpercentile`` down the well axis. Only the three percentile
+curves themselves are fitted, and those fits go through the fit cache.
+
+Percentiles follow the reserves convention: P10 is the high case (exceeded
+by 10% of wells), so P10 ≥ P50 ≥ P90.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .engine import DAYS_PER_MONTH, fit_decline
+from .forecast import arps_rate_v
+
+PERCENTILES = {"P10": 90, "P50": 50, "P90": 10}  # label -> numpy percentile
+PARAMETER_COLUMNS = ["curve", "source", "wells", "Qi", "Di_per_month", "b_factor", "solver"]
+
+
+def cohort_labels(summary, freq="Y"):
+    """Cohort of each summary row: the period (year by default) of its Qi date."""
+    return pd.to_datetime(summary["qi_date"]).dt.to_period(freq).astype(str)
+
+
+def select_wells(summary, qi_from=None, qi_to=None, cohorts=None, freq="Y"):
+    """Fitted wells of ``summary`` whose Qi date is in [qi_from, qi_to] and cohort in ``cohorts``."""
+    keep = (summary["status"] == "ok").to_numpy().copy()
+    qi_date = pd.to_datetime(summary["qi_date"])
+    if qi_from is not None:
+        keep &= (qi_date >= pd.Timestamp(qi_from)).to_numpy()
+    if qi_to is not None:
+        keep &= (qi_date <= pd.Timestamp(qi_to)).to_numpy()
+    if cohorts:
+        keep &= cohort_labels(summary, freq).isin(list(cohorts)).to_numpy()
+    return summary[keep]
+
+
+def align_wells(part, wells, max_months=None, normalize=False):
+    """(months, matrix) with one row per well of post-Qi rates on a monthly grid.
+
+    Row ``i`` holds ``wells[i]``; column ``k`` is the mean rate of the records
+    whose time since Qi rounds to ``k`` months (NaN where a well has none).
+    ``normalize`` divides each row by the well's Qi, for shape-only curves.
+    """
+    rows = part.rows(wells)
+    starts, stops = part.post_start[rows], part.stops[rows]
+    lengths = stops - starts
+    n = int(lengths.sum())
+    which = np.repeat(np.arange(len(rows)), lengths)
+    idx = np.arange(n) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+
+    if part.t_months is not None:
+        t = part.t_months[idx]
+    else:
+        t = (part.day[idx] - part.day[starts][which]).astype(float) / DAYS_PER_MONTH
+    k = np.rint(t).astype(np.int64)
+    rate = part.rates[idx]
+    if normalize:
+        rate = rate / part.rates[part.qi_pos[rows]][which]
+    n_months = int(k.max()) + 1 if n else 0
+    if max_months is not None:
+        n_months = min(n_months, int(max_months) + 1)
+    inside = k < n_months
+
+    total = np.zeros((len(rows), n_months))
+    count = np.zeros((len(rows), n_months))
+    np.add.at(total, (which[inside], k[inside]), rate[inside])
+    np.add.at(count, (which[inside], k[inside]), 1)
+    with np.errstate(invalid="ignore"):
+        matrix = total / count
+    return np.arange(n_months, dtype=float), matrix
+
+
+def percentile_curves(matrix, min_wells=3):
+    """P10/P50/P90 down the well axis plus the number of wells per month.
+
+    Months with fewer than ``min_wells`` wells reporting are NaN, so a thin
+    tail of long-lived wells does not bend the curves.
+    """
+    wells = np.sum(np.isfinite(matrix), axis=0)
+    out = pd.DataFrame({"wells": wells})
+    if matrix.shape[0]:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN months
+            pct = np.nanpercentile(matrix, list(PERCENTILES.values()), axis=0)
+    else:
+        pct = np.full((len(PERCENTILES), matrix.shape[1]), np.nan)
+    for label, row in zip(PERCENTILES, pct):
+        out[label] = np.where(wells >= min_wells, row, np.nan)
+    return out
+
+
+def parameter_percentiles(summary):
+    """P10/P50/P90 of the summary's per-well Qi, Di and b, without refitting.
+
+    Di runs the other way (a high case declines slower), so P10 takes its
+    10th percentile.
+    """
+    rows = []
+    for label, p in PERCENTILES.items():
+        rows.append({"curve": label, "source": "well parameters", "wells": len(summary),
+                     "Qi": np.nanpercentile(summary["Qi_detected"], p) if len(summary) else np.nan,
+                     "Di_per_month": np.nanpercentile(summary["Di_per_month"], 100 - p) if len(summary) else np.nan,
+                     "b_factor": np.nanpercentile(summary["b_factor"], p) if len(summary) else np.nan,
+                     "solver": None})
+    return pd.DataFrame(rows, columns=PARAMETER_COLUMNS)
+
+
+def fit_percentile_curves(months, curves, b_min, b_max, solver="de", scale=1.0, cache=None):
+    """Fit (Di, b) to each percentile curve; returns the parameter rows and fitted curves.
+
+    ``scale`` multiplies normalized curves back to rates before fitting, since
+    the objective works on log1p(rate) and is not scale-free.
+    """
+    rows, fitted = [], {}
+    n_wells = int(curves["wells"].max()) if len(curves) else 0
+    for label in PERCENTILES:
+        q = curves[label].to_numpy(float) * scale
+        ok = np.isfinite(q) & (q > 0)
+        if ok.sum() < 3 or not ok[0]:
+            rows.append({"curve": label, "source": "percentile curve", "wells": n_wells,
+                         "Qi": np.nan, "Di_per_month": np.nan, "b_factor": np.nan, "solver": None})
+            continue
+        t, q = months[ok], q[ok]
+        di, b, _, path = fit_decline(t, q, q[0], b_min, b_max, solver, cache=cache)
+        fitted[label] = arps_rate_v(q[0], di, b, months) / scale
+        rows.append({"curve": label, "source": "percentile curve", "wells": n_wells,
+                     "Qi": q[0] / scale, "Di_per_month": di, "b_factor": b, "solver": path})
+    return pd.DataFrame(rows, columns=PARAMETER_COLUMNS), pd.DataFrame(fitted, index=months)
+
+
+def build_type_curves(part, summary, b_min, b_max, solver="de", normalize=False, min_wells=3,
+                      max_months=None, cache=None):
+    """Everything the Type Curves tab shows, for an already filtered ``summary``.
+
+    Returns (curves, parameters): ``curves`` has the month grid, wells per
+    month, the P10/P50/P90 data curves and their fits (``*_fit``);
+    ``parameters`` stacks the percentile-curve fits and the percentiles of
+    the per-well parameters.
+    """
+    wells = [w for w in summary["well"] if w in part]
+    months, matrix = align_wells(part, wells, max_months, normalize)
+    curves = percentile_curves(matrix, min_wells)
+    curves.insert(0, "month", months)
+    scale = float(np.nanmedian(summary["Qi_detected"])) if normalize and len(summary) else 1.0
+    fits, fitted = fit_percentile_curves(months, curves, b_min, b_max, solver, scale, cache)
+    for label in PERCENTILES:
+        curves[f"{label}_fit"] = fitted[label].to_numpy() if label in fitted else np.nan
+    params = pd.concat([fits, parameter_percentiles(summary[summary["well"].isin(wells)])],
+                       ignore_index=True)
+    return curves, params
@@ -0,0 +1,181 @@
+"""Bootstrap uncertainty on Di, b and EUR.
+
+Each sample perturbs a well's post-Qi series with its own fit residuals and
+refits it. The residuals are log-rate ratios, so the noise is multiplicative
+and every resampled rate stays positive. ``"residual"`` draws them
+independently; ``"block"`` draws contiguous blocks (a moving-block bootstrap),
+which keeps month-to-month correlation such as shut-ins and workover humps.
+
+A sample refit is one trust-region solve warm-started at the point estimate,
+with the usual ``fit_decline`` search as the fallback. Work is split into
+(well, chunk of samples) tasks for a process pool. Sample ``i`` of well ``w``
+is seeded from ``SeedSequence(seed, spawn_key=(w_index, i))``, so results do
+not depend on worker count or chunking. Every task checks a shared wall-clock
+deadline; a capped run reports how many samples each well actually got.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .engine import (DAYS_PER_MONTH, DI_BOUNDS, fit_decline, lsq_tolerance, make_loss, make_residuals,
+                     post_qi_arrays)
+from .forecast import arps_cum, arps_rate_v, time_to_rate
+from .typecurve import PERCENTILES
+
+METHODS = ("residual", "block")
+CHUNK = 50  # samples per pool task
+UNCERTAINTY_COLUMNS = [
+    f"{name}_{label}" for name in ("Di", "b", "EUR") for label in PERCENTILES
+] + ["n_boot"]
+
+
+def sample_seeds(seed, well_index, samples):
+    """One independent ``SeedSequence`` per sample of one well."""
+    return [np.random.SeedSequence(seed, spawn_key=(well_index, i)) for i in samples]
+
+
+def resample(q_fit, log_resid, rng, method="residual", block=6):
+    """One bootstrap series: the fitted curve times resampled residual ratios."""
+    n = len(log_resid)
+    if method == "block" and n > block > 1:
+        starts = rng.integers(0, n - block + 1, size=-(-n // block))
+        idx = (starts[:, None] + np.arange(block)).ravel()[:n]
+    else:
+        idx = rng.integers(0, n, size=n)
+    return q_fit * np.exp(log_resid[idx])
+
+
+def _refit(t, q, qi, b_min, b_max, x0, solver):
+    from scipy.optimize import least_squares
+
+    residuals, jacobian = make_residuals(t, q, qi, b_min, b_max)
+    if b_max > b_min:
+        eps = 1e-9 * (b_max - b_min)
+        start = (min(max(x0[0], DI_BOUNDS[0] * 1.001), DI_BOUNDS[1] * 0.999),
+                 min(max(x0[1], b_min + eps), b_max - eps))
+        try:
+            res = least_squares(residuals, start, jac=jacobian, method="trf",
+                                bounds=((DI_BOUNDS[0], b_min), (DI_BOUNDS[1], b_max)))
+            if res.status > 0 and make_loss(t, q, qi, b_min, b_max)(res.x) <= lsq_tolerance(q):
+                return res.x
+        except (ValueError, FloatingPointError):
+            pass
+    di, b, _, _ = fit_decline(t, q, qi, b_min, b_max, solver, x0=x0)
+    return di, b
+
+
+def bootstrap_series(t, q, qi, di, b, b_min, b_max, samples, seed=0, well_index=0,
+                     method="residual", block=6, solver="lsq", deadline=None):
+    """(Di, b) of the requested bootstrap ``samples`` (indices) of one series.
+
+    ``di``/``b`` are the point estimate the residuals are taken from. Stops
+    early, returning fewer rows, once ``time.time()`` passes ``deadline``.
+    """
+    q_fit = arps_rate_v(qi, di, b, t)
+    log_resid = np.log(q) - np.log(q_fit)
+    out = []
+    for ss in sample_seeds(seed, well_index, samples):
+        if deadline is not None and time.time() > deadline:
+            break
+        q_s = resample(q_fit, log_resid, np.random.default_rng(ss), method, block)
+        out.append(_refit(t, q_s, qi, b_min, b_max, (di, b), solver))
+    return np.array(out, dtype=float).reshape(-1, 2)
+
+
+def _task(well, well_index, dates, rates, qi, post, di, b, samples, kw, t_months=None):
+    t, q = post_qi_arrays(dates, rates, post, t_months)
+    draws = bootstrap_series(t, q, rates[qi], di, b, samples=samples, well_index=well_index, **kw)
+    return well, samples.start, draws
+
+
+def bootstrap_wells(part, summary, b_min, b_max, n_samples=200, seed=0, method="residual", block=6,
+                    solver="lsq", workers=1, max_seconds=None, progress=None):
+    """Bootstrap every fitted well of ``summary``; returns ``{well: (n, 2) array of (Di, b)}``.
+
+    ``max_seconds`` caps the whole run: tasks stop sampling at the deadline
+    and queued tasks are cancelled. Tasks go out one sample chunk of every
+    well at a time, so a capped run spreads its samples across wells.
+    ``progress(done, total)`` counts tasks.
+    """
+    deadline = time.time() + max_seconds if max_seconds else None
+    kw = dict(b_min=b_min, b_max=b_max, seed=seed, method=method, block=block, solver=solver,
+              deadline=deadline)
+    fitted = summary[(summary["status"] == "ok") & summary["well"].isin(list(part.wells))]
+    positions = dict(zip(part.wells, range(len(part))))
+    wells = list(zip(fitted["well"], fitted["Di_per_month"], fitted["b_factor"]))
+    tasks = [(w, positions[w], *part.arrays(w), di, b, range(lo, min(lo + CHUNK, n_samples)), kw,
+              part.times(w)) for lo in range(0, n_samples, CHUNK) for w, di, b in wells]
+
+    results = {w: {} for w, _, _ in wells}  # well -> {first sample: draws}
+    if workers <= 1 or len(tasks) <= 1:
+        for i, task in enumerate(tasks, start=1):
+            w, lo, draws = _task(*task)
+            results[w][lo] = draws
+            if progress is not None:
+                progress(i, len(tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_task, *task) for task in tasks]
+            try:
+                for i, fut in enumerate(as_completed(futures), start=1):
+                    try:
+                        w, lo, draws = fut.result()
+                        results[w][lo] = draws
+                    except Exception:  # cancelled at the deadline / worker died: fewer samples
+                        pass
+                    if progress is not None:
+                        progress(i, len(tasks))
+                    if deadline is not None and time.time() > deadline:
+                        for f in futures:
+                            f.cancel()
+            except BaseException:  # progress() aborting the run
+                for f in futures:
+                    f.cancel()
+                raise
+    return {w: np.concatenate([d[lo] for lo in sorted(d)]) if d else np.empty((0, 2))
+            for w, d in results.items()}
+
+
+def eur_samples(qi, t_now, draws, q_limit=1.0, horizon_months=360.0):
+    """EUR (STB) of each (Di, b) draw, produced to ``q_limit`` or ``t_now + horizon``."""
+    di, b = draws[:, 0], draws[:, 1]
+    t_end = np.maximum(np.minimum(time_to_rate(qi, di, b, q_limit), t_now + horizon_months), t_now)
+    return arps_cum(qi, di, b, t_end)
+
+
+def _pct(values, high_is_low=False):
+    if not len(values):
+        return [np.nan] * len(PERCENTILES)
+    ps = [100 - p if high_is_low else p for p in PERCENTILES.values()]
+    return list(np.percentile(values, ps))
+
+
+def uncertainty_table(summary, draws, q_limit=1.0, horizon_months=360.0):
+    """P10/P50/P90 Di, b and EUR per well (P10 = high case, so the lowest Di).
+
+    EUR is produced from each well's last record, as ``forecast.forecast_wells``
+    does without ``as_of``.
+    """
+    rows = []
+    by_well = summary.drop_duplicates("well").set_index("well")
+    for w, d in draws.items():
+        r = by_well.loc[w]
+        t_now = (pd.Timestamp(r["last_date"]) - pd.Timestamp(r["qi_date"])).days / DAYS_PER_MONTH
+        eur = eur_samples(float(r["Qi_detected"]), t_now, d, q_limit, horizon_months)
+        rows.append([w, *_pct(d[:, 0], high_is_low=True), *_pct(d[:, 1]), *_pct(eur), len(d)])
+    return pd.DataFrame(rows, columns=["well"] + UNCERTAINTY_COLUMNS)
+
+
+def with_uncertainty(summary, table):
+    """``summary`` with the uncertainty columns merged on (replacing any earlier ones)."""
+    base = summary.drop(columns=[c for c in UNCERTAINTY_COLUMNS if c in summary])
+    return base.merge(table, on="well", how="left")
+
+
+def rate_bands(qi, t, draws):
+    """P10/P50/P90 fitted-rate curves over ``t`` from a set of (Di, b) draws."""
+    curves = arps_rate_v(qi, draws[:, :1], draws[:, 1:], np.asarray(t, dtype=float)[None, :])
+    return {label: np.percentile(curves, p, axis=0) for label, p in PERCENTILES.items()}
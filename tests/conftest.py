@@ -0,0 +1,38 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dca.engine import arps_rate  # noqa: E402
+
+
+@pytest.fixture
+def series():
+    """(t, q, qi) of a noisy hyperbolic decline."""
+    t = np.arange(36, dtype=float)
+    q = arps_rate(300.0, 0.08, 0.5, t) * np.exp(np.random.default_rng(0).normal(0, 0.03, len(t)))
+    return t, q, q[0]
+
+
+def production(n_wells=6, months=30, seed=0):
+    """A small cleaned-looking production frame (well, date, oil, days)."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for k in range(n_wells):
+        dates = pd.date_range("2018-01-01", periods=months, freq="MS") + pd.DateOffset(months=k)
+        t = np.arange(months, dtype=float)
+        q = arps_rate(rng.uniform(100, 400), rng.uniform(0.03, 0.15), rng.uniform(0.1, 0.9), t)
+        q *= np.exp(rng.normal(0, 0.03, months))
+        rows.append(pd.DataFrame({"wellname": f"W{k:03d}", "date": dates, "oil": q * 30, "days": 30}))
+    return pd.concat(rows, ignore_index=True)
+
+
+@pytest.fixture
+def cleaned():
+    from dca.engine import clean_production
+
+    return clean_production(production(), "wellname", "date", "oil", "days")
@@ -0,0 +1,33 @@
+from dca.cache import FitCache, fit_key
+from dca.engine import FIT_VERSION, fit_decline
+
+
+def test_hits_and_misses(series, tmp_path):
+    cache = FitCache(str(tmp_path / "fits.sqlite"))
+    first, again = {}, {}
+    a = fit_decline(*series, 0.0, 1.0, "lsq", cache=cache, stats=first)
+    b = fit_decline(*series, 0.0, 1.0, "lsq", cache=cache, stats=again)
+    assert first["nfev"] > 0 and again["nfev"] == 0
+    assert (a[0], a[1], a[3]) == (b[0], b[1], b[3])
+    fit_decline(*series, 0.0, 2.0, "lsq", cache=cache)  # other bounds: a miss
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+    reopened = FitCache(cache.path)
+    fit_decline(*series, 0.0, 1.0, "lsq", cache=reopened)
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_warm_start_is_part_of_the_key(series, tmp_path):
+    t, q, qi = series
+    cold = fit_key(t, q, qi, 0.0, 1.0, "lsq", True, FIT_VERSION)
+    assert cold == fit_key(t, q, qi, 0.0, 1.0, "lsq", True, FIT_VERSION, None)
+    warm = fit_key(t, q, qi, 0.0, 1.0, "lsq", True, FIT_VERSION, (0.2, 0.9))
+    assert warm not in (cold, fit_key(t, q, qi, 0.0, 1.0, "lsq", True, FIT_VERSION, (0.2, 0.8)))
+
+    cache = FitCache(str(tmp_path / "fits.sqlite"))
+    fit_decline(t, q, qi, 0.0, 1.0, "lsq", cache=cache)
+    stats = {}
+    fit_decline(t, q, qi, 0.0, 1.0, "lsq", cache=cache, x0=(0.2, 0.9), stats=stats)
+    assert stats["nfev"] > 0  # not answered by the cold-start entry
+    fit_decline(t, q, qi, 0.0, 1.0, "lsq", cache=cache, x0=(0.2, 0.9), stats=stats)
+    assert stats["nfev"] == 0
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dca.checkpoint import CheckpointSink, checkpointed_fit, stream_fit
+from dca.engine import _failed_row, fit_all_wells
+from dca.partition import WellPartition
+
+
+@pytest.fixture
+def part(cleaned):
+    return WellPartition(cleaned, "oil_rate")
+
+
+def fitted(summary):
+    return summary.drop(columns="nfev").reset_index(drop=True)
+
+
+def test_resume_skips_done_wells_and_matches_full_run(part, tmp_path):
+    path = tmp_path / "ck.sqlite"
+    sink = CheckpointSink(path)
+    g = stream_fit(part, sink, 0, 1, solver="lsq")
+    for i, n, row in g:
+        if i == 2:
+            break
+    g.close()
+    assert len(sink.done_wells()) == 2
+    sink.close()
+    seen = []
+    out = checkpointed_fit(part, path, 0, 1, solver="lsq", progress=lambda i, n, w: seen.append(i))
+    assert seen[0] == 3 and len(out) == len(part)
+    pd.testing.assert_frame_equal(fitted(out), fitted(fit_all_wells(part, "oil_rate", 0, 1, solver="lsq")))
+
+
+def test_resume_refuses_other_settings_or_data(part, cleaned, tmp_path):
+    path = tmp_path / "ck.sqlite"
+    checkpointed_fit(part, path, 0, 1, solver="lsq")
+    with pytest.raises(ValueError, match="different settings"):
+        checkpointed_fit(part, path, 0, 2, solver="lsq")
+    changed = cleaned.copy()
+    changed.loc[changed.index[-1], "oil_rate"] *= 1.5
+    with pytest.raises(ValueError, match="different settings"):
+        checkpointed_fit(WellPartition(changed, "oil_rate"), path, 0, 1, solver="lsq")
+
+
+def test_summary_holds_only_the_fitted_wells(part, tmp_path):
+    path = tmp_path / "ck.sqlite"
+    checkpointed_fit(part, path, 0, 1, solver="lsq", wells=list(part.wells[:3]))
+    sink = CheckpointSink(path)
+    sink.append([_failed_row("stale", "ok")])  # a row no longer in the data
+    sink.close()
+    out = checkpointed_fit(part, path, 0, 1, solver="lsq", wells=list(part.wells[:3]))
+    assert out["well"].tolist() == list(part.wells[:3])
+
+
+def test_error_rows_are_retried(part, tmp_path):
+    path = tmp_path / "ck.sqlite"
+    checkpointed_fit(part, path, 0, 1, solver="lsq")
+    well = part.wells[1]
+    sink = CheckpointSink(path)
+    sink.append([_failed_row(well, "error: worker died")])
+    assert well not in sink.done_wells()
+    sink.close()
+    seen = []
+    out = checkpointed_fit(part, path, 0, 1, solver="lsq", progress=lambda i, n, w: seen.append(w))
+    assert seen == [well]
+    assert np.all(out["status"] == "ok")
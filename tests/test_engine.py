@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from dca.engine import (arps_jacobian, arps_rate, fit_decline, make_loss, make_residuals,
+                        make_vectorized_loss)
+
+
+def test_vectorized_loss_matches_scalar_loss(series):
+    t, q, qi = series
+    scalar = make_loss(t, q, qi, 0.0, 1.0)
+    vloss = make_vectorized_loss(t, q, qi, 0.0, 1.0)
+    cand = np.array([[0.01, 0.08, 0.3, 0.05, -0.1], [0.0, 0.5, 0.99, 1e-12, 0.5]])
+    np.testing.assert_allclose(vloss(cand), [scalar(c) for c in cand.T], rtol=1e-12)
+    assert np.isclose(vloss(cand[:, 1]), scalar(cand[:, 1]))
+
+
+def test_vectorized_loss_counts_candidates(series):
+    vloss = make_vectorized_loss(*series, 0.0, 1.0)
+    vloss(np.full((2, 7), 0.1))
+    vloss(np.array([0.1, 0.5]))
+    assert vloss.nfev == 8
+
+
+def test_vectorized_de_reports_candidates_not_calls(series):
+    stats = {}
+    fit_decline(*series, 0.0, 1.0, "de", vectorized=True, stats=stats)
+    serial = {}
+    fit_decline(*series, 0.0, 1.0, "de", vectorized=False, stats=serial)
+    # one call per generation would be ~30x fewer than the per-candidate count
+    assert stats["nfev"] > serial["nfev"] / 3
+
+
+@pytest.mark.parametrize("b", [0.0, 0.05, 0.5, 1.0, 1.6])
+def test_arps_jacobian_matches_finite_differences(b):
+    t = np.linspace(0.0, 120.0, 61)
+    t[1] = 1e-4  # the series branch of dq/db
+    di, h = 0.07, 1e-7
+    q, dq_ddi, dq_db = arps_jacobian(250.0, di, b, t)
+    np.testing.assert_allclose(q, arps_rate(250.0, di, b, t), rtol=1e-12)
+    num_di = (arps_rate(250.0, di + h, b, t) - arps_rate(250.0, di - h, b, t)) / (2 * h)
+    np.testing.assert_allclose(dq_ddi, num_di, rtol=1e-6, atol=1e-5)  # rounding of q ~ 250 over 2h
+    if b > 0:  # at b = 0 the rate switches to its exponential form, so only the right side exists
+        num_b = (arps_rate(250.0, di, b + h, t) - arps_rate(250.0, di, b - h, t)) / (2 * h)
+        np.testing.assert_allclose(dq_db, num_b, rtol=1e-5, atol=1e-6)
+
+
+def test_residuals_match_loss_and_jacobian(series):
+    t, q, qi = series
+    loss = make_loss(t, q, qi, 0.0, 1.5)
+    residuals, jacobian = make_residuals(t, q, qi, 0.0, 1.5)
+    for x in ([0.08, 0.5], [0.02, 1.3], [0.3, 0.01]):
+        assert np.isclose(np.sum(residuals(x) ** 2), loss(x), rtol=1e-12)
+        h = 1e-7
+        num = np.column_stack([(residuals(np.add(x, d)) - residuals(np.subtract(x, d))) / (2 * h)
+                               for d in ([h, 0], [0, h])])
+        np.testing.assert_allclose(jacobian(x), num, rtol=1e-5, atol=1e-7)
+
+
+def test_lsq_fit_reaches_the_de_loss(series):
+    t, q, qi = series
+    loss = make_loss(t, q, qi, 0.0, 1.0)
+    de_di, de_b, _, _ = fit_decline(t, q, qi, 0.0, 1.0, "de")
+    di, b, q_fit, path = fit_decline(t, q, qi, 0.0, 1.0, "lsq")
+    assert path == "lsq"
+    assert loss((di, b)) <= loss((de_di, de_b)) * (1 + 1e-6)
+    np.testing.assert_allclose(q_fit, arps_rate(qi, di, b, t))
+
+
+def test_lsq_escalates_to_de_and_keeps_the_lower_loss(series, monkeypatch):
+    from scipy.optimize import OptimizeResult
+
+    from dca import engine
+
+    t, q, qi = series
+    loss = make_loss(t, q, qi, 0.0, 1.0)
+    de_di, de_b, _, _ = fit_decline(t, q, qi, 0.0, 1.0, "de")
+    bad = np.array([0.5, 0.05])
+    monkeypatch.setattr(engine, "_fit_lsq", lambda *a: (bad, loss(bad), 7))
+    di, b, _, path = fit_decline(t, q, qi, 0.0, 1.0, "lsq")
+    assert path == "lsq->de" and (di, b) == (de_di, de_b)
+
+    # DE landing above the local fit's loss does not replace it
+    monkeypatch.setattr(engine, "_fit_de", lambda *a: (OptimizeResult(x=np.array([0.55, 0.01])), 30))
+    di, b, _, path = fit_decline(t, q, qi, 0.0, 1.0, "lsq")
+    assert path == "lsq" and (di, b) == tuple(bad)
+
+
+def test_noisy_well_is_not_escalated_for_its_noise():
+    t = np.arange(60, dtype=float)
+    q = arps_rate(300.0, 0.08, 0.5, t) * np.exp(np.random.default_rng(3).normal(0, 0.25, len(t)))
+    stats = {}
+    di, b, _, path = fit_decline(t, q, q[0], 0.0, 1.0, "lsq", stats=stats)
+    assert make_loss(t, q, q[0], 0.0, 1.0)((di, b)) > 0.05  # above the absolute bound
+    assert path == "lsq" and stats["nfev"] < 200
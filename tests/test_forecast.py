@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from scipy.integrate import quad
+
+from dca.engine import DAYS_PER_MONTH
+from dca.forecast import arps_cum, arps_rate_v, time_to_rate
+
+
+@pytest.mark.parametrize("b", [0.0, 0.3, 1.0 - 1e-9, 1.0, 1.4])
+def test_arps_cum_matches_numeric_integration(b):
+    qi, di = 400.0, 0.06
+    for t in (0.5, 12.0, 240.0):
+        numeric, _ = quad(lambda s: float(arps_rate_v(qi, di, b, s)), 0.0, t, epsabs=0, epsrel=1e-11)
+        assert np.isclose(arps_cum(qi, di, b, t), numeric * DAYS_PER_MONTH, rtol=1e-8)
+
+
+def test_arps_cum_broadcasts_over_wells():
+    qi, di, b = np.array([400.0, 90.0]), np.array([0.06, 0.2]), np.array([0.0, 0.8])
+    cum = arps_cum(qi[:, None], di[:, None], b[:, None], np.array([[6.0, 60.0]]))
+    for k in range(2):
+        np.testing.assert_allclose(cum[k], [arps_cum(qi[k], di[k], b[k], t) for t in (6.0, 60.0)])
+
+
+@pytest.mark.parametrize("b", [0.0, 0.5, 1.2])
+def test_time_to_rate_inverts_the_rate(b):
+    t = time_to_rate(400.0, 0.06, b, 5.0)
+    assert np.isclose(arps_rate_v(400.0, 0.06, b, t), 5.0)
+    assert time_to_rate(400.0, 0.06, b, 500.0) == 0.0
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from dca.engine import fit_all_wells
+from dca.incremental import incremental_fit, plan_refit
+from dca.partition import WellPartition
+
+
+def test_plan_refit_splits_wells(cleaned):
+    prior = fit_all_wells(WellPartition(cleaned, "oil_rate"), "oil_rate", 0, 1, solver="lsq")
+    wells = list(prior["well"])
+    grown = cleaned[cleaned["well"] != wells[0]]  # W0 removed
+    last = grown[grown["well"] == wells[1]].iloc[[-1]].copy()
+    last["date"] += pd.DateOffset(months=1)  # W1 gains a month
+    extra = grown[grown["well"] == wells[2]].copy()
+    extra["well"] = "NEW"
+    grown = pd.concat([grown, last, extra], ignore_index=True)
+
+    changed, unchanged, new, removed = plan_refit(WellPartition(grown, "oil_rate"), prior)
+    assert changed == [wells[1]] and new == ["NEW"] and removed == [wells[0]]
+    assert sorted(unchanged) == sorted(wells[2:])
+
+
+def test_incremental_fit_keeps_unchanged_rows(cleaned):
+    part = WellPartition(cleaned, "oil_rate")
+    prior = fit_all_wells(part, "oil_rate", 0, 1, solver="lsq")
+    summary, changelog = incremental_fit(part, prior, "oil_rate", 0, 1, solver="lsq")
+    pd.testing.assert_frame_equal(summary.drop(columns="nfev"), prior.drop(columns="nfev"), check_dtype=False)
+    assert (summary["nfev"] == 0).all()  # nothing was refitted
+    assert changelog.empty
+
+
+def test_incremental_summary_keeps_partition_order(cleaned):
+    prior = fit_all_wells(WellPartition(cleaned, "oil_rate"), "oil_rate", 0, 1, solver="lsq")
+    middle = prior["well"].iloc[2]
+    last = cleaned[cleaned["well"] == middle].iloc[[-1]].copy()
+    last["date"] += pd.DateOffset(months=1)
+    part = WellPartition(pd.concat([cleaned, last], ignore_index=True), "oil_rate")
+    summary, _ = incremental_fit(part, prior, "oil_rate", 0, 1, solver="lsq")
+    assert summary["well"].tolist() == list(part.wells)
+    assert (summary["nfev"] > 0).tolist() == [w == middle for w in part.wells]
@@ -0,0 +1,25 @@
+import io
+
+import pandas as pd
+
+from dca.engine import clean_production
+from dca.ingest import ingest_csv
+
+
+def _csv(df):
+    return io.BytesIO(df.to_csv(index=False, date_format="%d/%m/%Y").encode())
+
+
+def test_ingest_matches_clean_production(cleaned):
+    raw = cleaned[["well", "date", "oil", "days"]]
+    out = ingest_csv(_csv(raw), "well", "date", "oil", "days", chunksize=50)
+    pd.testing.assert_frame_equal(out, cleaned.reset_index(drop=True), check_dtype=False)
+
+
+def test_numeric_well_ids_keep_their_inferred_type():
+    text = ("well,date,oil,days\n1001,01/01/2020,300,30\n999,01/02/2020,200,30\n"
+            "1001.0,01/02/2020,250,30\n")
+    out = ingest_csv(io.BytesIO(text.encode()), "well", "date", "oil", "days", chunksize=1)
+    full = clean_production(pd.read_csv(io.StringIO(text)), "well", "date", "oil", "days")
+    assert out["well"].tolist() == full["well"].tolist() == [999, 1001, 1001]
+    assert out["well"].dtype == full["well"].dtype
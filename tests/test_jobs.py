@@ -0,0 +1,71 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from dca.engine import fit_all_wells
+from dca.jobs import JobTable, job_store, run_job
+from dca.partition import WellPartition
+from dca.storage import open_store, write_store
+
+
+@pytest.fixture
+def part(cleaned):
+    return WellPartition(cleaned, "oil_rate")
+
+
+def queue_fit(table, store):
+    params = dict(rate_col="oil_rate", b_min=0, b_max=1, solver="lsq", workers=1, vectorized=True,
+                  cache_path=None, tol_di=0.05, tol_b=0.05, bootstrap=None, incremental=False,
+                  store=os.path.abspath(store.path))
+    return table.create("fit", params)
+
+
+def test_job_runs_to_its_summary(part, tmp_path):
+    table = JobTable(tmp_path / "jobs")
+    job_id = queue_fit(table, write_store(part, tmp_path / "store"))
+    run_job(table, job_id)
+    job = table.get(job_id)
+    assert job["status"] == "done" and job["message"] == f"{len(part)}/{len(part)} wells fitted"
+    summary, changelog = table.result(job_id)
+    expected = fit_all_wells(part, "oil_rate", 0, 1, solver="lsq")
+    assert summary["well"].tolist() == expected["well"].tolist() and changelog is None
+    np.testing.assert_allclose(summary["Di_per_month"], expected["Di_per_month"])
+
+
+def test_job_cancelled_before_it_starts(part, tmp_path):
+    table = JobTable(tmp_path / "jobs")
+    job_id = queue_fit(table, write_store(part, tmp_path / "store"))
+    table.cancel(job_id)
+    run_job(table, job_id)
+    assert table.status(job_id) == "cancelled"
+    assert table.list()["id"].tolist() == [job_id]
+
+
+def test_same_data_shares_one_store(part, cleaned, tmp_path):
+    table = JobTable(tmp_path)
+    path = job_store(table, part)
+    inode = os.stat(os.path.join(path, "meta.json")).st_ino
+    assert job_store(table, WellPartition(cleaned, "oil_rate")) == path
+    assert os.stat(os.path.join(path, "meta.json")).st_ino == inode  # not rewritten
+    assert list(open_store(path).wells) == list(part.wells)
+
+    changed = cleaned.copy()
+    changed.loc[changed.index[0], "oil"] += 1.0
+    assert job_store(table, WellPartition(changed, "oil_rate")) != path
+    assert len(os.listdir(tmp_path / "stores")) == 2
+
+
+def test_prune_keeps_stores_of_resumable_jobs(part, cleaned, tmp_path):
+    table = JobTable(tmp_path)
+    paths = []
+    for k in range(4):
+        changed = cleaned.copy()
+        changed.loc[changed.index[0], "oil_rate"] += k
+        paths.append(job_store(table, WellPartition(changed, "oil_rate")))
+        os.utime(paths[-1], (k, k))  # oldest first
+    job_id = table.create("fit", {})
+    table.update(job_id, status="failed", params=json.dumps({"store": os.path.abspath(paths[0])}))
+    table.prune_stores(keep=1)
+    assert sorted(os.listdir(tmp_path / "stores")) == sorted(os.path.basename(p) for p in (paths[0], paths[3]))
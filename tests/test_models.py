@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from scipy.integrate import quad
+
+from dca.engine import DAYS_PER_MONTH
+from dca.models import MODELS
+
+T = np.arange(0.0, 241.0, 3.0)
+
+
+def numeric_jacobian(model, qi, params, t, rel=1e-6):
+    cols = []
+    for k, p in enumerate(params):
+        h = rel * max(abs(p), 1.0)
+        hi, lo = list(params), list(params)
+        hi[k] += h
+        lo[k] -= h
+        cols.append((model.rate(qi, hi, t) - model.rate(qi, lo, t)) / (2 * h))
+    return np.column_stack(cols)
+
+
+def sample_params(model):
+    lower, upper = (np.asarray(x, dtype=float) for x in model.bounds(0.0, 1.0))
+    for p in model.starts(0.0, 1.0):
+        yield tuple(np.clip(p, lower, upper))
+
+
+@pytest.mark.parametrize("name", list(MODELS))
+def test_jacobian_matches_finite_differences(name):
+    model = MODELS[name]
+    for params in sample_params(model):
+        q, dq = model.jacobian(300.0, params, T)
+        np.testing.assert_allclose(q, model.rate(300.0, params, T), rtol=1e-12)
+        np.testing.assert_allclose(dq, numeric_jacobian(model, 300.0, params, T), rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("name", list(MODELS))
+def test_cum_matches_numeric_integration(name):
+    model = MODELS[name]
+    for params in sample_params(model):
+        for t in (0.5, 24.0, 240.0):
+            numeric, _ = quad(lambda s: float(model.rate(300.0, params, s)), 0.0, t, epsabs=0, epsrel=1e-10)
+            assert np.isclose(model.cum(300.0, params, t), numeric * DAYS_PER_MONTH, rtol=1e-7)
+
+
+@pytest.mark.parametrize("c", [9e-7, -9e-7])
+def test_duong_jacobian_near_m_one(c):
+    # the series branch of dg/dc (|1 - m| < 1e-6) against central differences that stay on the
+    # exact branch of the rate
+    model = MODELS["duong"]
+    params = (0.8, 1 - c)
+    _, dq = model.jacobian(300.0, params, T)
+    np.testing.assert_allclose(dq, numeric_jacobian(model, 300.0, params, T, rel=1e-7), rtol=1e-7, atol=1e-9)
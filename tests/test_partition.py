@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from dca.engine import split_at_qi
+from dca.partition import WellPartition
+
+
+def test_split_matches_split_at_qi(cleaned):
+    cleaned = cleaned.sample(frac=1.0, random_state=0)  # the partition sorts it
+    part = WellPartition(cleaned, "oil_rate")
+    assert list(part.wells) == sorted(cleaned["well"].unique())
+    for well, wd in cleaned.sort_values(["well", "date"]).groupby("well"):
+        qi_date, qi, before, after = split_at_qi(wd.reset_index(drop=True), "oil_rate")
+        p_date, p_qi, p_before, p_after = part.split(well)
+        assert (p_date, p_qi) == (qi_date, qi)
+        assert len(p_before) == len(before)
+        np.testing.assert_allclose(p_after["oil_rate"], after["oil_rate"])
+        np.testing.assert_allclose(p_after["t_months"], after["t_months"])
+
+
+def test_qi_is_the_first_max_and_keeps_its_date_run():
+    df = pd.DataFrame({
+        "well": ["A"] * 5,
+        "date": pd.to_datetime(["2020-01-01", "2020-02-01", "2020-02-01", "2020-03-01", "2020-04-01"]),
+        "oil_rate": [5.0, 3.0, 9.0, 9.0, 4.0],
+    })
+    part = WellPartition(df, "oil_rate")
+    qi_date, qi, before, after = part.split("A")
+    assert (qi_date, qi) == (pd.Timestamp("2020-02-01"), 9.0)
+    assert len(before) == 1 and list(after["oil_rate"]) == [3.0, 9.0, 9.0, 4.0]
@@ -0,0 +1,36 @@
+import time
+
+import pandas as pd
+
+from dca.profiling import RunProfile, count_fits
+
+
+def test_stages_accumulate_calls_and_time():
+    p = RunProfile("batch")
+    for _ in range(3):
+        with p.stage("fit"):
+            pass
+    p.add("render", 0.5, calls=2)
+    table = p.table().set_index("stage")
+    assert table.loc["fit", "calls"] == 3 and table.loc["render", "calls"] == 2
+    assert table.loc["render", "ms_per_call"] == 250.0
+    assert p.to_dict()["stages"]["render"] == {"calls": 2, "seconds": 0.5}
+
+
+def test_finished_profile_stops_its_clock():
+    p = RunProfile("rerun")
+    with p.stage("fit"):
+        pass
+    assert not p.finished
+    p.finish()
+    elapsed = p.elapsed()
+    time.sleep(0.01)
+    assert p.finished and p.elapsed() == elapsed
+    p.finish()  # idempotent
+    assert p.elapsed() == elapsed
+
+
+def test_count_fits_separates_reused_rows():
+    p = RunProfile("batch")
+    count_fits(p, pd.DataFrame({"status": ["ok", "ok", "error: x"], "nfev": [0, 40, 0]}))
+    assert p.counters == {"fits": 2, "objective_evals": 40, "fits_reused": 1}
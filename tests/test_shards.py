@@ -0,0 +1,118 @@
+import json
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from dca import shards
+from dca.engine import fit_all_wells
+from dca.partition import WellPartition
+from dca.shards import ShardQueue, run_settings, run_shard, shard_of, shard_wells
+
+
+@pytest.fixture
+def part(cleaned):
+    return WellPartition(cleaned, "oil_rate")
+
+
+def settings(part):
+    return run_settings(part, 0.0, 1.0, solver="lsq")
+
+
+def test_shards_split_every_well_once(part):
+    assert (shard_of(["W001"] * 3, 4) == shard_of(["W001"], 4)[0]).all()
+    split = [shard_wells(part.wells, i, 3) for i in range(3)]
+    assert sorted(w for s in split for w in s) == sorted(part.wells)
+
+
+def test_plan_is_written_once_and_checked(part, cleaned, tmp_path):
+    q = ShardQueue(tmp_path)
+    assert q.plan(settings(part), part, 3)["shards"] == 3
+    assert q.plan(settings(part), part)["shards"] == 3  # a joining worker
+    with pytest.raises(ValueError, match="shard count"):
+        q.plan(settings(part), part, 4)
+    with pytest.raises(ValueError, match="fit settings"):
+        q.plan(run_settings(part, 0.0, 2.0, solver="lsq"), part)
+    with pytest.raises(ValueError, match="input wells"):
+        q.plan(settings(part), WellPartition(cleaned[cleaned["well"] != part.wells[-1]], "oil_rate"))
+    changed = cleaned.copy()
+    changed.loc[changed.index[-1], "oil_rate"] *= 1.5  # same wells, other data
+    with pytest.raises(ValueError, match="input data"):
+        q.plan(settings(part), WellPartition(changed, "oil_rate"))
+
+
+def test_plan_without_hard_links(part, tmp_path, monkeypatch):
+    def no_link(src, dst):
+        raise PermissionError(1, "Operation not permitted")
+
+    monkeypatch.setattr(os, "link", no_link)
+    q = ShardQueue(tmp_path)
+    assert q.plan(settings(part), part, 2)["shards"] == 2
+    assert q.plan(settings(part), part, 2)["shards"] == 2
+    assert sorted(os.listdir(tmp_path)) == ["plan.json", "plan.json.lock"]
+
+
+def test_claim_drains_the_queue(part, tmp_path):
+    q = ShardQueue(tmp_path)
+    q.plan(settings(part), part, 3)
+    assert [q.claim(), q.claim(), q.claim(), q.claim()] == [0, 1, 2, None]
+    assert q.claim(1) == 1  # an explicit index is always granted
+    with pytest.raises(ValueError):
+        q.claim(3)
+
+
+def test_stale_shards_are_taken_over_once(part, tmp_path):
+    q = ShardQueue(tmp_path, stale_seconds=60)
+    q.plan(settings(part), part, 2)
+    assert [q.claim(), q.claim()] == [0, 1]
+    q.write_status(0, status="running", done=1, host="gone", pid=1)
+    with open(os.path.join(q.shard_dir(0), "status.json")) as f:
+        status = json.load(f)
+    status["updated"] -= 120
+    with open(os.path.join(q.shard_dir(0), "status.json"), "w") as f:
+        json.dump(status, f)
+    old = time.time() - 120
+    os.utime(q.shard_dir(1), (old, old))  # claimed, never reported
+
+    assert q.status()["stale"].tolist() == [True, True]
+    assert sorted([q.claim(), q.claim()]) == [0, 1]
+    assert q.claim() is None  # taken over, no longer stale
+    assert q.status()["stale"].tolist() == [False, False]
+
+
+def test_failed_shards_are_not_taken_over(part, tmp_path):
+    q = ShardQueue(tmp_path, stale_seconds=0)
+    q.plan(settings(part), part, 1)
+    q.claim()
+    q.write_status(0, status="failed", done=0, error="boom")
+    time.sleep(0.01)
+    assert q.claim() is None
+
+
+def test_heartbeat_keeps_a_running_shard_fresh(part, tmp_path, monkeypatch):
+    monkeypatch.setattr(shards, "HEARTBEAT_INTERVAL", 0.01)
+    q = ShardQueue(tmp_path)
+    q.plan(settings(part), part, 1)
+    q.claim()
+    q.write_status(0, status="running", done=0)
+    before = q.read_status(0)["updated"]
+    with shards._heartbeat(q, 0, lambda: dict(status="running", done=3)):
+        time.sleep(0.1)
+    after = q.read_status(0)
+    assert after["updated"] > before and after["done"] == 3
+
+
+def test_merged_shards_match_a_single_run(part, tmp_path):
+    q = ShardQueue(tmp_path)
+    q.plan(settings(part), part, 3)
+    summary, _, unfinished = q.collect()
+    assert len(summary) == 0 and unfinished["status"].tolist() == ["missing"] * 3
+    while (i := q.claim()) is not None:
+        run_shard(q, i, part, 0.0, 1.0, solver="lsq")
+    summary, comparison, unfinished = q.collect()
+    assert comparison is None and unfinished.empty
+    single = fit_all_wells(part, "oil_rate", 0.0, 1.0, solver="lsq")
+    single = single.sort_values("well", kind="mergesort").reset_index(drop=True)
+    cols = [c for c in single if c != "nfev"]
+    pd.testing.assert_frame_equal(summary[cols], single[cols], check_dtype=False)
@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dca.partition import WellPartition
+from dca.storage import open_store, write_store
+
+
+@pytest.fixture
+def part(cleaned):
+    return WellPartition(cleaned, "oil_rate")
+
+
+def test_store_round_trips_the_partition(part, tmp_path):
+    store = write_store(part, tmp_path / "s")
+    assert list(store.wells) == list(part.wells)
+    np.testing.assert_array_equal(store.rates, part.rates)
+    np.testing.assert_array_equal(store.qi_pos, part.qi_pos)
+    well = part.wells[2]
+    pd.testing.assert_frame_equal(store.frame_slice(well), part.frame_slice(well), check_dtype=False,
+                                  check_categorical=False)
+    assert open_store(tmp_path / "s").wells.tolist() == store.wells.tolist()
+
+
+def test_open_store_reopens_a_store_rewritten_in_place(part, cleaned, tmp_path):
+    path = tmp_path / "s"
+    write_store(part, path)
+    assert list(open_store(path).wells) == list(part.wells)
+    fewer = cleaned[cleaned["well"].isin(part.wells[:3])]
+    other = WellPartition(fewer, "oil_rate")
+    write_store(other, path)
+    assert list(open_store(path).wells) == list(other.wells)
+    assert open_store(path) is open_store(path)
+
+
+def test_unknown_store_version_is_refused(part, tmp_path):
+    path = tmp_path / "s"
+    write_store(part, path)
+    meta = json.loads((path / "meta.json").read_text())
+    (path / "meta.json").write_text(json.dumps({**meta, "version": 1}))
+    with pytest.raises(ValueError, match="unsupported store version"):
+        open_store(path)
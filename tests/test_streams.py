@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from conftest import production
+from dca.engine import clean_production, fit_all_wells
+from dca.partition import WellPartition
+from dca.streams import fit_streams
+
+
+@pytest.fixture
+def part():
+    raw = production()
+    month = raw.groupby("wellname").cumcount()
+    raw["gas"] = raw["oil"] * (2.0 + 0.1 * month)  # GOR rises 0.1 per month
+    raw["water"] = raw["oil"] * 0.5
+    df = clean_production(raw, "wellname", "date", "oil", "days", "oil_rate", {"gas": "gas", "water": "water"})
+    return WellPartition(df, "oil_rate", ("gas", "water"))
+
+
+def test_streams_leave_the_oil_summary_unchanged(part):
+    wide = fit_streams(part, "oil_rate", 0, 1, solver="lsq")
+    oil = fit_all_wells(part, "oil_rate", 0, 1, solver="lsq")
+    assert wide["well"].tolist() == oil["well"].tolist()
+    np.testing.assert_allclose(wide["Di_per_month"], oil["Di_per_month"])
+    np.testing.assert_allclose(wide["b_factor"], oil["b_factor"])
+    assert (wide["gas_status"] == "ok").all() and (wide["water_status"] == "ok").all()
+
+
+def test_ratio_trends(part):
+    wide = fit_streams(part, "oil_rate", 0, 1, solver="lsq")
+    np.testing.assert_allclose(wide["WOR_start"], 0.5)
+    np.testing.assert_allclose(wide["WOR_trend_per_yr"], 0.0, atol=1e-9)
+    # 0.1 per calendar month is about 1.2 per year on the 30.4375-day month axis
+    np.testing.assert_allclose(wide["GOR_trend_per_yr"], 1.2, rtol=0.02)
+    assert (wide["GOR_end"] > wide["GOR_start"]).all()